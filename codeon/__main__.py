@@ -24,6 +24,7 @@ import importlib
 import codeon.settings as sts
 import codeon.arguments as arguments
 import codeon.contracts as contracts
+import codeon.helpers.printing as printing
 
 
 def runable(*args, api, **kwargs):
@@ -42,6 +43,8 @@ def main(*args, **kwargs):
     kwargs = arguments.mk_args().__dict__
     # kwargs are vakidated against enforced contract
     kwargs = contracts.checks(*args, **kwargs)
+    if (kwargs.get("verbose") or 0) >= 2:
+        printing.set_level("dev")
     if kwargs.get("api") != "help":
         return runable(*args, **kwargs).main(*args, **kwargs)
 
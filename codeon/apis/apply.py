@@ -0,0 +1,28 @@
+# apply.py
+# applies an integration file to a source file in memory and prints the new code
+# nothing is written, see codeon/applier.py for the library functions
+import os
+from colorama import Fore, Style
+from codeon.applier import apply_text
+from codeon.helpers.file_io import read_text
+import codeon.helpers.printing as printing
+
+
+def apply(*args, source_path:str=None, update_source:str, **kwargs) -> str | None:
+    """
+    source_path: source file (-s), not needed for create CRs
+    update_source: integration file (-c)
+    """
+    print(  f"{Fore.MAGENTA}## API.APPLY ##{Fore.RESET} "
+            f"{source_path = }, {update_source = }")
+    source_text = read_text(source_path) if source_path else None
+    r = apply_text(source_text, read_text(update_source), *args, **kwargs)
+    printing.records_to_table('apply.report', [r.report])
+    print(r.code)
+    return r.code
+
+def main(*args, **kwargs):
+    """
+    All entry points must contain a main function like main(*args, **kwargs)
+    """
+    return apply(*args, **kwargs)
@@ -0,0 +1,28 @@
+# gc.py
+# removes restore manifests by retention policy and all blobs no manifest points to
+import os
+from colorama import Fore, Style
+import codeon.contracts as contracts
+from codeon.helpers.blob_store import BlobStore
+import codeon.helpers.printing as printing
+
+
+def gc(*args, pg_name:str=None, keep:int=None, days:float=None, dry:bool=False, **kwargs
+    ) -> dict:
+    """
+    Garbage collects the restore archive of pg_name.
+    keep: number of manifests to keep per work_file_name, days: max manifest age.
+    Without keep and days only orphaned blobs are removed.
+    """
+    if pg_name is None:
+        pg_name = contracts.get_package_data(*args, **kwargs).get('pg_name')
+    print(f"{Fore.MAGENTA}## API.GC ##{Fore.RESET} {pg_name = }, {keep = }, {days = }, {dry = }")
+    r = BlobStore(pg_name).gc(*args, keep=keep, days=days, dry=dry, **kwargs)
+    printing.records_to_table('gc.result', [r])
+    return r
+
+def main(*args, work_dir:str=os.getcwd(), **kwargs):
+    """
+    All entry points must contain a main function like main(*args, **kwargs)
+    """
+    return gc(*args, work_dir=work_dir, **kwargs)
@@ -0,0 +1,37 @@
+# history.py
+# lists the CRs of a package from the CR index, newest first
+import os
+from colorama import Fore, Style
+import codeon.contracts as contracts
+from codeon.helpers.cr_index import CrIndex
+import codeon.helpers.printing as printing
+
+SHOW = ('cr_id', 'work_file_name', 'pg_op', 'current_phase', 'status', 'seconds')
+
+
+def history(*args, pg_name:str=None, source_path:str=None, cr_id:str=None,
+    status:str=None, limit:int=None, rebuild:bool=False, **kwargs) -> list[dict]:
+    """
+    Lists indexed CRs, filtered by source file (-s), cr_id (-cr) or status prefix.
+    rebuild: first indexes CRs that only exist as files in the cr dirs.
+    """
+    if pg_name is None:
+        pg_name = contracts.get_package_data(*args, **kwargs).get('pg_name')
+    print(  f"{Fore.MAGENTA}## API.HISTORY ##{Fore.RESET} "
+            f"{pg_name = }, {source_path = }, {cr_id = }, {status = }, {limit = }")
+    index = CrIndex(pg_name)
+    if rebuild:
+        index.rebuild(*args, **kwargs)
+    records = index.history(
+                            work_file_name=os.path.basename(source_path) if source_path else None,
+                            cr_id=cr_id, status=status, limit=limit,
+    )
+    if records:
+        printing.records_to_table('history.result', [{k: r[k] for k in SHOW} for r in records])
+    return records
+
+def main(*args, work_dir:str=os.getcwd(), **kwargs):
+    """
+    All entry points must contain a main function like main(*args, **kwargs)
+    """
+    return history(*args, work_dir=work_dir, **kwargs)
@@ -6,6 +6,7 @@ from tabulate import tabulate as tb
 from colorama import Fore, Style
 
 import codeon.settings as sts
+import codeon.helpers.context as context
 from codeon.helpers.tree import Tree
 from codeon.helpers.import_info import main as import_info
 from codeon.helpers.collections import pipenv_is_active
@@ -14,7 +15,9 @@ from codeon.helpers.collections import pipenv_is_active
 all_infos = {"python", "package"}
 
 
-def collect_infos(msg: str, init=False, info_list: list = []) -> list:
+def collect_infos(msg: str, init=False, info_list: list = None) -> list:
+    # one list per request, concurrent info calls do not mix their output
+    info_list = context.current().infos if info_list is None else info_list
     if init: info_list.clear()
     if msg: info_list.append(str(msg))
     return info_list
@@ -93,8 +96,9 @@ def package_info(*args, verbose: int = 0, **kwargs):
 
 
 def main(*args, clip=None, **kwargs) -> str:
-    get_infos(*args, **kwargs)
-    out = "\n".join(collect_infos(f"info.main({kwargs})"))
+    with context.request():
+        get_infos(*args, **kwargs)
+        out = "\n".join(collect_infos(f"info.main({kwargs})"))
     if clip:
         pyperclip.copy(out)
         print(f"{Fore.GREEN}Copied to clipboard!{Style.RESET_ALL}")
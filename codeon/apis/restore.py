@@ -0,0 +1,25 @@
+# restore.py
+# restores the files touched by a CR (and all later CRs) from the restore archive
+import os
+from colorama import Fore, Style
+import codeon.contracts as contracts
+from codeon.restorer import Restorer
+import codeon.helpers.printing as printing
+
+
+def restore(*args, cr_id:str, pg_name:str=None, explicit:bool=True, dry:bool=False,
+    **kwargs) -> list[dict]:
+    if pg_name is None:
+        pg_name = contracts.get_package_data(*args, **kwargs).get('pg_name')
+    print(  f"{Fore.MAGENTA}## API.RESTORE ##{Fore.RESET} "
+            f"{pg_name = }, {cr_id = }, {explicit = }, {dry = }")
+    records = Restorer(pg_name)(cr_id, *args, explicit=explicit, dry=dry, **kwargs)
+    if records:
+        printing.records_to_table('restore.result', records)
+    return records
+
+def main(*args, work_dir:str=os.getcwd(), **kwargs):
+    """
+    All entry points must contain a main function like main(*args, **kwargs)
+    """
+    return restore(*args, work_dir=work_dir, **kwargs)
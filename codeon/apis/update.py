@@ -2,26 +2,50 @@
 import os
 from colorama import Fore, Style
 from codeon.updater import Updater
-from codeon.helpers.collections import temp_chdir
+from codeon.cr_info import CrData
+import codeon.contracts as contracts
 import codeon.helpers.printing as printing
 
 
-def update(*args, **kwargs):
+def update(*args, work_dir:str=None, **kwargs) -> dict | list[dict]:
     """
     Continuously runs the update process, collecting a status dict for each run.
+    A json array fans out into one CR per file and returns one record per CR.
     """
-    print(f"{Fore.MAGENTA}## API.UPDATE ##\nwith {os.getcwd() = }{Fore.RESET}")
+    print(f"{Fore.MAGENTA}## API.UPDATE ##\nwith {work_dir = }{Fore.RESET}")
     update_results = []
-    updater = Updater(*args, **kwargs)
+    updater = Updater(*args, work_dir=work_dir, **kwargs)
     # loop unitl all updates are processed
-    r = updater(*args, **kwargs)
-    printing.pretty_dict('update.main.result', r)
+    r = updater(*args, work_dir=work_dir, **kwargs)
+    if isinstance(r, list):
+        printing.records_to_table('update.main.result', r)
+    else:
+        printing.pretty_dict('update.main.result', r)
+    return r
+
+def update_batch(*args, pg_name:str=None, workers:int=None, **kwargs) -> list[dict]:
+    """
+    Processes all pending json and integration files of pg_name through one Updater.
+    """
+    if pg_name is None:
+        pg_name = contracts.get_package_data(*args, **kwargs).get('pg_name')
+    pending = CrData.find_pending(pg_name)
+    print(f"{Fore.MAGENTA}## API.UPDATE BATCH ##\n{len(pending)} pending CRs{Fore.RESET}")
+    if not pending:
+        return []
+    updater = Updater(*args, **kwargs)
+    records = updater.batch(pending, *args, pg_name=pg_name, max_workers=workers, **kwargs)
+    printing.records_to_table('update.batch.result', records)
+    return records
 
-def main(*args, work_dir:str=os.getcwd(), **kwargs):
+def main(*args, work_dir:str=os.getcwd(), batch:bool=False, **kwargs):
     """
     Continuously runs the update process, collecting a status dict for each run.
+    work_dir is passed on explicitly and the cwd is never changed, so threads can run
+    updates for different work dirs in one process.
     """
     if work_dir == os.getcwd():
         print(f"{Fore.YELLOW}WARNING: cwd == {work_dir = } {Fore.RESET}")
-    with temp_chdir(work_dir):
-        update(*args, work_dir=work_dir, **kwargs)
+    if batch:
+        return update_batch(*args, work_dir=work_dir, **kwargs)
+    return update(*args, work_dir=work_dir, **kwargs)
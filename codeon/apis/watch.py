@@ -0,0 +1,56 @@
+# watch.py
+# keeps one warm Updater alive and applies cr files as soon as they land
+import os
+from colorama import Fore, Style
+import codeon.settings as sts
+import codeon.contracts as contracts
+from codeon.updater import Updater
+from codeon.cr_info import CrData
+from codeon.helpers.watcher import DirWatcher
+from codeon.helpers.symbol_index import SymbolIndex
+import codeon.helpers.context as context
+import codeon.helpers.printing as printing
+
+
+def watch(*args, pg_name:str=None, workers:int=None, debounce:float=0.5, **kwargs):
+    """
+    Watches the jsons and integrations dirs of pg_name and feeds every new cr file
+    into the Updater phases. Files that are pending on startup are processed first.
+    """
+    package = contracts.get_package_data(*args, **kwargs)
+    if pg_name is None:
+        pg_name = package.get('pg_name')
+    if context.current().setting('anchor_preflight') and package.get('package_dir'):
+        # indexed once here, every preflight after only reads the files that changed
+        SymbolIndex(pg_name).refresh(package['package_dir'])
+    dirs = [sts.json_dir(pg_name), sts.integration_dir(pg_name)]
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+    updater = Updater(*args, **kwargs)
+    watcher = DirWatcher(*dirs, debounce=debounce)
+    print(  f"{Fore.MAGENTA}## API.WATCH ##{Fore.RESET} "
+            f"{'inotify' if watcher.inotify is not None else 'polling'}: {dirs}")
+    run_batch(updater, CrData.find_pending(pg_name), *args, pg_name=pg_name, workers=workers,
+                **kwargs)
+    try:
+        for paths in watcher:
+            pending = [CrData.pending_from_path(p, pg_name) for p in paths]
+            run_batch(updater, [p for p in pending if p], *args, pg_name=pg_name,
+                        workers=workers, **kwargs)
+    except KeyboardInterrupt:
+        print(f"{Fore.MAGENTA}## API.WATCH ## stopped{Fore.RESET}")
+    finally:
+        watcher.close()
+
+def run_batch(updater:Updater, pending:list[dict], *args, workers:int=None, **kwargs) -> list:
+    if not pending:
+        return []
+    records = updater.batch(pending, *args, max_workers=workers, **kwargs)
+    printing.records_to_table('watch.result', records)
+    return records
+
+def main(*args, work_dir:str=os.getcwd(), **kwargs):
+    """
+    All entry points must contain a main function like main(*args, **kwargs)
+    """
+    return watch(*args, work_dir=work_dir, **kwargs)
@@ -0,0 +1,99 @@
+# applier.py
+"""
+Applies a CR to source code in memory, for services that embed codeon.
+Nothing is read from or written to disk: no CrData, no cr dirs, no logs.
+
+RUN like:
+    from codeon.applier import apply_text, apply_many
+    result = apply_text(source_text, integration_text, black=True)
+    result.code, result.report
+    results = apply_many([(source_text, integration_text), ...], max_workers=4)
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import libcst as cst
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["applier"] = Color.GREEN
+
+import codeon.settings as sts
+import codeon.helpers.context as context
+from codeon.parsers import CSTDelta
+from codeon.transformer import Transformer, RegionTransformer
+from codeon.creator import Validator_Formatter
+
+
+@dataclass
+class ApplyResult:
+    # new source code, None if the CR removes the file or failed
+    code: str | None
+    report: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.report.get('status', '').startswith('failed')
+
+
+def apply_text(source_text: str | None, integration_text: str, *args, cr_id: str = None,
+    black: bool = False, api: str = 'update', **kwargs) -> ApplyResult:
+    """
+    Applies integration_text (an integration file with package and unit cr-headers) to
+    source_text. source_text can be None for create CRs.
+    Raises like the file based pipeline does, i.e. on a missing package cr-header.
+    """
+    start = time.perf_counter()
+    cr_id = cr_id if cr_id is not None else sts.new_cr_id()
+    cstd = CSTDelta()
+    pg_head = cstd.parse_text(integration_text, *args, header_only=True, **kwargs)
+    report = {'cr_id': cr_id, 'cr_op': pg_head.cr_op, 'cr_anc': pg_head.cr_anc}
+    F = Validator_Formatter()
+    if pg_head.cr_op == 'create':
+        raw_code = sts.patterns['pg_header'].sub('', integration_text, 1).strip()
+        code = F(raw_code, *args, black=black, **kwargs)
+    elif pg_head.cr_op == 'remove':
+        code = None
+    else:
+        assert source_text is not None, logprint("update needs a source_text", level='error')
+        body = cstd.parse_text(integration_text, *args, api=api, **kwargs)
+        min_bytes = context.current().setting('partial_parse_min_bytes')
+        if len(source_text.encode("utf-8")) >= min_bytes:
+            tf = RegionTransformer(source_text, body, *args, cr_id=cr_id, **kwargs)
+        else:
+            tf = Transformer(cst.parse_module(source_text), body, *args, cr_id=cr_id, **kwargs)
+        tf(*args, **kwargs)
+        code = F(tf.code, *args, black=black, touched=tf.touched_lines, **kwargs)
+        report.update({
+                        'ops': len(body[1]),
+                        'failed': [head.cr_anc for head, _ in tf.failed_ops],
+                        'suggestions': tf.suggestions,
+                        'resolved': tf.resolved,
+                        'touched': tf.touched_lines(),
+        })
+    report['status'] = 'partial' if report.get('failed') else 'done'
+    report['seconds'] = round(time.perf_counter() - start, 4)
+    return ApplyResult(code, report)
+
+
+def apply_many(pairs: list[tuple[str | None, str]], *args, max_workers: int = None,
+    **kwargs) -> list[ApplyResult]:
+    """
+    Runs apply_text for many (source_text, integration_text) pairs in a process pool.
+    Results keep the order of pairs, a failing pair does not stop the others.
+    """
+    if len(pairs) <= 1 or max_workers == 1:
+        return [_apply_one(pair, *args, **kwargs) for pair in pairs]
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        futures = [ex.submit(_apply_one, pair, *args, **kwargs) for pair in pairs]
+        return [f.result() for f in futures]
+
+
+def _apply_one(pair: tuple[str | None, str], *args, **kwargs) -> ApplyResult:
+    start = time.perf_counter()
+    try:
+        return apply_text(*pair, *args, **kwargs)
+    except Exception as e:
+        return ApplyResult(None, {
+                                    'status': f"failed: {e!r}",
+                                    'seconds': round(time.perf_counter() - start, 4),
+        })
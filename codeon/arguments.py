@@ -69,15 +69,61 @@ def mk_args():
     parser.add_argument(
         "-e",
         "--explicit",
-        action="store_true",
+        action=argparse.BooleanOptionalAction,
         default=True,
-        help="If False, restore the CR and all later CRs. Default is True (explicit CR only).",
+        help="--no-explicit restores the CR and all later CRs. Default is the explicit CR only.",
         )
     parser.add_argument(
         "--hot",
         action="store_true",
         help="Overwrite the source file directly (used with 'update').",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Process all pending json and integration files of the package (used with 'update').",
+    )
+    parser.add_argument(
+        "--chain",
+        action="store_true",
+        help="Apply all pending CRs of a file on one parsed tree and write once (used with 'update --batch', 'watch').",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Max number of files processed concurrently (used with 'update --batch').",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        help="Restore files to keep per source file (used with 'gc').",
+    )
+    parser.add_argument(
+        "--days",
+        type=float,
+        help="Max age in days of restore files to keep (used with 'gc').",
+    )
+    parser.add_argument(
+        "--status",
+        type=str,
+        help="Only list CRs whose status starts with this, i.e. failed (used with 'history').",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="Max number of CRs to list (used with 'history').",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Index CRs found in the cr dirs before listing (used with 'history').",
+    )
+    parser.add_argument(
+        "--dry",
+        action="store_true",
+        help="Only report what would be changed (used with 'gc', 'restore').",
+    )
     parser.add_argument(
         "-b",
         "--black",
@@ -88,7 +134,7 @@ def mk_args():
         "-t",
         "--testing",
         action="store_true",
-        help="Run tests on the output file to veryfy correct syntax.",
+        help="Validate the output file: compile, local imports and its unit test module.",
     )
     parser.add_argument(
         "--port",
@@ -1,5 +1,5 @@
 # contracts.py
-import os, sys
+import functools, os, sys
 from colorama import Fore, Style
 from dataclasses import asdict
 
@@ -62,14 +62,22 @@ def check_missing_kwargs(*args, **kwargs):
 def get_package_data(*args, work_dir:str=None, **kwargs) -> dict:
     """
     Uses work_dir or cwd to detect package information such as project_dir, package_dir, ect.
+    Pass work_dir explicitly when running for several projects in one process.
     """
     work_dir = os.path.abspath(work_dir if work_dir is not None else os.getcwd())
+    return dict(_package_data(work_dir))
+
+@functools.lru_cache(maxsize=64)
+def _package_data(work_dir:str) -> tuple:
+    """
+    Resolving the DirContext walks the file system, so repeated checks (i.e. once per
+    phase and per CR in batch runs) share one result per work_dir.
+    """
     # traverses the directory structure to find project and package directories
     ctx = DirContext()(path=work_dir).__dict__
     # we only return a subset of the context information
     obj_names = {'pr_name', 'pg_name', 'work_dir', 'project_dir', 'package_dir', 'is_package'}
-    pg_objs = {k: v for k, v in ctx.items() if k in obj_names}
-    return pg_objs
+    return tuple((k, v) for k, v in ctx.items() if k in obj_names)
 
 def clean_paths(*args, **kwargs) -> dict:
     """
@@ -81,16 +89,19 @@ def clean_paths(*args, **kwargs) -> dict:
             normalizeds[n] = normalize_path(v, *args, **kwargs)
     return normalizeds
 
-def normalize_path(path: str, *args, **kwargs) -> str:
+def normalize_path(path: str, *args, work_dir:str=None, **kwargs) -> str:
     """
     WHY: Canonicalize user-supplied paths consistently across OS.
+    Relative paths are resolved against work_dir, the cwd is only the fallback, so
+    threads can serve different work dirs in one process.
     """
     if not path:
         return path
     p = os.path.expanduser(path)
     if not os.path.isabs(p):
-        if os.path.exists(os.path.abspath(os.path.join(os.getcwd(), p))):
-            p = os.path.abspath(os.path.join(os.getcwd(), p))
+        base = work_dir if work_dir is not None else os.getcwd()
+        if os.path.exists(os.path.abspath(os.path.join(base, p))):
+            p = os.path.abspath(os.path.join(base, p))
     return os.path.normpath(p)
 
 def get_deliverable(*args, integration_format:str='md', **kwargs):
@@ -9,6 +9,9 @@ MODULE_COLORS["cr_info"] = Color.MAGENTA
 import codeon.settings as sts
 import codeon.helpers.collections as collections
 import codeon.helpers.printing as printing
+from codeon.restorer import Restorer
+from codeon.helpers.cr_index import CrIndex
+import codeon.helpers.context as context
 
 # C:\Users\lars\python\venvs\packages\acodeon\codeon\helpers\file_info.py
 @dataclass
@@ -25,7 +28,7 @@ class CrData:
     work_dir: str | None = None
     work_file_name: str | None = None
     pg_name: str | None = None
-    project_dir: str = field(default_factory=os.getcwd)
+    project_dir: str | None = None # falls back to work_dir, then to the cwd
     hot: bool = False
     cr_id: str | None = None
     # Process controll parameter
@@ -54,15 +57,18 @@ class CrData:
     restore_file_exists: bool = False
     log_path: str | None = None
     error_path: str | None = None
+    # per phase and sub step measurements, see helpers/profiling.py
+    timings: list | None = None
 
 
     def __post_init__(self, *args, **kwargs):
         """Generates a cr_id and resolves all necessary paths."""
         # print(f"{Fore.MAGENTA}CrData.__post_init__ in :{Fore.RESET} {self.pg_name = }")
+        self.project_dir = self.project_dir or self.work_dir or os.getcwd()
         if not self.cr_id: self.get_cr_id(*args, **kwargs)
         # print(f"{Fore.MAGENTA}CrData.__post_init__ middle :{Fore.RESET} {self.pg_name = }")
-        self.update_data(*args, **kwargs)
         self.mk_cr_dirs(*args, **kwargs)
+        self.update_data(*args, **kwargs)
         self.load_cr_info(*args, **kwargs)
         # print(f"{Fore.MAGENTA}CrData.__post_init__ out :{Fore.RESET} {self.pg_name = }")
 
@@ -71,7 +77,7 @@ class CrData:
         assert kwargs, logprint(f"No kwargs provided!", level='error')
         return {k: v for k, v in kwargs.items() if k in CrData.__dataclass_fields__}
 
-    def get_cr_id(self, *args, cr_id:str=sts.session_time_stamp, **kwargs) -> str:
+    def get_cr_id(self, *args, cr_id:str=None, **kwargs) -> str:
         # when the cr_id is provided as part of a file path, we extract it
         for n, p in self.paths_to_dict(*args, **kwargs).items():
             if file_info := collections.match_file_info(p):
@@ -84,10 +90,12 @@ class CrData:
                     if valid_file_name:
                         self.update_source_type = 'file'
                     break
-        self.cr_id = cr_id
+        # a new id per CR, CRs of one process (threads, watch, batch) must never share one
+        self.cr_id = cr_id or sts.new_cr_id()
 
     def _validate_file_info(self, file_info, *args, **kwargs) -> dict:
         # Example: file_info = {'cr_id': '2025-10-29-13-23-25', 'file_name': 'codeon.py'}
+        # or a sts.new_cr_id() like '2025-10-29-13-23-25-048213-0004821-0000'
         valid_cr_id, valid_file_name = False, False
         try:
             cr_id = file_info.get('cr_id')
@@ -125,6 +133,8 @@ class CrData:
 
     def mk_cr_dirs(self, *args, **kwargs) -> None:
         """Creates the log and change-request directories based on package name."""
+        if self.pg_name is None:
+            return
         for n, (_d, _n) in sts.cr_paths.items():
             _dir = _d(self.pg_name)
             if not os.path.isdir(_dir):
@@ -146,6 +156,8 @@ class CrData:
         else:
             with open(self.log_path, 'w') as f: f.write(yaml.dump(self.to_dict()))
             self.log_file_exists = True
+            if context.current().setting('cr_index') and self.pg_name:
+                CrIndex(self.pg_name).record(self.to_dict())
 
 
     @staticmethod
@@ -171,6 +183,83 @@ class CrData:
             dirs[:] = [d for d in dirs if not ignored(d)]
         return False, file_name
 
+    @classmethod
+    def from_records(cls, records:list[dict], *args, project_dir:str=None, **kwargs
+        ) -> list['CrData']:
+        """
+        Creates one CrData per json record (target) in one step, all sharing one cr_id.
+        Source files are located with a single walk over project_dir.
+        """
+        names = [r[sts.target_key] for r in records]
+        found = CrData.find_file_paths(names, *args, project_dir=project_dir, **kwargs)
+        cr_id, crs = kwargs.get('cr_id') or sts.new_cr_id(), []
+        for name in names:
+            pars = {**kwargs, 'project_dir': project_dir, 'work_file_name': name,
+                                'source_path': found.get(name, False), 'cr_id': cr_id}
+            crs.append(cls(*args, **cls.fields(*args, **pars)))
+        return crs
+
+    @staticmethod
+    def find_file_paths(search_files:list[str], *args, project_dir=None, max_depth=5,
+        **kwargs) -> dict[str, str]:
+        """Like find_file_path, but finds many file names in one walk."""
+        missing = {os.path.basename(f) for f in search_files}
+        found, root_depth = {}, project_dir.count(os.sep)
+        def ignored(d):
+            d = d.strip()
+            return any(d == i or d.endswith(i.strip('*')) for i in sts.ignore_dirs)
+        for root, dirs, files in os.walk(project_dir, topdown=True):
+            if ignored(os.path.basename(root)) or root.count(os.sep) - root_depth >= max_depth:
+                dirs.clear()
+                continue
+            for file_name in missing.intersection(files):
+                found[file_name] = os.path.join(root, file_name)
+            missing -= found.keys()
+            if not missing:
+                break
+            dirs[:] = [d for d in dirs if not ignored(d)]
+        return found
+
+    @staticmethod
+    def find_pending(pg_name:str, *args, **kwargs) -> list[dict]:
+        """
+        Collects all json and integration files of pg_name that have no processing file yet.
+        If both exist for a CR, the integration file (the later phase) is the entry point.
+        """
+        pending = {}
+        for phase in ('json', 'integration'):
+            _dir = getattr(sts, f"{phase}_dir")(pg_name)
+            if not os.path.isdir(_dir):
+                continue
+            for f_name in sorted(os.listdir(_dir)):
+                if p := CrData.pending_from_path(os.path.join(_dir, f_name), pg_name):
+                    pending[(p['cr_id'], p['work_file_name'])] = p
+        return sorted(pending.values(), key=lambda p: p['cr_id'])
+
+    @staticmethod
+    def pending_from_path(path:str, pg_name:str, *args, **kwargs) -> dict | None:
+        """
+        Returns the pending record for a json or integration file of pg_name, or None if
+        the file is no cr file or its CR has already been processed.
+        """
+        phases = {getattr(sts, f"{phase}_dir")(pg_name): phase for phase in ('json', 'integration')}
+        phase = phases.get(os.path.dirname(path))
+        file_info = collections.match_file_info(os.path.basename(path))
+        if phase is None or not file_info or not file_info.get('cr_id'):
+            return None
+        cr_id, work_file_name = file_info['cr_id'], file_info['file_name']
+        work_file_name = f"{os.path.splitext(work_file_name)[0]}.py"
+        processing_path = os.path.join(sts.processing_dir(pg_name),
+                                sts.processing_file_name(work_file_name, cr_id))
+        if os.path.isfile(processing_path):
+            return None
+        return {
+                'cr_id': cr_id,
+                'work_file_name': work_file_name,
+                'entry_phase': phase,
+                'path': path,
+        }
+
     def paths_to_dict(self, *args, **kwargs) -> dict:
         paths = {p: getattr(self, p) for p in self.cr_paths}
         if self.work_file_name:
@@ -179,7 +268,7 @@ class CrData:
             paths['source_path'] = self.source_path
         if self.update_source_type == 'file':
             paths['update_source'] = self.update_source
-        printing.pretty_dict('CrData.paths_to_dict', paths)
+        printing.pretty_dict('CrData.paths_to_dict', paths, level='debug')
         return paths
 
     @property
@@ -195,7 +284,8 @@ class CrData:
             self.work_file_name = os.path.basename(self.source_path)
         if self.work_file_name is None and self.source_path is None:
             logprint(f"unknown work_file_name and source_path", level='warning')
-        elif (self.work_file_name is not None) and not os.path.exists(str(self.source_path)):
+        elif (self.work_file_name is not None) and (self.source_path is not False) \
+                                                and not os.path.exists(str(self.source_path)):
             self.source_path, self.work_file_name = CrData.find_file_path(
                                                             self.work_file_name, *args,
                                                             project_dir = self.project_dir,
@@ -220,28 +310,22 @@ class CrData:
         # If source_path is not found, then it does not exist yet, hence create operation.
         if self.source_path == False and self.integration_path is not None:
             self.source_path = self.integration_path
-        if self.error_path is not None:
-            sts.error_path = self.error_path
+        # outside of a request the process wide default context must not change
+        if self.error_path is not None and context.active():
+            context.current().error_path = self.error_path
 
     def find_cr_files(self, *args, **kwargs) -> str | None:
         """Finds the cr_*_files, prioritizing a raw path over discovery."""
         for p in self.cr_paths:
             _path = getattr(self, p)
-            setattr(self, f"{p.replace('path', 'file_name')}_exists", os.path.isfile(str(_path)))
+            setattr(self, f"{p.replace('_path', '_file')}_exists", os.path.isfile(str(_path)))
 
-    @staticmethod
-    def _hot_restore_dirs(self, *args, **kwargs) -> None:
+    def _hot_restore_dirs(self, *args, explicit:bool=True, **kwargs) -> list[dict]:
         """
-        Runs a restore if a git reset --hot did not work.
+        Restores the files touched by this CR (and all later CRs if not explicit).
         """
-        print(f"{Fore.MAGENTA}Restoring package from backup...{Style.RESET_ALL}")
-        print(  f"{Fore.MAGENTA}Before running restore, backup the existing {Fore.RESET}"
-                f"{self.project_dir = }")
-        confim = input(f"{Fore.YELLOW}Restore will overwrite {self.project_dir = }! "
-                        f"(y/n): {Style.RESET_ALL}")
-        if confim.lower() == 'y':
-            shutil.rmtree(self.project_dir)
-        shutil.copytree(sts.cr_restore_dir(self.pg_name), self.project_dir)
+        print(f"{Fore.MAGENTA}Restoring {self.cr_id} from the restore archive...{Style.RESET_ALL}")
+        return Restorer(self.pg_name)(self.cr_id, *args, explicit=explicit, **kwargs)
 
     def update_data(self, *args, **kwargs):
         """
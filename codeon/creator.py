@@ -7,11 +7,18 @@ from codeon.helpers.printing import logprint, Color, MODULE_COLORS
 MODULE_COLORS["creator"] = Color.MAGENTA
 
 import codeon.settings as sts
-from codeon.transformer import Transformer
+from codeon.transformer import Transformer, RegionTransformer, touched_lines
+from codeon.validator import Validator
 from codeon.parsers import CSTSource, CSTDelta
 from codeon.helpers.string_parser import JsonParser, MdParser
 import codeon.helpers.printing as printing
 import codeon.helpers.collections as collections
+from codeon.helpers.file_io import read_text, stream_wrapped, transaction
+from codeon.helpers.blob_store import BlobStore
+import codeon.helpers.black_format as black_format
+import codeon.helpers.profiling as profiling
+import codeon.helpers.context as context
+import codeon.helpers.symbol_index as symbol_index
 
 
 class SourceEngine:
@@ -20,7 +27,8 @@ class SourceEngine:
     WHY: Delegates parsing to JsonParser and manages CR file creation/state.
     """
     fields = ['string', 'data', 'update_source', 'update_source_type', 'file_exists', 
-                'pg_name', 'cr_id', 'cr_op', 'verbose', 'api', 'work_dir', 'work_file_name']
+                'pg_name', 'cr_id', 'cr_op', 'verbose', 'api', 'work_dir', 'work_file_name',
+                'project_dir', 'tx', 'hot', 'testing']
 
     def __init__(self, phase, *args, path = False, **kwargs):
         self._phase:str = phase
@@ -30,19 +38,25 @@ class SourceEngine:
         self.file_exists: bool = False
         self.work_file_name:str = None
         self.data: dict = None
+        # json arrays hold one CR per target file, see fan_out
+        self.records: list[dict] = None
         self.handler = FileHandler(phase, *args, **kwargs)
         self.prosessor = ProcessEngine(phase, *args, **kwargs)
 
     def __call__(self, *args, **kwargs) -> dict:
-        self.veryfy_source(*args, **kwargs)
-        printing.pretty_dict('SourceEngine.__dict__', self.__dict__)
-        self.parse_source(*args, **kwargs)
+        with profiling.step('source'):
+            self.veryfy_source(*args, **kwargs)
+            printing.pretty_dict('SourceEngine.__dict__', self.__dict__, level='debug')
+            self.parse_source(*args, **kwargs)
         return self.processing(*args, **kwargs)
 
     def processing(self, *args, **kwargs) -> dict:
+        if self.records is not None:
+            return self.fan_out(*args, **kwargs)
         self.path = self.handler.get_path(self.work_file_name, *args, **kwargs)
-        logprint(f"{self._phase} path: {self.path}", level='dev')
-        if self.update_source_type == 'string':
+        logprint(lambda: f"{self._phase} path: {self.path}", level='dev')
+        # ProcessEngine writes the processing file itself, within the transaction of the CR
+        if self.update_source_type == 'string' and self._phase != 'processing':
             self.handler.write_file(self.path, self.string)
         if self._phase == 'processing':
             self.prosessor(*args, **kwargs)
@@ -56,9 +70,43 @@ class SourceEngine:
         logprint(f"{outputs = }", level='info')
         return outputs
 
+    def fan_out(self, *args, **kwargs) -> dict:
+        """
+        Splits a json array into one CR per target: creates all CrData in one step and
+        writes every json record and its integration file in one bulk write.
+        The Updater continues each CR from its integration file (see Updater.batch).
+        """
+        from codeon.cr_info import CrData
+        crs = CrData.from_records(self.records, *args, **kwargs)
+        files, pending = {}, []
+        for cr, record in zip(crs, self.records):
+            code = record.get(sts.content_key) or ''
+            cleaned = MdParser(*args, md_string=code, **kwargs)(*args, **kwargs)
+            files[cr.json_path] = json.dumps(record, indent=4)
+            files[cr.integration_path] = (cleaned or {}).get(sts.content_key) or code
+            pending.append({
+                            'cr_id': cr.cr_id,
+                            'work_file_name': cr.work_file_name,
+                            'source_path': cr.source_path,
+                            'entry_phase': 'integration',
+                            'path': cr.integration_path,
+            })
+        self.handler.write_files(files, *args, **kwargs)
+        logprint(f"fanned out {len(pending)} CRs from one json array", level='info')
+        return {'fan_out': pending, f'{self._phase}_file_exists': True}
+
     def parse_source(self, *args, **kwargs) -> None:
         if self.update_source_type == 'file':
             self.string = self.handler.load_file(*args, **kwargs)
+            if self._phase == 'json':
+                self.data = JsonParser(*args, text=self.string, **kwargs)()
+            if isinstance(self.data, list):
+                self.records = self.data
+                return
+            if not self.data:
+                self.data = {sts.target_key: kwargs.get('work_file_name'),
+                                sts.content_key: self.string}
+            self.string = self.data.get(sts.content_key)
         elif self.update_source_type == 'string':        
             if self._phase == 'json':
                 self.data = JsonParser(*args, text=self.string, **kwargs)()
@@ -66,6 +114,9 @@ class SourceEngine:
                 self.data = MdParser(*args, md_string=self.string, **kwargs)(*args, **kwargs)
             elif self._phase == 'prompt':
                 self.data = PromptEngine(*args, **kwargs)(*args, **kwargs)
+            if isinstance(self.data, list):
+                self.records = self.data
+                return
             self.string = self.data.get(sts.content_key)
         self.work_file_name = self.data.get(sts.target_key)
 
@@ -73,16 +124,16 @@ class SourceEngine:
         update_source_type:str, file_exists:bool, **kwargs):
         assert not ((string and update_source) and (update_source_type != 'file')), \
         logprint(f"Ambigous sources \n{string = }\n{update_source = }", level='error')
-        # source = string or update_source
-        if update_source_type == 'string' or not update_source_type:
-            self.update_source_type = 'string'
-            self.string = string or update_source
-        elif path and file_exists:
+        # an existing phase file wins, otherwise the string is handed down from the last phase
+        if update_source_type == 'file' and path and file_exists:
             assert os.path.exists(path), \
             logprint(f"{self._phase = } File not found {path = }", level='error')
             self.update_source_type = 'file'
             self.path = path
             self.file_exists = file_exists
+        elif update_source_type in {'string', 'file'} or not update_source_type:
+            self.update_source_type = 'string'
+            self.string = string or update_source
         elif string and self._phase == 'prompt':
             self.string = string
             self.update_source_type = 'string'
@@ -97,9 +148,7 @@ class FileHandler:
 
     def load_file(self, path, *args, **kwargs) -> None:
         assert self._phase in path, logprint(f"Not a {self._phase} path!", level='error')
-        with open(path, "r", encoding="utf-8") as f:
-            string = f.read()
-        return string
+        return read_text(path)
 
     def write_file(self, path, content, *args, **kwargs) -> None:
         """Writes the parsed JSON string to the CR path."""
@@ -108,8 +157,19 @@ class FileHandler:
             f.write(content)
         return sts.file_exists_default
 
-    def _create_restore_file(self, *args, soruce_path:str, restore_path:str, **kwargs):
-        shutil.copyfile(source_path, restore_path)
+    def write_files(self, files:dict[str, str], *args, **kwargs) -> None:
+        """Writes many {path: content} files at once, creating each target dir only once."""
+        for _dir in {os.path.dirname(p) for p in files}:
+            os.makedirs(_dir, exist_ok=True)
+        for path, content in files.items():
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        logprint(f"writing {len(files)} files", level='info')
+
+    def _create_restore_file(self, *args, source_path:str, restore_path:str, pg_name:str, tx,
+        **kwargs):
+        """The restore file is a manifest, the source itself is stored once by its hash."""
+        BlobStore(pg_name).archive(source_path, restore_path, *args, tx=tx, **kwargs)
         logprint(f"creating restore file: {restore_path}", level='info')
 
     def remove_file(self, path, *args, **kwargs) -> None:
@@ -118,19 +178,31 @@ class FileHandler:
             os.remove(path)
             logprint(f"removing file: {path}", level='warning')
 
-    def remove_operation(self, *args, hot:bool=False, path:str, **kwargs):
-        self.write_file(path, *args, **kwargs)
-        if hot:
-            self._create_restore_file(*args, **kwargs)
-            self.remove_file(*args, **kwargs)
-
-    def write_operation(self, *args, hot:bool=False, source_path:str, path:str, 
-        **kwargs):
-        # in any case we write to the processing path for CR documentation
-        self.write_file(path, *args, **kwargs)
-        if hot:
-            self._create_restore_file(*args, source_path=source_path, **kwargs)
-            self.write_file(source_path, *args, **kwargs)
+    def remove_operation(self, marker:str, *args, hot:bool=False, path:str, source_path:str,
+        tx=None, **kwargs):
+        """
+        When hot is False removal is simulated by outcommenting the source file content.
+        The source is streamed into the processing file, it is never loaded as a whole.
+        WHY: all files of the CR are written in one transaction (see file_io.AtomicWriter),
+        pass tx to join a larger one.
+        """
+        logprint(f"writing file {path = }", level='info')
+        with transaction(tx) as t:
+            stream_wrapped(path, source_path, head=f'{marker}\n\n"""\n', tail='\n"""\n', tx=t)
+            if hot:
+                self._create_restore_file(*args, source_path=source_path, tx=t, **kwargs)
+                t.remove(source_path)
+
+    def write_operation(self, content:str, *args, hot:bool=False, source_path:str, path:str,
+        tx=None, **kwargs):
+        """Like remove_operation, processing, restore and source file are written atomically."""
+        logprint(f"writing file {path = }\n{content[:100] = }", level='info')
+        with transaction(tx) as t:
+            # in any case we write to the processing path for CR documentation
+            t.write(path, content)
+            if hot:
+                self._create_restore_file(*args, source_path=source_path, tx=t, **kwargs)
+                t.write(source_path, content)
 
     def get_path(self, wfn, *args, pg_name: str, cr_id: str, **kwargs) -> tuple[str, str]:
         """Derives the full CR JSON file path and the target filename."""
@@ -139,54 +211,193 @@ class FileHandler:
         return os.path.join(_dir, _file_name)
 
 
-class ProcessEngine:
+def validate(code:str, *args, testing:bool=False, **kwargs) -> list[dict] | None:
+    """
+    -t/--testing: compile, import and unit test checks of the transformed code.
+    Runs before the write, code that fails never reaches processing or source file.
+    """
+    if not testing or code is None:
+        return None
+    validator = Validator(*args, **kwargs)
+    records = validator(code, *args, **kwargs)
+    assert validator.ok, logprint(f"validation failed: {records[-1]['detail']}", level='error')
+    return records
 
 
+class ProcessEngine:
+    """
+    Routes a CR by its package cr-header, then loads only the inputs its cr_op needs.
+    WHY: create and remove never look at a CST, libcst parsing is only done for update.
+    """
+    # inputs per package cr_op, besides the package cr-header
+    # source_cst: CSTSource of the source file, delta_cst: unit ops of the integration file
+    # delta_text: raw integration file text (loaded lazily by CSTDelta.source_text)
+    # source_text: raw source text, only the regions a CR targets get parsed
+    inputs = {
+                'create': ('delta_text',),
+                'remove': (),
+                'update': ('source_cst', 'delta_cst'),
+                'update_partial': ('source_text', 'delta_cst'),
+    }
+
     def __init__(self, *args, **kwargs):
         self.csts = CSTSource(*args, **kwargs)
         self.cstd = CSTDelta(*args, **kwargs)
         self.F = Validator_Formatter()
         self.handler = FileHandler(*args, **kwargs)
+        self.out_code: str = None
+        self.validation: list[dict] = None
 
     def __call__(self, *args, **kwargs):
         """
         WHY: Honor package-level 'remove' with same hot+archive flow as _write_output.
         """
-        self.process_python(*args, **kwargs)
+        with profiling.step('parse'):
+            self.process_python(*args, **kwargs)
         self.process_operations(*args, **kwargs)
         return self
 
+    def validate(self, *args, **kwargs) -> list[dict] | None:
+        self.validation = validate(self.out_code, *args, **kwargs)
+        return self.validation
+
+    def write(self, *args, source_path:str, **kwargs) -> None:
+        with profiling.step('validate'):
+            self.validate(*args, source_path=source_path, **kwargs)
+        with profiling.step('write'):
+            self.handler.write_operation(self.out_code, *args, source_path=source_path,
+                                            **kwargs)
+
     def process_python(self, *args, source_path:str, integration_path:str, **kwargs):
         assert source_path and integration_path, logprint(
             f"Missing processing input {source_path = }, {integration_path = }", level='error')
         if not str(integration_path).endswith('.py'):
             return
-        self.csts(*args, source_path=source_path, **kwargs)
-        self.cstd(*args, source_path=integration_path, **kwargs)
-        self.pg_head, self.cr_ops = self.cstd.body
-        self.marker = self.pg_head.create_marker(*args, **kwargs)
+        self.pg_head = self.cstd.read_header(*args, source_path=integration_path, **kwargs)
         self.pg_op = self.pg_head.cr_op
+        self.marker = self.pg_head.create_marker(*args, **kwargs)
+        if self.pg_op == 'update' and context.current().setting('anchor_preflight'):
+            with profiling.step('preflight'):
+                symbol_index.preflight(*args, source_path=source_path,
+                                        integration_path=integration_path, **kwargs)
+        needs = self.inputs[self.route(*args, source_path=source_path, **kwargs)]
+        if 'source_cst' in needs:
+            self.csts(*args, source_path=source_path, **kwargs)
+        elif 'source_text' in needs:
+            self.csts.read_source(*args, source_path=source_path, **kwargs)
+        if 'delta_cst' in needs:
+            self.cstd(*args, source_path=integration_path, **kwargs)
+            self.pg_head, self.cr_ops = self.cstd.body
+
+    def route(self, *args, source_path:str, **kwargs) -> str:
+        """Large sources are updated region by region, see transformer.RegionTransformer."""
+        min_bytes = context.current().setting('partial_parse_min_bytes')
+        if self.pg_op == 'update' and os.path.isfile(source_path) \
+                                    and os.path.getsize(source_path) >= min_bytes:
+            return 'update_partial'
+        return self.pg_op
 
     def process_operations(self, *args, source_path:str, **kwargs):
         if self.pg_head.cr_op == 'remove':
-            # when hot is False removal is simulated by outcommenting the source file content
-            self.handler.remove_operation((
-                                f"{self.marker}\n\n"
-                                f"\"\"\"\n"
-                                f"{self.handler.load_file(source_path, *args, **kwargs)}"
-                                f"\n\"\"\"\n"
-                                ), source_path, *args, **kwargs)
+            with profiling.step('write'):
+                self.handler.remove_operation(self.marker, *args, source_path=source_path,
+                                                **kwargs)
         elif self.pg_head.cr_op == 'update':
-            tf = Transformer(self.csts.body, self.cstd.body, *args, **kwargs)(*args, **kwargs)
-            transformed = self.F(tf.source.code, *args, **kwargs)
-            self.handler.write_operation(transformed, *args, source_path=source_path, **kwargs)
+            with profiling.step('transform'):
+                if self.csts.body is None:
+                    tf = RegionTransformer(self.csts.source_text, self.cstd.body, *args,
+                                                                    **kwargs)(*args, **kwargs)
+                else:
+                    tf = Transformer(self.csts.body, self.cstd.body, *args, **kwargs)(*args,
+                                                                                    **kwargs)
+                code = tf.code
+            if tf.resolved:
+                logprint(f"cr_anc resolved by similarity: {tf.resolved}", level='warning')
+            with profiling.step('format'):
+                self.out_code = self.F(code, *args, touched=tf.touched_lines,
+                                                source_path=source_path, **kwargs)
+            self.write(*args, source_path=source_path, **kwargs)
         elif self.pg_head.cr_op == 'create':
             # NOTE: For 'create', we use the entire content of the integration file
-            # excluding the package header, which is available in CSTD's source_text.
+            # excluding the package header, CSTD's source_text reads it on first access.
             # We must remove the package header line from the raw text.
-            raw_code = re.sub(sts.pg_header_regex, '', self.cstd.source_text, 1).strip()
-            transformed = self.F(raw_code, *args, **kwargs)
-            self.handler.write_operation(transformed, *args, source_path=source_path, **kwargs)
+            raw_code = sts.patterns['pg_header'].sub('', self.cstd.source_text, 1).strip()
+            with profiling.step('format'):
+                self.out_code = self.F(raw_code, *args, source_path=source_path, **kwargs)
+            self.write(*args, source_path=source_path, **kwargs)
+
+
+class ChainEngine:
+    """
+    Applies the update CRs of one source file in cr_id order on one parsed tree
+    (--chain, see Updater.run_chain). Every CR gets its own markers, its processing file
+    holds the state after it and, with hot, its restore manifest the state before it.
+    WHY: the source is parsed and written once instead of once per CR.
+    Unlike ProcessEngine there is no anchor preflight and no region parsing: a CR may
+    anchor on what an earlier CR of the chain added, which the symbol index of the
+    source does not know, and the one full parse is shared by all CRs. Unresolved
+    anchors stop the chain before it writes (see failed), -t validates the result.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.F = Validator_Formatter()
+        self.out_code: str = None
+        self.validation: list[dict] = None
+        # (cr, code before, code after, cr_anc not found) per CR, the checkpoints of the chain
+        self.states: list[tuple[dict, str, str, list[str]]] = []
+
+    def __call__(self, crs: list[dict], *args, hot:bool=False, pg_name:str, **kwargs
+        ) -> 'ChainEngine':
+        """crs: CrData dicts of one source_path, sorted by cr_id."""
+        source_path = crs[0]['source_path']
+        with profiling.step('parse'):
+            state = read_text(source_path)
+            tree = cst.parse_module(state)
+        touched = []
+        for cr in crs:
+            cstd = CSTDelta()
+            with profiling.step('parse'):
+                cstd(*args, source_path=cr['integration_path'], **kwargs)
+            with profiling.step('transform'):
+                tf = Transformer(tree, cstd.body, *args, cr_id=cr['cr_id'])(*args, **kwargs)
+            tree = tf.source
+            touched.extend(tf.touched_nodes)
+            self.states.append((cr, state, tree.code, [h.cr_anc for h, _ in tf.failed_ops]))
+            state = self.states[-1][2]
+        if self.failed:
+            # like a single CR, a chain with dropped ops must not reach the source
+            logprint(f"chain of {source_path} not written, cr_anc not found: {self.failed}",
+                                                                                level='error')
+            return self
+        with profiling.step('format'):
+            self.out_code = self.F(state, *args, touched=lambda: touched_lines(tree, touched),
+                                                        source_path=source_path, **kwargs)
+        with profiling.step('validate'):
+            self.validation = validate(self.out_code, *args, source_path=source_path,
+                                                                pg_name=pg_name, **kwargs)
+        with profiling.step('write'):
+            self.write(source_path, *args, hot=hot, pg_name=pg_name, **kwargs)
+        return self
+
+    @property
+    def failed(self) -> dict[str, list[str]]:
+        """cr_id -> cr_anc of the ops that could not be applied."""
+        return {cr['cr_id']: failed for cr, _, _, failed in self.states if failed}
+
+    def write(self, source_path:str, *args, hot:bool, pg_name:str, **kwargs) -> None:
+        """All processing files, restore manifests and the source in one transaction."""
+        store = BlobStore(pg_name)
+        with transaction() as t:
+            for i, (cr, before, after, _) in enumerate(self.states):
+                last = i == len(self.states) - 1
+                t.write(cr['processing_path'], self.out_code if last else after)
+                if hot:
+                    store.archive(source_path, cr['restore_path'], cr_id=cr['cr_id'],
+                                    work_file_name=cr['work_file_name'],
+                                    data=before.encode("utf-8"), tx=t)
+            if hot:
+                t.write(source_path, self.out_code)
+        logprint(f"chained {len(self.states)} CRs into {source_path}", level='info')
 
 
 class PromptEngine:
@@ -316,31 +527,23 @@ class Validator_Formatter:
     def __init__(self, *args, **kwargs):
         self.out_code: str = ""
 
-    def __call__(self, code: str, *args, use_black: bool = False, **kwargs) -> str:
+    def __call__(self, code: str, *args, use_black: bool = False, black: bool = False,
+        **kwargs) -> str:
         self.out_code = code
-        if use_black:
+        # --black arrives as black, use_black is kept for api callers
+        if use_black or black or context.current().setting('black'):
             self._format_with_black(*args, **kwargs)
         return self.out_code
 
-    def _format_with_black(self, *args, verbose: int = 0, **kwargs) -> None:
-        import shutil, subprocess
-        if not shutil.which("black"):
-            if verbose >= 1:
-                print("WARNING: --black set, but 'black' not found in PATH.")
+    def _format_with_black(self, *args, touched=None, black_scope:str=None, **kwargs) -> None:
+        """
+        touched: callable returning the line ranges a CR changed (Transformer.touched_lines).
+        With black_scope 'touched' only those ranges are formatted.
+        """
+        black_scope = black_scope or context.current().setting('black_scope')
+        lines = touched() if touched is not None and black_scope == 'touched' else None
+        if lines == []:
             return
-        try:
-            p = subprocess.run(
-                ["black", "-q", "-"],
-                input=self.out_code,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                check=False,
-            )
-            if p.returncode == 0 and p.stdout:
-                self.out_code = p.stdout
-            elif verbose >= 1:
-                print("WARNING: black returned non-zero; keeping unformatted code.")
-        except Exception as e:
-            if verbose >= 1:
-                print(f"Error running black: {e}")
+        formatted = black_format.format_code(self.out_code, *args, lines=lines, **kwargs)
+        if formatted is not None:
+            self.out_code = formatted
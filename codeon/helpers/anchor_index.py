@@ -0,0 +1,74 @@
+# anchor_index.py
+"""
+WHY: A cr_anc that misses by a typo or a renamed helper drops the whole op and costs
+another model round trip. AnchorIndex holds the candidate statements of one scope (a
+module or class body) as hashed n-gram vectors and scores an anchor against all of
+them in one matrix product. The Transformer builds it once per scope and only when an
+exact anchor lookup missed.
+"""
+import re, zlib
+
+try:
+    # optional, without numpy anchors are only matched exactly
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class AnchorIndex:
+
+    dim = 1 << 11
+    n = 3
+
+    def __init__(self, labels: list[str], kinds: list[str], *args, **kwargs):
+        """labels: name or code per statement, kinds: i.e. function, class, import."""
+        self.labels = labels
+        self.kinds = np.array(kinds)
+        rows, cols = [], []
+        for i, label in enumerate(labels):
+            grams = self.features(label)
+            rows.extend([i] * len(grams))
+            cols.extend(grams)
+        self.matrix = np.zeros((len(labels), self.dim), dtype=np.float32)
+        np.add.at(self.matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1)
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.matrix /= np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def features(cls, text: str) -> list[int]:
+        """Hashed char n-grams and word tokens (split at _ and camelCase) of text."""
+        text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text.strip())
+        words = [w for w in re.split(r"[\W_]+", text.lower()) if w]
+        padded = f" {' '.join(words)} "
+        grams = [padded[i:i + cls.n] for i in range(max(len(padded) - cls.n + 1, 1))]
+        # crc32 instead of hash(), the buckets must not change between processes
+        return [zlib.crc32(f"{k}:{g}".encode()) % cls.dim
+                                                for k, gs in (('g', grams), ('w', words))
+                                                for g in gs]
+
+    def scores(self, anchor: str, kinds: set[str], *args, **kwargs) -> 'np.ndarray':
+        """Cosine similarity of anchor to every label, -1 for labels of other kinds."""
+        q = np.zeros(self.dim, dtype=np.float32)
+        np.add.at(q, np.array(self.features(anchor), dtype=np.intp), 1)
+        q /= np.linalg.norm(q) or 1
+        return np.where(np.isin(self.kinds, list(kinds)), self.matrix @ q, -1.0)
+
+    def match(self, anchor: str, kinds: set[str], *args, min_score: float,
+        hint_score: float, margin: float = 0.05, top: int = 3, **kwargs
+        ) -> tuple[int, list[tuple[str, float]]]:
+        """
+        Returns the index of the best label if it scores min_score and is clearly ahead
+        of the next one (-1 otherwise) and the labels scoring hint_score as suggestions.
+        """
+        if not self.labels:
+            return -1, []
+        scores = self.scores(anchor, kinds)
+        order = np.argsort(-scores)[:top]
+        suggestions = [(self.labels[i], round(float(scores[i]), 3))
+                                                    for i in order if scores[i] >= hint_score]
+        best = int(order[0])
+        second = float(scores[order[1]]) if len(order) > 1 else -1.0
+        if scores[best] >= min_score and scores[best] - second >= margin:
+            return best, suggestions
+        return -1, suggestions
@@ -0,0 +1,180 @@
+# black_format.py
+"""
+WHY: Spawning `black -q -` costs interpreter and Black startup for every output file.
+Black runs in-process if it is importable, results are cached by input hash and mode,
+and multi-file runs can share a process pool (see worker_pool). The subprocess is only
+used if Black can not be imported.
+"""
+import hashlib, os, shutil, subprocess, threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import codeon.settings as sts
+import codeon.helpers.context as context
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["black_format"] = Color.CYAN
+
+try:
+    # optional, only needed with --black
+    import black
+    BLACK_AVAILABLE = True
+except ImportError:
+    BLACK_AVAILABLE = False
+
+
+# [tool.black] options that change the output, see project_config
+MODE_OPTIONS = ('line_length', 'target_version', 'skip_string_normalization',
+                'skip_magic_trailing_comma', 'preview')
+
+# (sha256 of the input, mode key) -> formatted code
+_cache: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor = None
+# worker_pool blocks that use _pool, the last one shuts it down
+_pool_users = 0
+_pool_lock = threading.Lock()
+# pyproject.toml path -> (mtime_ns, options)
+_configs: dict = {}
+
+
+def project_config(*args, source_path: str = None, work_dir: str = None, **kwargs) -> tuple:
+    """
+    [tool.black] options of the project source_path belongs to, as sorted items so they
+    can be part of the cache key. Like `black -q -` run in the project did, the target
+    project's config wins over black's defaults.
+    """
+    start = os.path.abspath(source_path or work_dir or os.getcwd())
+    if not BLACK_AVAILABLE:
+        # the black cli finds the pyproject.toml itself, see _format_subprocess
+        return (('stdin_filename', start),)
+    path = black.find_pyproject_toml((start,))
+    if path is None or not os.path.isfile(path):
+        return ()
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        if path in _configs and _configs[path][0] == mtime:
+            return _configs[path][1]
+    try:
+        config = black.parse_pyproject_toml(path)
+    except Exception as e:
+        logprint(f"reading {path} failed: {e!r}", level='warning')
+        config = {}
+    options = tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                                            for k, v in config.items() if k in MODE_OPTIONS))
+    with _lock:
+        _configs[path] = (mtime, options)
+    return options
+
+def mode_key(*args, line_length: int = None, lines: list[tuple[int, int]] = None,
+    source_path: str = None, **kwargs) -> tuple:
+    """
+    line_length only overrides the project config if set (argument or the
+    black_line_length setting), lines limits formatting to these (start, end) line ranges,
+    see Transformer.
+    """
+    config = project_config(*args, source_path=source_path, **kwargs)
+    line_length = line_length or context.current().setting('black_line_length')
+    return (config, line_length, tuple(lines or ()))
+
+def black_mode(config: tuple, line_length: int = None) -> "black.Mode":
+    options = dict(config)
+    return black.Mode(
+        target_versions={black.TargetVersion[v.upper()]
+                                                for v in options.get('target_version', ())},
+        line_length=line_length or options.get('line_length', black.DEFAULT_LINE_LENGTH),
+        string_normalization=not options.get('skip_string_normalization', False),
+        magic_trailing_comma=not options.get('skip_magic_trailing_comma', False),
+        preview=options.get('preview', False),
+    )
+
+def cache_key(code: str, *args, **kwargs) -> tuple:
+    return (hashlib.sha256(code.encode("utf-8")).hexdigest(), mode_key(*args, **kwargs))
+
+def format_code(code: str, *args, verbose: int = 0, **kwargs) -> str | None:
+    """Returns the formatted code or None if Black failed or is not installed."""
+    key = cache_key(code, *args, **kwargs)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    if BLACK_AVAILABLE:
+        pool = _pool
+        try:
+            out = pool.submit(_format_str, code, *key[1]).result() if pool is not None \
+                    else _format_str(code, *key[1])
+        except RuntimeError:
+            # the pool was shut down by its last user while this thread held it
+            out = _format_str(code, *key[1])
+    else:
+        out = _format_subprocess(code, *key[1], verbose=verbose)
+    if out is not None:
+        with _lock:
+            _cache[key] = out
+            while len(_cache) > sts.black_cache_size:
+                _cache.popitem(last=False)
+    elif verbose >= 1:
+        print("WARNING: black failed; keeping unformatted code.")
+    return out
+
+def _format_str(code: str, config: tuple, line_length: int = None, lines: tuple = ()
+    ) -> str | None:
+    """Runs inside worker processes too, so it must be a module level function."""
+    try:
+        return black.format_str(code, mode=black_mode(config, line_length), lines=lines)
+    except Exception as e:
+        logprint(f"black.format_str failed: {e!r}", level='warning')
+        return None
+
+def _format_subprocess(code: str, config: tuple, line_length: int = None, lines: tuple = (),
+    *args, verbose: int = 0, **kwargs) -> str | None:
+    if not shutil.which("black"):
+        if verbose >= 1:
+            print("WARNING: --black set, but 'black' not found in PATH.")
+        return None
+    # --stdin-filename lets black find the [tool.black] config of the target project
+    stdin_filename = dict(config).get('stdin_filename')
+    try:
+        p = subprocess.run(
+            ["black", "-q", *(("-l", str(line_length)) if line_length else ()),
+                *(f"--line-ranges={a}-{b}" for a, b in lines),
+                *(("--stdin-filename", stdin_filename) if stdin_filename else ()), "-"],
+            input=code,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            check=False,
+        )
+        return p.stdout if p.returncode == 0 and p.stdout else None
+    except Exception as e:
+        if verbose >= 1:
+            print(f"Error running black: {e}")
+        return None
+
+@contextmanager
+def worker_pool(max_workers: int = None, *args, **kwargs):
+    """
+    Formats in a shared process pool while active, used for multi-file runs
+    (see Updater.batch). The pool only starts if Black is used at all.
+    Concurrent batches share one pool, the last one to leave shuts it down.
+    """
+    global _pool, _pool_users
+    if not BLACK_AVAILABLE:
+        yield None
+        return
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+        _pool_users += 1
+        pool = _pool
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool_users -= 1
+            if _pool_users:
+                pool = None
+            else:
+                _pool = None
+        if pool is not None:
+            pool.shutdown(wait=True)
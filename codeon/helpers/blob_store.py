@@ -0,0 +1,189 @@
+# blob_store.py
+"""
+WHY: Restore copies used to be full copies of the source file per cr_id. Every file
+version is now stored once by its sha256 (zlib compressed if sts.blob_compress) and
+each CR only writes a small manifest (its restore_path) that points to the blob.
+"""
+import hashlib, json, os, time, zlib
+
+import codeon.settings as sts
+import codeon.helpers.context as context
+from codeon.helpers.file_io import transaction
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["blob_store"] = Color.CYAN
+
+
+class BlobStore:
+
+    def __init__(self, pg_name: str, *args, compress: bool = None, **kwargs):
+        self.pg_name = pg_name
+        self.blob_dir = sts.blob_dir(pg_name)
+        self.manifest_dir = sts.restore_dir(pg_name)
+        self.compress = context.current().setting('blob_compress') if compress is None \
+                                                                                else compress
+
+    # ---------- blobs ----------
+    def blob_path(self, digest: str, *args, compressed: bool = None, **kwargs) -> str:
+        compressed = self.compress if compressed is None else compressed
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}{'.z' if compressed else ''}")
+
+    def find_blob(self, digest: str, *args, **kwargs) -> str | None:
+        """Blobs stay readable if sts.blob_compress changes later."""
+        for compressed in (self.compress, not self.compress):
+            if os.path.isfile(path := self.blob_path(digest, compressed=compressed)):
+                return path
+        return None
+
+    @staticmethod
+    def hash_file(path: str, *args, **kwargs) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(sts.io_chunk_bytes):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def put(self, source_path: str, *args, tx=None, **kwargs) -> str:
+        """Stores the content of source_path once and returns its digest."""
+        digest = self.hash_file(source_path)
+        path = self.blob_path(digest)
+        if self.find_blob(digest):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with transaction(tx) as t, open(source_path, "rb") as src:
+            out = t.stage(path, exist_ok=True)
+            if out is None:
+                return digest
+            z = zlib.compressobj() if self.compress else None
+            while chunk := src.read(sts.io_chunk_bytes):
+                out.write(z.compress(chunk) if z else chunk)
+            if z:
+                out.write(z.flush())
+        return digest
+
+    def put_bytes(self, data: bytes, *args, tx=None, **kwargs) -> str:
+        """Like put, for file versions that only exist in memory (see creator.ChainEngine)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if self.find_blob(digest):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with transaction(tx) as t:
+            out = t.stage(path, exist_ok=True)
+            if out is not None:
+                out.write(zlib.compress(data) if self.compress else data)
+        return digest
+
+    def get(self, digest: str, *args, **kwargs) -> bytes:
+        path = self.find_blob(digest)
+        assert path, logprint(f"blob not found: {digest = }", level='error')
+        with open(path, "rb") as f:
+            data = f.read()
+        data = zlib.decompress(data) if path.endswith(".z") else data
+        assert hashlib.sha256(data).hexdigest() == digest, \
+        logprint(f"blob is corrupt: {path = }", level='error')
+        return data
+
+    # ---------- manifests ----------
+    def archive(self, source_path: str, restore_path: str, *args, cr_id: str,
+        work_file_name: str = None, data: bytes = None, tx=None, **kwargs) -> dict:
+        """
+        Stores source_path as blob and writes the manifest for this CR to restore_path.
+        A missing source (create op) gets a manifest with sha256 None, restore removes it.
+        data: the content source_path had before this CR, if it never was on disk.
+        """
+        exists = data is not None or os.path.isfile(source_path)
+        with transaction(tx) as t:
+            if data is not None:
+                digest, size = self.put_bytes(data, tx=t), len(data)
+            elif exists:
+                digest, size = self.put(source_path, tx=t), os.path.getsize(source_path)
+            else:
+                digest, size = None, 0
+            manifest = {
+                        'cr_id': cr_id,
+                        'work_file_name': work_file_name or os.path.basename(source_path),
+                        'source_path': os.path.abspath(source_path),
+                        'sha256': digest,
+                        'size': size,
+                        'created': time.time(),
+            }
+            t.write(restore_path, json.dumps(manifest, indent=4))
+        return manifest
+
+    @staticmethod
+    def load_manifest(restore_path: str, *args, **kwargs) -> dict:
+        with open(restore_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def manifests(self, *args, **kwargs) -> list[dict]:
+        """All manifests of the package, oldest first, each with its restore_path."""
+        out = []
+        if not os.path.isdir(self.manifest_dir):
+            return out
+        with os.scandir(self.manifest_dir) as entries:
+            for e in entries:
+                if e.is_file() and e.name.startswith("cr_") and e.name.endswith(".json"):
+                    out.append({**self.load_manifest(e.path), 'restore_path': e.path})
+        return sorted(out, key=lambda m: (m['cr_id'], m['work_file_name']))
+
+    def restore_bytes(self, restore_path: str, *args, **kwargs) -> bytes:
+        """Restore is a lookup: manifest -> blob."""
+        return self.get(self.load_manifest(restore_path)['sha256'])
+
+    def touched(self, cr_id: str, *args, explicit: bool = True, **kwargs) -> dict[str, dict]:
+        """
+        Returns {source_path: manifest} with the state of every file before cr_id
+        (explicit) or before cr_id and all later CRs (not explicit).
+        """
+        selected = [m for m in self.manifests()
+                        if (m['cr_id'] == cr_id if explicit else m['cr_id'] >= cr_id)]
+        touched = {}
+        # manifests are sorted by cr_id, the first one per file holds its oldest state
+        for m in selected:
+            touched.setdefault(m['source_path'], m)
+        return touched
+
+    # ---------- garbage collection ----------
+    def gc(self, *args, keep: int = None, days: float = None, dry: bool = False,
+        **kwargs) -> dict:
+        """
+        Retention: a manifest is dropped if it is older than days or not among the keep
+        newest manifests of its work_file_name. Blobs without any manifest are removed.
+        """
+        manifests, by_file, dropped = self.manifests(), {}, []
+        for m in manifests:
+            by_file.setdefault(m['work_file_name'], []).append(m)
+        min_created = time.time() - days * 86400 if days is not None else None
+        for ms in by_file.values():
+            for i, m in enumerate(reversed(ms)):
+                if (keep is not None and i >= keep) or \
+                    (min_created is not None and m['created'] < min_created):
+                    dropped.append(m)
+        dropped_paths = {m['restore_path'] for m in dropped}
+        # a blob shared by a kept and a dropped manifest stays
+        kept = {m['sha256'] for m in manifests if m['restore_path'] not in dropped_paths}
+        kept.discard(None)
+        orphans = [p for d, p in self._blob_paths().items() if d not in kept]
+        freed = sum(os.path.getsize(p) for p in orphans)
+        if not dry:
+            for p in [*dropped_paths, *orphans]:
+                os.remove(p)
+        logprint(f"gc {self.pg_name}: {len(dropped)} manifests, {len(orphans)} blobs, "
+                    f"{freed} bytes {'to free' if dry else 'freed'}", level='info')
+        return {
+                'pg_name': self.pg_name,
+                'manifests': len(manifests) - len(dropped),
+                'dropped_manifests': len(dropped),
+                'blobs': len(kept),
+                'removed_blobs': len(orphans),
+                'freed_bytes': freed,
+                'dry': dry,
+        }
+
+    def _blob_paths(self, *args, **kwargs) -> dict[str, str]:
+        out = {}
+        for root, dirs, files in os.walk(self.blob_dir):
+            for f in files:
+                if not f.endswith(".codeon-tmp"):
+                    out[f.removesuffix(".z")] = os.path.join(root, f)
+        return out
@@ -254,9 +254,9 @@ def pipenv_is_active(exec_path, *args, **kwargs):
     return is_active
 
 def match_file_info(text: str, *args, **kwargs):
-    if cr_match := re.compile(sts.cr_file_regex).search(str(text)):
+    if cr_match := sts.patterns['cr_file'].search(str(text)):
         return cr_match.groupdict()
-    if generic_match := re.compile(sts.file_name_regex[1:-1]).search(str(text)):
+    if generic_match := sts.patterns['file_name'].search(str(text)):
         return {'cr_id': None, 'file_name': generic_match.group(0)}
     return None
 
@@ -0,0 +1,80 @@
+# context.py
+"""
+WHY: A warm process (server, watch, update --batch) runs many CRs at once. State that
+belongs to one CR, i.e. its error log or the collected infos, must not live in module
+globals. A RequestContext carries it, the active one is found via a ContextVar, so it
+is per thread/task and does not have to be passed around (like profiling.Profiler).
+Without an active request, the process wide default context is used, it is never
+written to.
+Only the REQUEST_SETTINGS can be overridden per request, the pipeline reads them via
+RequestContext.setting. All other settings are process wide.
+
+RUN like:
+    with context.request(error_path=..., settings={'black': True}) as ctx:
+        ...
+        context.current().error_path
+"""
+from collections import ChainMap
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import codeon.settings as sts
+
+
+# settings a request can override, see RequestContext.setting for where they are read
+REQUEST_SETTINGS = frozenset({
+                                'black',
+                                'black_line_length',
+                                'black_scope',
+                                'blob_compress',
+                                'cr_index',
+                                'mmap_min_bytes',
+                                'partial_parse_min_bytes',
+                                'anchor_min_score',
+                                'anchor_hint_score',
+                                'anchor_preflight',
+})
+
+
+@dataclass
+class RequestContext:
+    # overrides of settings.py and the user settings, for this request only
+    settings: dict = field(default_factory=dict)
+    # *_error.log of the running CR, printing routes warnings and errors there
+    error_path: str | None = None
+    # lines collected by apis.info.collect_infos
+    infos: list[str] = field(default_factory=list)
+
+    def setting(self, name: str, default=None):
+        """Request override, else sts (settings.py, settings.yml, cr_settings.yml)."""
+        return ChainMap(self.settings, vars(sts)).get(name, default)
+
+
+_default = RequestContext()
+_current: ContextVar = ContextVar("codeon_request", default=None)
+
+
+def current(*args, **kwargs) -> RequestContext:
+    ctx = _current.get()
+    return _default if ctx is None else ctx
+
+def active(*args, **kwargs) -> bool:
+    """True inside a request, per CR state must only be set then."""
+    return _current.get() is not None
+
+
+@contextmanager
+def request(*args, settings: dict = None, error_path: str = None, **kwargs):
+    """Runs the block in a fresh RequestContext, nested requests inherit the settings."""
+    unknown = set(settings or ()) - REQUEST_SETTINGS
+    if unknown:
+        raise ValueError(f"{sorted(unknown)} can not be set per request, "
+                            f"supported are {sorted(REQUEST_SETTINGS)}")
+    ctx = RequestContext(settings={**current().settings, **(settings or {})},
+                            error_path=error_path)
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
@@ -0,0 +1,153 @@
+# cr_index.py
+"""
+WHY: CR state is spread over the cr dirs (prompts, jsons, integrations, processing,
+archive, logs). Listing the CRs of a package or finding the latest CR of a file meant
+globbing these dirs and parsing file names. Every CrData now writes its state into one
+SQLite catalog per package (sts.index_path), queries run on its indexes.
+"""
+import json, os, sqlite3, threading, time
+from contextlib import contextmanager
+
+import codeon.settings as sts
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["cr_index"] = Color.CYAN
+
+
+PHASE_PATHS = ('prompt_path', 'json_path', 'integration_path', 'processing_path',
+                'restore_path', 'log_path')
+
+COLUMNS = {
+            'cr_id': 'TEXT NOT NULL',
+            'work_file_name': 'TEXT NOT NULL',
+            'source_path': 'TEXT',
+            'pg_op': 'TEXT',
+            'current_phase': 'TEXT',
+            'status': 'TEXT',
+            'hot': 'INTEGER',
+            **{p: 'TEXT' for p in PHASE_PATHS},
+            'seconds': 'REAL',
+            'timings': 'TEXT',
+            'source_sha256': 'TEXT',
+            'output_sha256': 'TEXT',
+            'updated': 'REAL',
+}
+
+SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS crs ("
+    f"{', '.join(f'{c} {t}' for c, t in COLUMNS.items())}, "
+    f"PRIMARY KEY (cr_id, work_file_name))",
+    "CREATE INDEX IF NOT EXISTS crs_file ON crs (work_file_name, cr_id)",
+    "CREATE INDEX IF NOT EXISTS crs_status ON crs (status, cr_id)",
+)
+
+
+class CrIndex:
+
+    # one connection per thread and db, batch runs write from many threads
+    _local = threading.local()
+
+    def __init__(self, pg_name: str, *args, path: str = None, **kwargs):
+        self.pg_name = pg_name
+        self.path = path or sts.index_path(pg_name)
+
+    @contextmanager
+    def connect(self, *args, **kwargs):
+        cons = self._local.__dict__.setdefault('cons', {})
+        con = cons.get(self.path)
+        # the temp dir of a package can be removed while a connection is cached
+        if con is not None and not os.path.exists(self.path):
+            con.close()
+            con = None
+        if con is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=30)
+            con.row_factory = sqlite3.Row
+            # WAL lets readers (history) run while a batch is writing
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            for stmt in SCHEMA:
+                con.execute(stmt)
+            cons[self.path] = con
+        with con:
+            yield con
+
+    def record(self, cr: dict, *args, **kwargs) -> None:
+        """Upserts the state of a CR, cr is a CrData.to_dict(), None values keep the old ones."""
+        if not (cr.get('cr_id') and cr.get('work_file_name')):
+            return
+        row = {c: cr.get(c) for c in COLUMNS if cr.get(c) is not None}
+        if isinstance(row.get('timings'), list):
+            row['timings'] = json.dumps(row['timings'])
+        if row.get('source_path') is not None:
+            row['source_path'] = str(row['source_path'])
+        row['status'] = row.get('status') or self.status(cr)
+        row['updated'] = time.time()
+        cols = list(row)
+        sql = ( f"INSERT INTO crs ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                f"ON CONFLICT (cr_id, work_file_name) DO UPDATE SET "
+                f"{', '.join(f'{c} = excluded.{c}' for c in cols)}")
+        with self.connect() as con:
+            con.execute(sql, [row[c] for c in cols])
+
+    @staticmethod
+    def status(cr: dict, *args, **kwargs) -> str:
+        if cr.get('processing_file_exists'):
+            return 'done'
+        if cr.get('current_phase') or any(v for k, v in cr.items() if k.endswith('_file_exists')):
+            return 'pending'
+        return 'new'
+
+    def set_status(self, cr_id: str, work_file_name: str, status: str, *args, **kwargs) -> None:
+        self.record({'cr_id': cr_id, 'work_file_name': work_file_name, 'status': status})
+
+    def history(self, *args, work_file_name: str = None, cr_id: str = None,
+        status: str = None, limit: int = None, **kwargs) -> list[dict]:
+        """CRs newest first, filtered by file, cr_id or status."""
+        where, pars = [], []
+        for col, val in (('work_file_name', work_file_name), ('cr_id', cr_id)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                pars.append(val)
+        if status is not None:
+            where.append("status LIKE ?")
+            pars.append(f"{status}%")
+        sql = f"SELECT * FROM crs {'WHERE ' + ' AND '.join(where) if where else ''} " \
+                f"ORDER BY cr_id DESC, work_file_name"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.connect() as con:
+            return [dict(r) for r in con.execute(sql, pars)]
+
+    def latest(self, work_file_name: str, *args, **kwargs) -> dict | None:
+        rows = self.history(work_file_name=work_file_name, limit=1)
+        return rows[0] if rows else None
+
+    def rebuild(self, *args, **kwargs) -> int:
+        """
+        Indexes CRs that only exist as files, i.e. from before the index or written by
+        other tools. Scans the cr dirs once.
+        """
+        import codeon.helpers.collections as collections
+        found = {}
+        for name, (_dir, f_name) in sts.cr_paths.items():
+            if name == 'error_path' or not os.path.isdir(_dir(self.pg_name)):
+                continue
+            with os.scandir(_dir(self.pg_name)) as entries:
+                for e in entries:
+                    file_info = collections.match_file_info(e.name)
+                    if not e.is_file() or not file_info or not file_info.get('cr_id'):
+                        continue
+                    wfn = f"{os.path.splitext(file_info['file_name'])[0]}.py"
+                    # i.e. error logs and profiles share the logs dir
+                    if e.name != f_name(wfn, file_info['cr_id']):
+                        continue
+                    cr = found.setdefault((file_info['cr_id'], wfn), {
+                                'cr_id': file_info['cr_id'], 'work_file_name': wfn})
+                    cr[name] = e.path
+                    cr[name.replace('_path', '_file_exists')] = True
+        known = {(r['cr_id'], r['work_file_name']) for r in self.history()}
+        for key, cr in found.items():
+            if key not in known:
+                self.record(cr)
+        logprint(f"indexed {len(found.keys() - known)} CRs of {self.pg_name}", level='info')
+        return len(found.keys() - known)
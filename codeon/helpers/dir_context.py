@@ -34,13 +34,15 @@ class DirContext:
 
     # ---------- factories ----------
     @classmethod
-    def __call__(cls, *args, path: str | None = None, cursor_pos: int | None = None, **kwargs,
+    def __call__(cls, *args, path: str | None = None, cursor_pos: int | None = None,
+        work_dir: str | None = None, **kwargs,
     ) -> DirContext:
         """
         WHY: Make DirContext callable as a class. Builds a full context object
         from a file or directory path. Uses default project/package key config.
+        A relative path is resolved against work_dir (default: cwd).
         """
-        abs_path = cls._abs_path(path)
+        abs_path = cls._abs_path(path, work_dir)
         work_dir = cls._derive_work_dir(abs_path)
         project_dir = cls._find_root(work_dir, cls.project_key)
         package_dir = cls._find_package_dir(project_dir or work_dir, cls.package_key)
@@ -120,9 +122,10 @@ class DirContext:
 
     # ---------- helpers (small, focused) ----------
     @staticmethod
-    def _abs_path(path: str | None) -> str:
-        if path: return os.path.abspath(path)
-        return os.path.abspath(os.getcwd())
+    def _abs_path(path: str | None, work_dir: str | None = None) -> str:
+        base = work_dir or os.getcwd()
+        if path: return os.path.abspath(os.path.join(base, path))
+        return os.path.abspath(base)
 
     @staticmethod
     def _derive_work_dir(path: str) -> str:
@@ -0,0 +1,256 @@
+# file_io.py
+"""
+WHY: Generated modules and integration files can get very large. Files above
+sts.mmap_min_bytes are memory mapped, so header searches run on the mapped bytes and
+only the slices that are actually parsed get decoded into str.
+"""
+import mmap, os, shutil, tempfile, threading
+from contextlib import contextmanager
+
+import codeon.settings as sts
+import codeon.helpers.context as context
+
+
+class MappedFile:
+    """
+    Read only view on a file, mapped if it is large, read into bytes otherwise.
+    Use as context manager, the map must not be used after close().
+    """
+
+    def __init__(self, path: str, *args, min_bytes: int = None, **kwargs):
+        self.path = path
+        self.min_bytes = context.current().setting('mmap_min_bytes') if min_bytes is None \
+                                                                                else min_bytes
+        self.data: mmap.mmap | bytes = b""
+        self.is_mapped: bool = False
+        self._f = None
+
+    def __enter__(self) -> "MappedFile":
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def open(self, *args, **kwargs) -> "MappedFile":
+        self._f = open(self.path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        # empty files can not be mapped
+        if size and size >= self.min_bytes:
+            self.data = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.is_mapped = True
+        else:
+            self.data = self._f.read()
+        return self
+
+    def close(self, *args, **kwargs) -> None:
+        if self.is_mapped:
+            self.data.close()
+            self.is_mapped = False
+        self.data = b""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def text(self, start: int = 0, end: int = None, *args, errors: str = "strict",
+        **kwargs) -> str:
+        """
+        Decodes data[start:end], the whole file if no slice is given.
+        Newlines are translated like open(path).read() does, \r\n and \r become \n.
+        """
+        end = len(self.data) if end is None else end
+        if start == 0 and end == len(self.data):
+            # str() decodes straight from the buffer without an intermediate bytes copy
+            return universal_newlines(str(self.data, "utf-8", errors))
+        return universal_newlines(str(memoryview(self.data)[start:end], "utf-8", errors))
+
+    def finditer(self, pattern, *args, **kwargs):
+        """pattern must be a bytes pattern like sts.patterns['b_unit_header']."""
+        return pattern.finditer(self.data)
+
+    def findall(self, pattern, *args, **kwargs) -> list:
+        return pattern.findall(self.data)
+
+
+class BytesView(MappedFile):
+    """MappedFile interface on bytes in memory, for texts that never were written to disk."""
+
+    def __init__(self, data: bytes, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self._data = data
+
+    def open(self, *args, **kwargs) -> "BytesView":
+        self.data = self._data
+        return self
+
+
+def universal_newlines(text: str) -> str:
+    # most files have no \r at all, the check avoids copying them
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_text(path: str, *args, errors: str = "strict", **kwargs) -> str:
+    """Drop in for open(path).read(), maps the file if it is large."""
+    with MappedFile(path, *args, **kwargs) as mf:
+        return mf.text(errors=errors)
+
+
+def stream_wrapped(path: str, source_path: str, *args, head: str = "", tail: str = "",
+    tx: "AtomicWriter" = None, **kwargs) -> None:
+    """Writes head + content of source_path + tail to path without loading the source."""
+    with transaction(tx) as t, open(source_path, "rb") as src:
+        out = t.stage(path)
+        out.write(head.encode("utf-8"))
+        shutil.copyfileobj(src, out, sts.io_chunk_bytes)
+        out.write(tail.encode("utf-8"))
+
+
+class AtomicWriter:
+    """
+    All or nothing writes for the files of one CR (processing, restore and source file).
+    Content goes to temp files next to the targets, commit() fsyncs all of them in one
+    round, then renames them into place. If any step fails, every target is rolled back.
+    """
+
+    tmp_suffix = ".codeon-tmp"
+    bak_suffix = ".codeon-bak"
+
+    def __init__(self, *args, fsync: bool = True, **kwargs):
+        self.fsync = fsync
+        # target path -> open temp file, in staging order
+        self.staged: dict[str, object] = {}
+        # target path -> temp path, unique per writer so parallel transactions never share it
+        self.tmps: dict[str, str] = {}
+        # content addressed targets (blobs) that stay as they are if they exist already
+        self.keep: set[str] = set()
+        self.removals: list[str] = []
+        # the files of one CR may be written by many threads (see Updater.run_cr)
+        self.lock = threading.Lock()
+
+    def stage(self, path: str, *args, exist_ok: bool = False, **kwargs):
+        """
+        Returns a binary file to write the new content of path into.
+        exist_ok: returns None if path is staged already, i.e. a blob both files share.
+            Such a path is content addressed, commit keeps it if another writer was first.
+        """
+        with self.lock:
+            if exist_ok and path in self.staged:
+                return None
+            assert path not in self.staged, f"{path} is staged twice"
+            fd, self.tmps[path] = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                prefix=f"{os.path.basename(path)}.", suffix=self.tmp_suffix)
+            self.staged[path] = os.fdopen(fd, "wb")
+            if exist_ok:
+                self.keep.add(path)
+            return self.staged[path]
+
+    def write(self, path: str, content: str | bytes, *args, **kwargs) -> None:
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self.stage(path).write(content)
+
+    def copy(self, source_path: str, path: str, *args, **kwargs) -> None:
+        with open(source_path, "rb") as src:
+            shutil.copyfileobj(src, self.stage(path), sts.io_chunk_bytes)
+
+    def remove(self, path: str, *args, **kwargs) -> None:
+        self.removals.append(path)
+
+    def commit(self, *args, **kwargs) -> None:
+        done = []
+        try:
+            for f in self.staged.values():
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                f.close()
+            for path in [*self.staged, *self.removals]:
+                if path in self.keep and os.path.exists(path):
+                    # another writer committed the same content first
+                    continue
+                if os.path.exists(path):
+                    self._backup(path)
+                done.append(path)
+                if path in self.staged:
+                    os.replace(self.tmps[path], path)
+            if self.fsync:
+                self._fsync_dirs(done)
+        except BaseException:
+            self._restore(done)
+            raise
+        finally:
+            self._cleanup()
+        for path in done:
+            if os.path.exists(f"{path}{self.bak_suffix}"):
+                os.remove(f"{path}{self.bak_suffix}")
+        self.staged, self.tmps, self.keep, self.removals = {}, {}, set(), []
+
+    def rollback(self, *args, **kwargs) -> None:
+        """Drops everything staged, targets were not touched yet."""
+        self._cleanup()
+        self.staged, self.tmps, self.keep, self.removals = {}, {}, set(), []
+
+    def _backup(self, path: str) -> None:
+        bak = f"{path}{self.bak_suffix}"
+        if path in self.removals and path not in self.staged:
+            os.replace(path, bak)
+            return
+        # the original stays in place until the rename replaces it
+        try:
+            os.link(path, bak)
+        except OSError:
+            shutil.copy2(path, bak)
+
+    def _restore(self, done: list[str]) -> None:
+        for path in reversed(done):
+            bak = f"{path}{self.bak_suffix}"
+            if os.path.exists(bak) and os.path.exists(path) and os.path.samefile(bak, path):
+                # rename is a no op for two hard links of the same file
+                os.remove(bak)
+            elif os.path.exists(bak):
+                os.replace(bak, path)
+            elif os.path.exists(path):
+                # the target did not exist before this transaction
+                os.remove(path)
+
+    def _cleanup(self) -> None:
+        for path, f in self.staged.items():
+            f.close()
+            if os.path.exists(self.tmps[path]):
+                os.remove(self.tmps[path])
+
+    def _fsync_dirs(self, paths: list[str]) -> None:
+        """One fsync per directory makes the renames durable."""
+        for d in {os.path.dirname(os.path.abspath(p)) for p in paths}:
+            try:
+                fd = os.open(d, os.O_RDONLY)
+            except OSError:
+                # directories can not be opened on windows
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+@contextmanager
+def transaction(tx: AtomicWriter = None, *args, **kwargs):
+    """
+    Joins tx if given, its owner commits. Otherwise runs its own AtomicWriter
+    that commits on exit and rolls back on any error.
+    """
+    if tx is not None:
+        yield tx
+        return
+    tx = AtomicWriter(*args, **kwargs)
+    try:
+        yield tx
+    except BaseException:
+        tx.rollback()
+        raise
+    tx.commit()
@@ -1,7 +1,7 @@
 """
 printing.py
 """
-import os, re, time
+import os, re, reprlib, time
 from datetime import datetime as dt
 from colorama import Fore, Back, Style
 import codeon.settings as sts
@@ -55,10 +55,34 @@ def pretty_prompt(prompt:str, *args, verbose:int=0, **kwargs) -> str:
         print(f"{p.strip()}")
     return p
 
-def pretty_dict(name:str, d:dict, *args, color=Fore.CYAN, **kwargs):
+_repr = reprlib.Repr()
+_repr.maxlevel, _repr.maxdict, _repr.maxlist = 2, 12, 12
+_repr.maxstring = _repr.maxother = sts.pretty_max_chars
+
+def shorten(v, *args, max_chars:int=sts.pretty_max_chars, **kwargs) -> str:
+    """
+    WHY: Values can hold whole source files. They are cut before any wrapping or coloring,
+    so the formatting cost does not grow with the CR payload.
+    """
+    if isinstance(v, str):
+        return v if len(v) <= max_chars else f"{v[:max_chars]} ... [{len(v)} chars]"
+    if v is None or isinstance(v, (bool, int, float)):
+        return v
+    return _repr.repr(v)
+
+def pretty_dict(name:str, d:dict, *args, color=Fore.CYAN, level:str=None, **kwargs):
+    """
+    Prints d if level is shown (see logprint), d can be a callable returning the dict,
+    it is only called if the dict gets printed.
+    """
+    if not is_enabled(level):
+        return
+    if callable(d):
+        d = d()
+    flush_logs()
     print(f"\n{color}{name} {Fore.RESET}\n{'*' * len(name)}")
     for k, v in d.items():
-        print(f"{color}{k}: {Fore.RESET}{v}")
+        print(f"{color}{k}: {Fore.RESET}{shorten(v)}")
 
 def dict_to_table(name:str, d:dict, *args, **kwargs):
     tbl_dict = wrap_table(d, *args, **kwargs)
@@ -67,7 +91,9 @@ def dict_to_table(name:str, d:dict, *args, **kwargs):
     colored_table_underline(tbl, *args, **kwargs)
 
 
-def records_to_table(name:str, records:list, *args, **kwargs):
+def records_to_table(name:str, records:list, *args, level:str=None, **kwargs):
+    if not (records and is_enabled(level)):
+        return
     # Extract headers from the keys of the first result
     wrapped_records = []
     for record in records:
@@ -80,6 +106,7 @@ def records_to_table(name:str, records:list, *args, **kwargs):
     colored_table_underline(tb(table, headers=headers), *args, **kwargs)
 
 def colored_table_underline(tbl, *args, up_to:int=0, color=Fore.CYAN, **kwargs):
+    flush_logs()
     print('\n')
     for i, line in enumerate(tbl.split('\n')):
         if i <= up_to:
@@ -124,11 +151,11 @@ def wrap_table(d:dict, *args, **kwargs):
     tbl_dict = dict(**d)
     for kk, vs in d.items():
         if type(vs) == str:
-            tbl_dict[kk] = wrap_text(vs, *args, **kwargs)
+            tbl_dict[kk] = wrap_text(shorten(vs), *args, **kwargs)
         elif type(vs) == dict:
-            tbl_dict[kk] = wrap_text('\n'.join([f"{Fore.CYAN}{k}{Fore.RESET}: {str(v)}" for k, v in vs.items()]))
+            tbl_dict[kk] = wrap_text('\n'.join([f"{Fore.CYAN}{k}{Fore.RESET}: {shorten(v)}" for k, v in vs.items()]))
         elif type(vs) == list:
-            tbl_dict[kk] = wrap_text('\n'.join([str(v) for v in vs]))
+            tbl_dict[kk] = wrap_text('\n'.join([str(shorten(v)) for v in vs]))
     return tbl_dict
 
 def normalize_max_chars(max_chars:int, text, *args, **kwargs):
@@ -240,16 +267,89 @@ def clean_pipe_text(text: str) -> str:
     return t
 
 # logging and printing
-import inspect, logging
+import atexit, logging, queue, sys
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
 from enum import Enum
 from colorama import Fore, Style
+import codeon.helpers.context as context
 
 # ── logger setup ────────────────────────────────────────────────
+# WHY: logprint is called in hot loops. Console and file output go through a queue,
+# a listener thread does the actual writing, so the caller only pays for a put().
+_log_queue: queue.Queue = queue.Queue(-1)
+
 event_logger = logging.getLogger("event_logger")
 event_logger.setLevel(logging.INFO)
 event_logger.propagate = False
-if not event_logger.handlers:
-    event_logger.addHandler(logging.NullHandler())
+console_logger = logging.getLogger("codeon.console")
+console_logger.setLevel(logging.DEBUG)
+console_logger.propagate = False
+for _logger in (event_logger, console_logger):
+    if not any(isinstance(h, QueueHandler) for h in _logger.handlers):
+        _logger.addHandler(QueueHandler(_log_queue))
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """Writes to the current sys.stdout, which may be replaced after import (tests)."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _FileRouter(logging.Handler):
+    """
+    Writes each record to the *_error.log of the CR that logged it (record.error_path,
+    see logprint). Concurrent CRs log to their own files. Only the listener thread
+    calls emit, the least recently used files are closed.
+    """
+    max_open = 32
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.targets: OrderedDict[str, logging.Handler] = OrderedDict()
+
+    def emit(self, record):
+        p = getattr(record, "error_path", None)
+        if not (isinstance(p, str) and p.endswith("_error.log")):
+            return
+        try:
+            if p not in self.targets:
+                self.targets[p] = _file_handler(p)
+                if len(self.targets) > self.max_open:
+                    self.targets.popitem(last=False)[1].close()
+            self.targets.move_to_end(p)
+            self.targets[p].handle(record)
+        except Exception:
+            # the listener thread must keep running
+            self.handleError(record)
+
+    def close(self):
+        for h in self.targets.values():
+            h.close()
+        self.targets.clear()
+        super().close()
+
+
+_console_handler = _ConsoleHandler()
+_console_handler.addFilter(lambda r: r.name == console_logger.name)
+_file_router = _FileRouter()
+_file_router.addFilter(lambda r: r.name == event_logger.name)
+_listener = QueueListener(_log_queue, _console_handler, _file_router)
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def flush_logs(*args, **kwargs) -> None:
+    """Blocks until all queued messages are written, keeps print() output in order."""
+    # after _listener.stop() nobody would empty the queue anymore
+    if _listener._thread is not None:
+        _log_queue.join()
 
 
 # ── color enums & mappings ──────────────────────────────────────
@@ -271,61 +371,75 @@ LEVEL_COLORS = dict(
     dev=Color.YELLOW,
 )
 
+LEVELS = dict(dev=5, debug=10, info=20, warning=30, error=40)
+
 MODULE_COLORS: dict[str, Color] = {}
 
+_threshold: int = LEVELS.get(sts.log_level, LEVELS["info"])
+
+
+def set_level(level: str, *args, **kwargs) -> None:
+    """Lowest level logprint still shows, i.e. 'dev' for -v 2."""
+    global _threshold
+    _threshold = LEVELS[level.lower()]
+
+
+def is_enabled(level: str = None, *args, **kwargs) -> bool:
+    """Callers can skip building expensive messages, logprint checks this itself."""
+    return LEVELS.get("info" if level is None else level.lower(), LEVELS["info"]) >= _threshold
+
 
 # ── internals ───────────────────────────────────────────────────
-def _caller_info() -> tuple[str, str, str]:
-    f = inspect.currentframe().f_back.f_back
+def _caller_info(depth: int = 2) -> tuple[str, str, str]:
+    # sys._getframe avoids the inspect module overhead, only called if a message is shown
+    f = sys._getframe(depth)
     cls = f.f_locals.get("self")
     mod = f.f_globals.get("__name__", "")
     return mod, (cls.__class__.__name__ if cls else ""), f.f_code.co_name
 
 
-def _ready_logger(*args, p: str | None, **kwargs) -> None:
-    """Attach file handler only once *_error.log is ready."""
-    if not (isinstance(p, str) and p.endswith("_error.log")):
-        return
-    if any(not isinstance(h, logging.NullHandler) for h in event_logger.handlers):
-        return
-    import os
+def _file_handler(p: str) -> logging.Handler:
     os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
     h = logging.FileHandler(p, encoding="utf-8")
     h.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
-    event_logger.addHandler(h)
+    return h
 
 
 # ── public API ──────────────────────────────────────────────────
-def logprint(msg: str, *, level: str = None, print_to_console: bool = True, **kwargs) -> str:
+def logprint(msg, *, level: str = None, print_to_console: bool = True, **kwargs) -> str:
     """
     Only WARNING and ERROR are logged.
     INFO/DEBUG remain console-only.
+    Messages below sts.log_level return right away, msg can be a callable that builds
+    the message, it is only called if the message is shown.
     """
-    try:
-        _ready_logger(p=getattr(sts, "error_path", None))
-    except Exception:
-        pass
-
     p_level = "" if level is None else level.lower()
-    level = "info" if level is None else level.lower()
+    level = "info" if level is None else p_level
+    logged = level in ("warning", "error")
+    shown = print_to_console and is_enabled(level)
+    if not (logged or shown):
+        return msg
+    if callable(msg):
+        msg = msg()
 
     mod, cls, func = _caller_info()
     mod = mod.split(".")[-1]
     origin = f"{mod}.{cls + '.' if cls else ''}{func} {p_level.upper()}"
 
-    style = Style.BRIGHT if p_level in {"debug", "dev"} else Style.NORMAL if p_level else Style.DIM
-    color = (
-        LEVEL_COLORS[level]
-        if level in ("error", "warning", "debug", "dev")
-        else MODULE_COLORS.get(mod, LEVEL_COLORS["info"])
-    )
-
-    # log only warnings and errors
-    if level in ("warning", "error"):
-        getattr(event_logger, level, event_logger.warning)(f"{origin}:\n{msg}\n")
-
-    # always print
-    if print_to_console:
-        print(f"\n{color.value}{style}{origin}:\n{Fore.RESET}{msg}{Style.RESET_ALL}\n")
+    # log only warnings and errors, to the error log of the running request
+    if logged:
+        getattr(event_logger, level, event_logger.warning)(f"{origin}:\n{msg}\n",
+                                        extra={"error_path": context.current().error_path})
+
+    if shown:
+        style = (Style.BRIGHT if p_level in {"debug", "dev"}
+                    else Style.NORMAL if p_level else Style.DIM)
+        color = (
+            LEVEL_COLORS[level]
+            if level in ("error", "warning", "debug", "dev")
+            else MODULE_COLORS.get(mod, LEVEL_COLORS["info"])
+        )
+        console_logger.info(
+                    f"\n{color.value}{style}{origin}:\n{Fore.RESET}{msg}{Style.RESET_ALL}\n")
 
     return msg
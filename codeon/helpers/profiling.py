@@ -0,0 +1,151 @@
+# profiling.py
+"""
+WHY: Shows where the time of a CR goes. Every step records wall time, cpu time of the
+running thread, peak RSS and the IO syscalls/bytes of the process. Steps nest, so
+'processing.transform' is a sub step of the processing phase.
+Code deep down the call stack uses step(name), the active Profiler is found via a
+ContextVar, so it does not have to be passed around. Without an active Profiler,
+step() does nothing.
+"""
+import cProfile, os, sys, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import codeon.settings as sts
+
+try:
+    # optional, linux and mac only
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    # optional, used if /proc is not available (windows, mac)
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+_profiler: ContextVar = ContextVar("codeon_profiler", default=None)
+_path: ContextVar = ContextVar("codeon_profile_path", default=())
+
+
+class Profiler:
+
+    def __init__(self, *args, **kwargs):
+        self.records: list[dict] = []
+
+    @contextmanager
+    def activate(self, *args, **kwargs):
+        """Makes this the profiler step() reports to, in this thread/context only."""
+        token = _profiler.set(self)
+        try:
+            yield self
+        finally:
+            _profiler.reset(token)
+
+    @contextmanager
+    def step(self, name: str, *args, **kwargs):
+        token = _path.set((*_path.get(), name))
+        start = snapshot()
+        try:
+            yield
+        finally:
+            self.records.append(diff(".".join(_path.get()), start, snapshot()))
+            _path.reset(token)
+
+    def add(self, name: str, wall: float, *args, **kwargs) -> None:
+        """Adds a step that was measured elsewhere, i.e. settings import time."""
+        self.records.append({'step': name, 'wall_s': round(wall, 4)})
+
+    def table(self, *args, **kwargs) -> list[dict]:
+        """Records with the same keys, as printing.records_to_table expects."""
+        keys = list(dict.fromkeys(k for r in self.records for k in r))
+        return [{k: r.get(k) for k in keys} for r in self.records]
+
+
+@contextmanager
+def step(name: str, *args, **kwargs):
+    """Measures the block as sub step of the running step, if a Profiler is active."""
+    p = _profiler.get()
+    if p is None:
+        yield
+        return
+    with p.step(name, *args, **kwargs):
+        yield
+
+
+# ---------- measurements ----------
+def snapshot() -> dict:
+    return {
+            'wall': time.perf_counter(),
+            'cpu': time.thread_time(),
+            **io_counters(),
+    }
+
+def diff(name: str, a: dict, b: dict) -> dict:
+    r = {
+            'step': name,
+            'wall_s': round(b['wall'] - a['wall'], 4),
+            'cpu_s': round(b['cpu'] - a['cpu'], 4),
+            'peak_rss_mb': peak_rss_mb(),
+    }
+    for k in ('syscr', 'syscw', 'read_bytes', 'write_bytes'):
+        if k in a and k in b:
+            r[k] = b[k] - a[k]
+    return r
+
+def peak_rss_mb() -> float | None:
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on mac, kilobytes everywhere else
+        return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+    if PSUTIL_AVAILABLE:
+        mem = psutil.Process().memory_info()
+        return round(getattr(mem, 'peak_wset', mem.rss) / (1 << 20), 1)
+    return None
+
+def io_counters() -> dict:
+    """Process wide IO counters, in batch runs they include the other threads."""
+    try:
+        with open('/proc/self/io', 'rb') as f:
+            pairs = (l.split(b':') for l in f.read().splitlines())
+            io = {k.decode(): int(v) for k, v in pairs}
+        return {k: io[k] for k in ('syscr', 'syscw', 'read_bytes', 'write_bytes')}
+    except (OSError, KeyError, ValueError):
+        pass
+    if PSUTIL_AVAILABLE:
+        try:
+            c = psutil.Process().io_counters()
+            return {'syscr': c.read_count, 'syscw': c.write_count,
+                    'read_bytes': c.read_bytes, 'write_bytes': c.write_bytes}
+        except (AttributeError, psutil.Error):
+            pass
+    return {}
+
+
+# ---------- cProfile dumps ----------
+@contextmanager
+def cprofile(path: str, *args, **kwargs):
+    """
+    Dumps a cProfile of the block to path if the env var sts.profile_env_var is set.
+    Inspect with: python -m pstats <path>
+    """
+    if path is None or not os.environ.get(sts.profile_env_var):
+        yield None
+        return
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # only one profiler can be active at a time, i.e. in batch runs
+        yield None
+        return
+    try:
+        yield prof
+    finally:
+        prof.disable()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        prof.dump_stats(path)
@@ -12,22 +12,20 @@ import codeon.headers as headers
 
 class JsonParser:
     """
-    Progressive JSON recovery: try strict first, then minimal safe repairs.
+    Progressive JSON recovery: try strict first, then one tolerant scan with minimal repairs.
     WHY: tolerate LLM/paste noise while converging to valid JSON deterministically.
     """
 
     def __init__(self, *args, text: str, **kwargs) -> None:
         self.raw_string = text
-        # Use dict instead of Optional[Dict]
-        self.data: dict = None
+        # a single CR dict or a list of CR dicts (one per target file)
+        self.data: dict | list[dict] = None
         self.strategies = [
             self._strategy_strict_parse,
-            self._strategy_find_json_block,
-            self._strategy_fix_trailing_commas,
-            self._strategy_fix_quotes_and_commas,
+            self._strategy_scan_repair,
         ]
 
-    def __call__(self, *args, **kwargs) -> dict | None:
+    def __call__(self, *args, **kwargs) -> dict | list[dict] | None:
         if not self.raw_string:
             return None
         self.parse(*args, **kwargs)
@@ -37,51 +35,118 @@ class JsonParser:
         """Applies parsing strategies sequentially until one succeeds."""
         for s in self.strategies:
             d = s(*args, **kwargs)
-            if d is not None and d.get(sts.target_key):
+            if self._is_cr(d):
                 self.data = d
                 break
 
-    def _strategy_strict_parse(self, *args, **kwargs) -> dict | None:
+    @staticmethod
+    def _is_cr(d) -> bool:
+        """A CR is a dict with a target, or a non empty list of those."""
+        if isinstance(d, list):
+            return bool(d) and all(isinstance(r, dict) and r.get(sts.target_key) for r in d)
+        return isinstance(d, dict) and bool(d.get(sts.target_key))
+
+    def _strategy_strict_parse(self, *args, **kwargs) -> dict | list | None:
         """Try standard JSON decoding."""
         try:
-            return json.loads(self.raw_string)
+            d = json.loads(self.raw_string)
+            return d if isinstance(d, (dict, list)) else None
         except json.JSONDecodeError:
             return None
 
-    def _strategy_find_json_block(self, *args, **kwargs) -> dict | None:
-        """Find the outermost JSON block in the string."""
-        m = re.search(r"\{[\s\S]*\}", self.raw_string)
-        if not m:
-            return None
-        prev_string = self.raw_string
-        self.raw_string = m.group(0)
-        d = self._strategy_strict_parse(*args, **kwargs)
-        # Restore original if parsing failed
-        self.raw_string = self.raw_string if d is not None else prev_string
-        return d
-
-    def _strategy_fix_trailing_commas(self, *args, **kwargs) -> dict | None:
-        """Remove trailing commas before closing braces/brackets."""
-        cleaned = re.sub(r",\s*([\}\]])", r"\1", self.raw_string)
-        if cleaned == self.raw_string:
-            return None
-        prev_string = self.raw_string
-        self.raw_string = cleaned
-        d = self._strategy_strict_parse(*args, **kwargs)
-        # Restore original if parsing failed
-        self.raw_string = self.raw_string if d is not None else prev_string
-        return d
-
-    def _strategy_fix_quotes_and_commas(self, *args, **kwargs) -> dict | None:
-        """Fix missing commas between objects and replace single quotes."""
-        s = re.sub(r'(["\]\}])\s*\n\s*(["\[\{])', r"\1,\n\2", self.raw_string)
-        s = s.replace("'", '"')
-        prev_string = self.raw_string
-        self.raw_string = s
-        d = self._strategy_strict_parse(*args, **kwargs)
-        # Restore original if parsing failed
-        self.raw_string = self.raw_string if d is not None else prev_string
-        return d
+    def _strategy_scan_repair(self, *args, **kwargs) -> dict | list | None:
+        """
+        Scans top level {...} or [...] blocks in one pass and decodes the first CR block.
+        Repairs trailing commas, missing commas between lines and single quotes on the way.
+        """
+        start = self._find_block(self.raw_string, 0)
+        while start != -1:
+            repaired, end = self._scan_block(self.raw_string, start)
+            if repaired is not None:
+                try:
+                    d = json.loads(repaired, strict=False)
+                    if self._is_cr(d):
+                        self.raw_string = repaired
+                        return d
+                except json.JSONDecodeError:
+                    pass
+            start = self._find_block(self.raw_string, end)
+        return None
+
+    @staticmethod
+    def _find_block(s: str, pos: int) -> int:
+        starts = [i for i in (s.find("{", pos), s.find("[", pos)) if i != -1]
+        return min(starts) if starts else -1
+
+    # outside of strings we step token wise, inside strings we jump to the next special char
+    _scan_tokens = re.compile(r"""\s+|[{}\[\],"']|[^\s{}\[\],"']+""")
+    _scan_string = {'"': re.compile(r'[\\"]'), "'": re.compile(r"""[\\'"]""")}
+    _dq_string = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+    _sq_escape = re.compile(r"\\[\\']")
+
+    @classmethod
+    def _scan_block(cls, s: str, start: int) -> tuple[str | None, int]:
+        """
+        Brace matches the block starting at s[start] and returns (repaired_text, end).
+        Strings are copied as is, except that single quoted strings become double quoted.
+        repaired_text is None if the block is never closed.
+        """
+        out, depth, quote, i, n = [], 0, None, start, len(s)
+        # last significant token outside of strings, deferred comma, newline since last
+        last, comma, newline = "", False, False
+        while i < n:
+            if quote:
+                m = cls._scan_string[quote].search(s, i)
+                if m is None:
+                    return None, n
+                out.append(s[i:m.start()])
+                c, i = m.group(), m.end()
+                if c == "\\":
+                    # \' is no valid json escape
+                    out.append("'" if s[i:i + 1] == "'" else s[i - 1:i + 1])
+                    i += 1
+                elif c == quote:
+                    out.append('"')
+                    quote, last = None, '"'
+                else:
+                    out.append('\\"')
+                continue
+            m = cls._scan_tokens.match(s, i)
+            t, i = m.group(), m.end()
+            if t.isspace():
+                newline = newline or "\n" in t
+                out.append(t)
+                continue
+            if t == ",":
+                comma = True
+                continue
+            if comma and t not in "}]":
+                out.append(",")
+            elif not comma and newline and last and last in '"}]' and t[0] in "\"'{[":
+                out.append(",")
+            comma, newline = False, False
+            if t == '"' and (m := cls._dq_string.match(s, i - 1)):
+                # well formed double quoted strings are copied in one go
+                g = m.group()
+                if "\\'" in g:
+                    g = cls._sq_escape.sub(lambda e: e.group()[-1] if e.group() == "\\'"
+                                                                    else e.group(), g)
+                out.append(g)
+                i, last = m.end(), '"'
+                continue
+            if t in "\"'":
+                quote = t
+                out.append('"')
+                continue
+            out.append(t)
+            last = t[-1]
+            if t in "{[":
+                depth += 1
+            elif t in "}]":
+                depth -= 1
+                if depth == 0:
+                    return "".join(out), i
+        return None, n
 
 
 class MdParser:
@@ -113,9 +178,9 @@ class MdParser:
 
     def _clean_content(self, *args, **kwargs) -> str | None:
         """WHY: Strip header/fences, then decode one JSON layer if present."""
-        m = re.compile(sts.pg_header_regex, re.DOTALL).search(self.raw_string)
+        m = sts.patterns['pg_header'].search(self.raw_string)
         c = self.raw_string[m.start():] if m else self.raw_string
-        c = re.compile(sts.md_fence_regex, re.MULTILINE).sub("", c).strip()
+        c = sts.patterns['md_fence'].sub("", c).strip()
         try: return self._jsonish_to_text(*args, s=c, **kwargs).strip()
         except Exception as e:
             logprint(f"MdParser._clean_content decode failed: {e!r}", level="warning")
@@ -134,7 +199,7 @@ class MdParser:
 
     def _validate_package_header(self, content: str, *args, **kwargs) -> bool:
         """Checks for and structurally validates the package header."""
-        header_match = re.compile(sts.pg_header_regex, re.MULTILINE).search(content)
+        header_match = sts.patterns['pg_header'].search(content)
         if not header_match:
             print(f"{Fore.RED}MdParser Error:{Fore.RESET} Missing package header.\n{content = }")
             return False
@@ -0,0 +1,217 @@
+# symbol_index.py
+"""
+WHY: A wrong cr_anc was only found inside the Transformer, after source and integration
+file had been parsed by libcst. The SymbolIndex holds the modules, classes, methods,
+functions, imports and top level statements of a package, read with ast and stored in
+sts.symbol_index_path(pg_name). A file is only read again if its mtime or size changed.
+preflight() checks every cr_anc of an integration file against it in milliseconds,
+before any libcst work starts.
+"""
+import ast, json, os, textwrap, threading
+
+import codeon.settings as sts
+from codeon.headers import CrHeads
+from codeon.helpers.file_io import read_text, transaction
+from codeon.helpers.anchor_index import AnchorIndex, NUMPY_AVAILABLE
+import codeon.helpers.context as context
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["symbol_index"] = Color.CYAN
+
+
+def normalize(s: str) -> str:
+    """Like _BaseOpMixin._normalize, anchors given as code are compared this way."""
+    return s.replace(" ", "").replace("\t", "").lower()
+
+
+def module_symbols(text: str) -> dict:
+    """Top level symbols of a module text, empty if it does not parse."""
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        return {'functions': [], 'classes': {}, 'imports': [], 'statements': []}
+    functions, classes, imports, statements = [], {}, [], []
+    for prev, node in zip([None, *tree.body], tree.body):
+        if prev is not None and node.lineno == prev.end_lineno:
+            # a; b is one libcst statement line, the Transformer only matches a
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(node.name)
+        elif isinstance(node, ast.ClassDef):
+            classes[node.name] = [n.name for n in node.body
+                                    if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(ast.get_source_segment(text, node) or ast.unparse(node))
+        else:
+            statements.append(normalize(ast.get_source_segment(text, node) or ast.unparse(node)))
+    return {'functions': functions, 'classes': classes, 'imports': imports,
+                                                                    'statements': statements}
+
+
+class SymbolIndex:
+
+    # one instance per index file, shared by the threads of a process
+    _instances: dict[str, 'SymbolIndex'] = {}
+    _lock = threading.Lock()
+
+    def __new__(cls, pg_name: str, *args, path: str = None, **kwargs):
+        path = path or sts.symbol_index_path(pg_name)
+        with cls._lock:
+            if path not in cls._instances:
+                inst = super().__new__(cls)
+                inst.pg_name, inst.path, inst.lock = pg_name, path, threading.RLock()
+                inst.files = inst.load()
+                cls._instances[path] = inst
+            return cls._instances[path]
+
+    def load(self, *args, **kwargs) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self, *args, **kwargs) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with transaction(fsync=False) as t:
+            t.write(self.path, json.dumps(self.files))
+
+    def _update(self, path: str, st: os.stat_result, *args, **kwargs) -> bool:
+        """Reads path again if it changed, True if it did."""
+        entry = self.files.get(path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return False
+        self.files[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                            **module_symbols(read_text(path, errors="replace"))}
+        return True
+
+    def symbols(self, path: str, *args, **kwargs) -> dict | None:
+        """Symbols of one file, refreshed if the file changed since it was indexed."""
+        path = os.path.abspath(path)
+        with self.lock:
+            try:
+                changed = self._update(path, os.stat(path))
+            except FileNotFoundError:
+                changed = self.files.pop(path, None) is not None
+            if changed:
+                self.save()
+            return self.files.get(path)
+
+    def refresh(self, project_dir: str, *args, **kwargs) -> dict:
+        """Indexes all .py files below project_dir, only changed files are read."""
+        seen, changed = set(), 0
+        with self.lock:
+            for root, dirs, files in os.walk(project_dir):
+                dirs[:] = [d for d in dirs if d not in sts.ignore_dirs and not d.startswith('.')]
+                for f in files:
+                    if f.endswith('.py'):
+                        path = os.path.abspath(os.path.join(root, f))
+                        seen.add(path)
+                        changed += self._update(path, os.stat(path))
+            root = os.path.abspath(project_dir) + os.sep
+            removed = [p for p in self.files if p.startswith(root) and p not in seen]
+            for p in removed:
+                del self.files[p]
+            if changed or removed:
+                self.save()
+        return {'files': len(seen), 'changed': changed, 'removed': len(removed)}
+
+
+def check_anchors(symbols: dict, ops: list[tuple[CrHeads, str]], *args, **kwargs
+    ) -> list[dict]:
+    """
+    Checks the cr_anc of every op like the Transformer would find it. Definitions the
+    other ops add count as known, an op may anchor on what another op inserts.
+    Returns one record per anchor that is not known, with its fuzzy resolution status.
+    """
+    added = [(head, module_symbols(textwrap.dedent(body))) for head, body in ops]
+    problems = []
+    for i, (head, own) in enumerate(added):
+        functions, classes, imports, statements = _known(symbols, added[:i] + added[i + 1:])
+        # the name of the definition the op brings, see _BaseTransformer._fuzzy_anchor_index
+        name = next(iter([*own['functions'], *own['classes']]), None)
+        anc = str(head.cr_anc).strip()
+        if head.cr_type == 'import':
+            known = any(i.strip().startswith(anc) for i in imports)
+            labels, scope = imports, 'imports'
+        elif head.cr_type == 'method':
+            class_name, _, method_name = anc.partition('.')
+            if class_name not in classes:
+                problems.append({'cr_op': head.cr_op, 'cr_type': head.cr_type, 'cr_anc': anc,
+                                    'status': 'missing', 'detail': f"class {class_name}",
+                                    'suggestions': _hints(class_name, sorted(classes))})
+                continue
+            known = method_name in classes[class_name]
+            labels, scope, anc = sorted(classes[class_name]), f"class {class_name}", method_name
+        else:
+            # _find_tgt_idx compares the code of every top level statement, imports too
+            known = anc in functions or anc in classes or normalize(anc) in statements \
+                                        or normalize(anc) in map(normalize, imports)
+            # the fuzzy fallback only looks at definitions of the op's cr_type
+            labels = sorted(classes if head.cr_type == 'class' else functions)
+            scope = 'module'
+        if not known:
+            hints, label = _hints(anc, labels), _resolves(anc, labels)
+            # replace and remove must not resolve to a definition of another name
+            if head.cr_op in {'replace', 'remove'} and label != name:
+                label = None
+            problems.append({'cr_op': head.cr_op, 'cr_type': head.cr_type, 'cr_anc': head.cr_anc,
+                                'status': 'missing' if label is None else 'fuzzy',
+                                'detail': scope, 'suggestions': hints})
+    return problems
+
+def _known(symbols: dict, added: list[tuple[CrHeads, dict]]) -> tuple:
+    """functions, classes, imports and statements of symbols plus the ones ops add."""
+    functions = set(symbols['functions'])
+    classes = {c: set(ms) for c, ms in symbols['classes'].items()}
+    imports, statements = list(symbols['imports']), set(symbols['statements'])
+    for head, a in added:
+        if head.cr_type == 'method':
+            classes.setdefault(head.cr_anc.partition('.')[0], set()).update(a['functions'])
+        else:
+            functions.update(a['functions'])
+            for c, ms in a['classes'].items():
+                classes.setdefault(c, set()).update(ms)
+            imports.extend(a['imports'])
+            statements.update(a['statements'])
+    return functions, classes, imports, statements
+
+def _hints(anchor: str, labels: list[str]) -> list[tuple[str, float]]:
+    if not (NUMPY_AVAILABLE and labels):
+        return []
+    return AnchorIndex(labels, ['any'] * len(labels)).match(anchor, {'any'}, min_score=1.1,
+                        hint_score=context.current().setting('anchor_hint_score'))[1]
+
+def _resolves(anchor: str, labels: list[str]) -> str | None:
+    """The label the Transformer's fuzzy fallback would resolve the anchor to."""
+    if not (NUMPY_AVAILABLE and labels):
+        return None
+    ctx = context.current()
+    idx = AnchorIndex(labels, ['any'] * len(labels)).match(anchor, {'any'},
+                            min_score=ctx.setting('anchor_min_score'),
+                            hint_score=ctx.setting('anchor_hint_score'))[0]
+    return None if idx == -1 else labels[idx]
+
+def preflight(*args, source_path: str, integration_path: str, pg_name: str = None,
+    **kwargs) -> list[dict]:
+    """
+    Rejects an update CR whose anchors can not be found in source_path, before it is
+    parsed by libcst. Anchors the fuzzy fallback resolves are only reported.
+    Without pg_name there is no index to check against.
+    """
+    if pg_name is None:
+        return []
+    from codeon.parsers import CSTDelta
+    pg_head, ops = CSTDelta().read_ops(*args, source_path=integration_path, **kwargs)
+    symbols = SymbolIndex(pg_name).symbols(source_path)
+    if symbols is None or pg_head.cr_op != 'update':
+        return []
+    problems = check_anchors(symbols, ops)
+    missing = [p for p in problems if p['status'] == 'missing']
+    if problems:
+        logprint(lambda: '\n'.join(f"{p['status']}: {p['cr_type']} cr_anc='{p['cr_anc']}' "
+                                    f"in {p['detail']}, similar: {p['suggestions']}"
+                                    for p in problems), level='warning')
+    assert not missing, logprint(
+        f"pre-flight: {len(missing)} of {len(ops)} cr_anc not found in {source_path}: "
+        f"{[p['cr_anc'] for p in missing]}", level='error')
+    return problems
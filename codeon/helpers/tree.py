@@ -11,6 +11,7 @@ from typing import Set, List, Tuple, Dict, Iterable, Optional
 from colorama import Fore, Style
 
 import codeon.settings as sts
+from codeon.helpers.file_io import read_text
 
 
 try:
@@ -270,8 +271,7 @@ class Tree:
         WHY: Read file as text, suppress noisy errors unless verbose>=1.
         """
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()
+            return read_text(file_path, errors="ignore")
         except Exception as e:
             if self.verbose >= 1:
                 print(f"{Fore.RED}Read error:{Fore.RESET} {e}")
@@ -0,0 +1,93 @@
+# watcher.py
+"""
+WHY: Long running processes (see apis/watch.py) need to know when a new cr file landed
+in one of the cr directories. Uses inotify where available and falls back to polling.
+A file is only reported once its writes have settled for `debounce` seconds.
+"""
+import os, time
+
+try:
+    # optional, linux only
+    from inotify_simple import INotify, flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+
+class DirWatcher:
+
+    def __init__(self, *dirs: str, debounce: float = 0.5, poll_interval: float = 0.5,
+        use_inotify: bool = True, **kwargs):
+        self.dirs = [os.path.abspath(d) for d in dirs]
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        # path -> (size, mtime_ns) of files already known, existing files are not reported
+        self.snapshot: dict[str, tuple] = self._scan()
+        # path -> time of the last observed change, waiting to settle
+        self.changed: dict[str, float] = {}
+        self.inotify = self._mk_inotify() if use_inotify and INOTIFY_AVAILABLE else None
+
+    def __iter__(self):
+        return self.watch()
+
+    def watch(self, *args, **kwargs):
+        """Yields lists of settled file paths until close() is called."""
+        while self.dirs:
+            if settled := self.poll(*args, **kwargs):
+                yield settled
+
+    def poll(self, *args, **kwargs) -> list[str]:
+        """Runs one wait/scan round and returns all paths that have settled."""
+        if self.inotify is not None:
+            self._read_inotify(*args, **kwargs)
+        else:
+            time.sleep(self.poll_interval if not self.changed else self.debounce / 2)
+            self._read_scan(*args, **kwargs)
+        now = time.monotonic()
+        settled = sorted(p for p, t in self.changed.items() if now - t >= self.debounce)
+        for p in settled:
+            del self.changed[p]
+        return [p for p in settled if os.path.isfile(p)]
+
+    def close(self, *args, **kwargs) -> None:
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.dirs = []
+
+    # ---------- inotify ----------
+    def _mk_inotify(self, *args, **kwargs):
+        ino = INotify()
+        # MODIFY restarts the debounce on every write, a file written in chunks settles
+        # only after its last one
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY
+        self.wds = {ino.add_watch(d, mask): d for d in self.dirs if os.path.isdir(d)}
+        return ino
+
+    def _read_inotify(self, *args, **kwargs) -> None:
+        # wake up in time to release files that are waiting to settle
+        timeout = self.debounce if self.changed else self.poll_interval
+        for e in self.inotify.read(timeout=int(timeout * 1000)):
+            if e.name and e.wd in self.wds:
+                self.changed[os.path.join(self.wds[e.wd], e.name)] = time.monotonic()
+
+    # ---------- polling fallback ----------
+    def _scan(self, *args, **kwargs) -> dict[str, tuple]:
+        snapshot = {}
+        for d in self.dirs:
+            if not os.path.isdir(d):
+                continue
+            with os.scandir(d) as entries:
+                for e in entries:
+                    if e.is_file():
+                        st = e.stat()
+                        snapshot[e.path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def _read_scan(self, *args, **kwargs) -> None:
+        current = self._scan()
+        now = time.monotonic()
+        for p, stat in current.items():
+            if self.snapshot.get(p) != stat:
+                self.changed[p] = now
+        self.snapshot = current
@@ -1,6 +1,6 @@
 # parsers.py
 
-import re
+import ast, io, re
 import textwrap
 from abc import ABC, abstractmethod
 # Removed: from typing import Optional, List, Tuple
@@ -11,6 +11,7 @@ from codeon.helpers.printing import logprint, Color, MODULE_COLORS
 MODULE_COLORS["parsers"] = Color.MAGENTA
 
 import codeon.settings as sts
+from codeon.helpers.file_io import MappedFile, BytesView, read_text
 # Updated: Import constants and classes from headers
 from codeon.headers import UnitCrHeads, PackageCrHeads, CR_OPS, CR_TYPES
 
@@ -28,8 +29,7 @@ class CSTParserBase(ABC):
         self.body = self.parse(*args, **kwargs)
 
     def read_source(self, *args, source_path: str, **kwargs) -> None:
-        with open(source_path, encoding="utf-8") as f:
-            self.source_text = f.read()
+        self.source_text = read_text(source_path)
 
     def parse(self, *args, **kwargs) -> cst.Module:
         """Returns the parsed CST tree of the source_text file."""
@@ -42,33 +42,157 @@ class CSTSource(CSTParserBase):
     pass
 
 
+class SourceRegions:
+    """
+    Splits a source text into top level statement regions without libcst.
+    A region holds the blank and comment lines above its statement (libcst leading_lines),
+    decorators and the statement itself. Joining all regions gives back the exact text.
+    WHY: libcst parsing of huge modules is the whole cost of small update CRs,
+    the C based ast parser only provides the statement spans.
+    """
+
+    def __init__(self, text: str, *args, **kwargs):
+        self.text = text
+        # str.splitlines also splits on \x0c, \x85, \u2028 ..., ast line numbers do not
+        self.lines: list[str] = io.StringIO(text, newline='').readlines()
+        # (first line, end line, statement start line) 0 based, end exclusive
+        self.spans: list[tuple[int, int, int]] = []
+        # name of class or function per region, None for other statements
+        self.names: list[str | None] = []
+        self.split(*args, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def split(self, *args, **kwargs) -> None:
+        tree = ast.parse(self.text)
+        first = 0
+        for node in tree.body:
+            start = min([d.lineno for d in getattr(node, 'decorator_list', [])] + [node.lineno])
+            start, end = start - 1, node.end_lineno
+            if self.spans and start < self.spans[-1][1]:
+                # i.e. a; b on one line, both belong to one region
+                f, e, s = self.spans[-1]
+                self.spans[-1], self.names[-1] = (f, max(e, end), s), None
+            else:
+                self.spans.append((first, end, start))
+                self.names.append(node.name if isinstance(node, (ast.ClassDef, ast.FunctionDef,
+                                                    ast.AsyncFunctionDef)) else None)
+            first = self.spans[-1][1]
+        if self.spans:
+            # trailing comments after the last statement are the libcst module footer
+            f, e, s = self.spans[-1]
+            self.spans[-1] = (f, len(self.lines), s)
+
+    def region_text(self, i: int, j: int = None, *args, **kwargs) -> str:
+        """Text of regions i up to j (exclusive), region i only if j is None."""
+        j = i + 1 if j is None else j
+        return ''.join(self.lines[self.spans[i][0]:self.spans[j - 1][1]])
+
+    def statement_text(self, i: int, *args, **kwargs) -> str:
+        f, e, s = self.spans[i]
+        return ''.join(self.lines[s:e])
+
+    def locate(self, head: UnitCrHeads, *args, **kwargs) -> int | None:
+        """
+        Region holding the cr_anc of head, same rules as ModuleTransformer._find_tgt_idx.
+        None if it can not be told without libcst, i.e. anchors created by another op.
+        """
+        anc = (head.cr_anc or '').strip()
+        if head.cr_type == 'method':
+            anc = anc.split('.', 1)[0]
+        elif head.cr_type == 'import':
+            return next((i for i in range(len(self)) 
+                            if self.statement_text(i).strip().startswith(anc)), None)
+        elif head.cr_type not in ('class', 'function'):
+            return None
+        norm = lambda t: t.replace(" ", "").replace("\t", "").lower()
+        for i, name in enumerate(self.names):
+            if name == anc or norm(self.statement_text(i).strip()) == norm(anc):
+                return i
+        return None
+
+
 class CSTDelta(CSTParserBase):
     """
     Parses an integration_file for an optional package-level operation
     and a list of executable module-level operations.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.source_path: str = None
+
+    @property
+    def source_text(self) -> str:
+        """The full integration file is only decoded if somebody asks for it (create op)."""
+        if self._source_text is None:
+            self._source_text = read_text(self.source_path)
+        return self._source_text
+
+    @source_text.setter
+    def source_text(self, text: str) -> None:
+        self._source_text = text
+
+    def read_source(self, *args, source_path: str, **kwargs) -> None:
+        # headers are searched on the mapped bytes in parse, see helpers/file_io.py
+        self.source_path, self.source_text = source_path, None
+
+    def read_header(self, *args, source_path: str, **kwargs) -> PackageCrHeads:
+        """Only the package cr-header, enough to route the CR, nothing is parsed by libcst."""
+        self.read_source(*args, source_path=source_path, **kwargs)
+        with MappedFile(self.source_path) as mf:
+            return self._extract_pg_op(mf, *args, **kwargs)
+
+    def read_ops(self, *args, source_path: str, **kwargs) -> tuple:
+        """
+        Package cr-header and (unit cr-header, body text) per op, nothing is parsed by
+        libcst. Used by the anchor pre-flight check (helpers/symbol_index.py).
+        """
+        self.read_source(*args, source_path=source_path, **kwargs)
+        with MappedFile(self.source_path) as mf:
+            ops = []
+            for m in mf.finditer(sts.patterns['b_unit_header']):
+                op = UnitCrHeads()
+                op(head=mf.text(*m.span(1)).strip())
+                ops.append((op, mf.text(*m.span(2))))
+            return self._extract_pg_op(mf, *args, **kwargs), ops
+
     def parse(self, *args, **kwargs) -> tuple:
         """Parses both package and unit cr-headers from the source text."""
-        pg_h = self._extract_pg_op(*args, **kwargs)
-        module_ops = self._extract_module_ops(*args, **kwargs)
+        with MappedFile(self.source_path) as mf:
+            return self._parse_view(mf, *args, **kwargs)
+
+    def parse_text(self, text: str, *args, header_only: bool = False, **kwargs):
+        """Like __call__ / read_header, for an integration text that is not a file."""
+        self.source_path, self.source_text = None, text
+        with BytesView(text.encode("utf-8")) as mf:
+            if header_only:
+                return self._extract_pg_op(mf, *args, **kwargs)
+            self.body = self._parse_view(mf, *args, **kwargs)
+        return self.body
+
+    def _parse_view(self, mf: MappedFile, *args, **kwargs) -> tuple:
+        pg_h = self._extract_pg_op(mf, *args, **kwargs)
+        module_ops = self._extract_module_ops(mf, *args, **kwargs)
         return pg_h, module_ops
 
-    def _extract_pg_op(self, *args, **kwargs) -> PackageCrHeads | None:
+    def _extract_pg_op(self, mf: MappedFile, *args, **kwargs) -> PackageCrHeads | None:
         """
         Finds and parses a single package cr-header, if present.
         NOTE: We are matching with re.findall but only using the first match.
         """
-        pg_headers = re.compile(sts.pg_header_regex, re.MULTILINE).findall(self.source_text)
+        pg_headers = mf.findall(sts.patterns['b_pg_header'])
         assert len(pg_headers) == 1, logprint(f"{len(pg_headers) = } must be 1!", level='error')
         pg_h = PackageCrHeads()
-        pg_h(head=pg_headers[0].strip())
+        pg_h(head=pg_headers[0].decode("utf-8").strip())
         return pg_h
 
-    def _extract_module_ops(self, *args, **kwargs) -> list:
-        """Extracts all module-level operations from the source text."""
+    def _extract_module_ops(self, mf: MappedFile, *args, **kwargs) -> list:
+        """Extracts all module-level operations, decoding only header and body slices."""
         ops = []
-        for head, body in re.compile(sts.unit_header_regex, re.DOTALL).findall(self.source_text):
+        for m in mf.finditer(sts.patterns['b_unit_header']):
+            head, body = mf.text(*m.span(1)), mf.text(*m.span(2))
             body_node = self._parse_body(body)
             op = UnitCrHeads()
             op(head=head.strip())
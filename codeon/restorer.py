@@ -0,0 +1,70 @@
+# restorer.py
+import os, time
+from colorama import Fore, Style
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["restorer"] = Color.BLUE
+
+from codeon.helpers.blob_store import BlobStore
+from codeon.helpers.file_io import transaction
+
+
+class Restorer:
+    """
+    Restores the source files touched by a CR from the restore archive.
+    WHY: Only the touched files are written, so a restore is proportional to the change
+    size instead of copying the whole package archive.
+    """
+
+    def __init__(self, pg_name: str, *args, **kwargs):
+        self.pg_name = pg_name
+        self.store = BlobStore(pg_name, *args, **kwargs)
+
+    def __call__(self, cr_id: str, *args, explicit: bool = True, dry: bool = False,
+        **kwargs) -> list[dict]:
+        """
+        explicit: restore the files of cr_id only, else of cr_id and all later CRs.
+        Returns one record per touched file.
+        """
+        touched = self.store.touched(cr_id, *args, explicit=explicit, **kwargs)
+        logprint(f"{len(touched)} files touched by {cr_id = }, {explicit = }", level='info')
+        records = [self.plan(m, *args, **kwargs) for m in touched.values()]
+        if dry:
+            return records
+        with transaction() as tx:
+            for r, m in zip(records, touched.values()):
+                if r['action'] == 'write':
+                    tx.write(m['source_path'], self.store.get(m['sha256']))
+                elif r['action'] == 'remove':
+                    tx.remove(m['source_path'])
+        for r in records:
+            r['status'] = self.verify(r, *args, **kwargs)
+        return records
+
+    def plan(self, manifest: dict, *args, **kwargs) -> dict:
+        path, digest = manifest['source_path'], manifest['sha256']
+        exists = os.path.isfile(path)
+        if digest is None:
+            action = 'remove' if exists else 'skip'
+        elif exists and BlobStore.hash_file(path) == digest:
+            action = 'skip'
+        else:
+            action = 'write'
+        return {
+                'cr_id': manifest['cr_id'],
+                'work_file_name': manifest['work_file_name'],
+                'source_path': path,
+                'sha256': digest,
+                'action': action,
+                'status': 'planned',
+        }
+
+    def verify(self, record: dict, *args, **kwargs) -> str:
+        """Checks the restored file against the hash of its archived version."""
+        path, digest = record['source_path'], record['sha256']
+        if digest is None:
+            ok = not os.path.exists(path)
+        else:
+            ok = os.path.isfile(path) and BlobStore.hash_file(path) == digest
+        if not ok:
+            logprint(f"restore verification failed: {path}", level='error')
+        return 'verified' if ok else 'failed'
@@ -1,6 +1,7 @@
 # settings.py
-import os, re, sys, time, yaml
+import os, re, sys, threading, time, yaml
 from datetime import datetime as dt
+_load_start = time.perf_counter()
 
 package_name = "codeon"
 package_dir = os.path.dirname(__file__)
@@ -15,10 +16,29 @@ test_data_dir = os.path.join(test_dir, "data")
 test_cr_ids = {"9999-99-99-99-99-99", "8888-88-88-88-88-88"}
 
 time_stamp = lambda: dt.now().strftime("%Y-%m-%d-%H-%M-%S")
-session_time_stamp = time_stamp()
-time_stamp_regex = r"\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}"
+# cr_ids like 2025-10-09-12-32-22-123456-0004821-0001 (time, microseconds, pid, sequence)
+# parallel codeon processes never share one, they still sort by time as strings
+# and old cr_ids like 2025-10-09-12-32-22 (seconds only) stay valid
+_cr_id_lock, _cr_id_last = threading.Lock(), [(None, 0)]
+def new_cr_id() -> str:
+    with _cr_id_lock:
+        now = dt.now().strftime("%Y-%m-%d-%H-%M-%S-%f")
+        last, seq = _cr_id_last[0]
+        # same microsecond or the clock went back: keep the last time, count up
+        if last is not None and now <= last:
+            now, seq = last, seq + 1
+        else:
+            seq = 0
+        _cr_id_last[0] = (now, seq)
+    return f"{now}-{os.getpid():07d}-{seq % 10_000:04d}"
+session_time_stamp = new_cr_id()
+time_stamp_regex = r"\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}(?:-\d{6}-\d{7,}-\d{4})?"
 cr_id_regex = rf"cr_({time_stamp_regex})_"
-to_dt = lambda ts: dt.strptime(ts, "%Y-%m-%d-%H-%M-%S")
+def to_dt(ts: str) -> dt:
+    """datetime of a cr_id in either format, raises ValueError for anything else."""
+    if not patterns['time_stamp'].fullmatch(str(ts)):
+        raise ValueError(f"not a cr_id: {ts!r}")
+    return dt.strptime(ts[:26], "%Y-%m-%d-%H-%M-%S-%f" if len(ts) > 19 else "%Y-%m-%d-%H-%M-%S")
 # match to dict cr_id, file_name, file_ext from a file-name like cr_2024-01-31-12-30-45_example.py
 # cr files can be markdown or json or python files
 cr_file_name_exts = {'md', 'json', 'py'}
@@ -76,6 +96,27 @@ ignore_files = {
 }
 
 table_max_chars = 100
+# printed dict and table values are cut to this length before they get formatted
+pretty_max_chars = 500
+# files of at least this size are memory mapped instead of read into memory
+mmap_min_bytes = 1 << 20
+io_chunk_bytes = 1 << 16
+# update CRs on source files of at least this size only parse the regions they target
+partial_parse_min_bytes = 1 << 17
+# a missed cr_anc resolves to the most similar statement of its scope scoring at least
+# anchor_min_score, statements scoring anchor_hint_score are reported as suggestions
+anchor_min_score = 0.75
+anchor_hint_score = 0.4
+# update CRs whose cr_anc are not in the symbol index are rejected before libcst parsing
+anchor_preflight = True
+# ast symbols of all modules of a package, files are read again when their mtime changes
+symbol_index_path = lambda pg_name: os.path.join(temp_dir(pg_name), 'symbol_index.json')
+# black formatting, see helpers/black_format.py
+# None keeps the line-length of the target project's [tool.black] (black's default 88)
+black_line_length = None
+black_cache_size = 256
+# 'touched' formats only the nodes an update CR spliced in, 'module' the whole file
+black_scope = 'touched'
 
 resources_dir = os.path.expanduser(f'~{os.sep}.{package_name}')
 if not os.path.exists(resources_dir):
@@ -111,14 +152,26 @@ integration_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split('.')[0]
 processing_dir = lambda pg_name: os.path.join(temp_dir(pg_name), 'processing')
 processing_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split(".")[0]}.py'
 # restoring overwritten source files is done from here
+# restore files are small manifests pointing to a content addressed blob (see blob_store.py)
 restore_dir = lambda pg_name: os.path.join(temp_dir(pg_name), f'{pg_name}_archive')
-restore_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split(".")[0]}.py'
+restore_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split(".")[0]}.json'
+blob_dir = lambda pg_name: os.path.join(restore_dir(pg_name), 'blobs')
+blob_compress = True
 # all cr meta data is logged here
 logs_dir = lambda pg_name: os.path.join(temp_dir(pg_name), f'logs')
 log_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split(".")[0]}.py'
 # all warnings or errors are loged in logs_dir
 error_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split(".")[0]}_error.log'
-error_path = None # to be set later
+error_path = None # per CR in helpers/context.RequestContext.error_path
+# logprint messages below this level are dropped before they are formatted
+# levels: dev, debug, info, warning, error (-v 2 lowers it to dev)
+log_level = os.environ.get('CODEON_LOG_LEVEL', 'info').lower()
+# cProfile dumps are written here if the env var profile_env_var is set
+profile_file_name = lambda f_name, cr_id: f'cr_{cr_id}_{f_name.split(".")[0]}.prof'
+profile_env_var = 'CODEON_PROFILE'
+# sqlite catalog of all CRs of a package, written whenever a CR log is written
+index_path = lambda pg_name: os.path.join(temp_dir(pg_name), 'cr_index.sqlite3')
+cr_index = True
 
 cr_paths = {
     'prompt_path': (prompt_dir, prompt_file_name),
@@ -161,8 +214,27 @@ def load_settings(path):
             print(f"Error loading user settings: {e}")
             return {}
 
-# we add user settings to the global namespace
+# we add user settings to the global namespace, these are process wide defaults,
+# a request can override them (see helpers/context.RequestContext.setting)
 user_settings = load_settings(user_settings_path)
 globals().update(user_settings)
 cr_sts = load_settings(cr_settings_path)
 globals().update(cr_sts)
+
+# compiled once per process, parsers must use these instead of re.compile(<sts>_regex)
+# WHY: one place for the flags, header patterns never span lines, unit bodies do
+patterns = {
+    'time_stamp': re.compile(time_stamp_regex),
+    'cr_id': re.compile(cr_id_regex),
+    'file_name': re.compile(file_name_regex[1:-1]),
+    'cr_file': re.compile(cr_file_regex),
+    'pg_header': re.compile(pg_header_regex, re.MULTILINE),
+    'unit_header': re.compile(unit_header_regex, re.DOTALL),
+    'md_fence': re.compile(md_fence_regex, re.MULTILINE),
+    # bytes variants to search memory mapped files, see helpers/file_io.py
+    'b_pg_header': re.compile(pg_header_regex.encode(), re.MULTILINE),
+    'b_unit_header': re.compile(unit_header_regex.encode(), re.DOTALL),
+}
+
+# import time of this module, reported by helpers/profiling.py
+load_seconds = time.perf_counter() - _load_start
@@ -0,0 +1,67 @@
+# bench_string_parser.py
+"""
+Benchmarks JsonParser against a corpus of malformed LLM payloads of growing size.
+Each row compares the recovery time with a plain json.loads of the clean payload.
+
+RUN like:
+    python -m codeon.test.benchmarks.bench_string_parser
+"""
+import json, os, time
+
+import codeon.settings as sts
+import codeon.helpers.printing as printing
+from codeon.helpers.string_parser import JsonParser
+
+
+def load_payload(*args, **kwargs) -> dict:
+    with open(os.path.join(sts.test_data_dir, "cr_test_parsers_data.json"), "r") as f:
+        return json.load(f)
+
+def malformed_corpus(payload: dict, *args, scale: int = 1, **kwargs) -> dict[str, str]:
+    """
+    Returns {corpus_name: text} variants of payload, code is repeated scale times.
+    """
+    target, code = payload[sts.target_key], payload[sts.content_key] * scale
+    clean = json.dumps({sts.target_key: target, sts.content_key: code}, indent=4)
+    # single quoted variant, double quotes inside the code stay untouched
+    sq_code = json.dumps(code)[1:-1].replace("'", "\\'")
+    # escaped quotes but raw control chars, json.loads only accepts those with strict=False
+    raw_code = code.replace('\\', '\\\\').replace('"', '\\"')
+    return {
+        'clean': clean,
+        'fenced_prose': f"Sure, here is the {{json}} you asked for:\n```json\n{clean}\n```\nBye!",
+        'trailing_commas': clean.replace('"\n}', '",\n}').replace(f'"{target}"', f'"{target}",,'),
+        'missing_commas': clean.replace(f'"{target}",\n', f'"{target}"\n'),
+        'single_quotes': f"{{'{sts.target_key}': '{target}', '{sts.content_key}': '{sq_code}'}}",
+        'raw_newlines': f'{{"{sts.target_key}": "{target}", "{sts.content_key}": "{raw_code}"}}',
+    }
+
+def bench(*args, scales: tuple = (1, 10, 100), rounds: int = 20, **kwargs) -> list[dict]:
+    payload, records = load_payload(), []
+    for scale in scales:
+        clean = json.dumps({k: v * (scale if k == sts.content_key else 1)
+                                                            for k, v in payload.items()})
+        t = time.perf_counter()
+        for _ in range(rounds): json.loads(clean)
+        base = (time.perf_counter() - t) / rounds
+        for name, text in malformed_corpus(payload, scale=scale).items():
+            t = time.perf_counter()
+            for _ in range(rounds): d = JsonParser(text=text)()
+            took = (time.perf_counter() - t) / rounds
+            records.append({
+                            'corpus': name,
+                            'kb': round(len(text) / 1024, 1),
+                            'ok': d is not None,
+                            'ms': round(took * 1000, 3),
+                            'x json.loads': round(took / base, 1),
+            })
+    return records
+
+def main(*args, **kwargs):
+    records = bench(*args, **kwargs)
+    printing.records_to_table('bench_string_parser', records)
+    return records
+
+
+if __name__ == "__main__":
+    main()
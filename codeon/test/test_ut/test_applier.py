@@ -0,0 +1,49 @@
+# test_applier.py
+
+import unittest
+from unittest import mock
+
+from codeon.applier import apply_text, apply_many, ApplyResult
+
+
+class Test_apply_text(unittest.TestCase):
+    cr_id = "2025-01-01-00-00-00"
+    source = "def keep(a):\n    return a\n\n\ndef change(b):\n    return b\n"
+    update = (  "#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n"
+                "#-- cr_op: replace, cr_type: function, cr_anc: change --#\n"
+                "def change(b):\n    return b * 2\n\n"
+                "#-- cr_op: insert_after, cr_type: function, cr_anc: missing --#\n"
+                "def other():\n    return 0\n")
+
+    def test_update_without_file_io(self):
+        with mock.patch('builtins.open', side_effect=AssertionError('no file io')), \
+                mock.patch('os.makedirs', side_effect=AssertionError('no file io')):
+            r = apply_text(self.source, self.update, cr_id=self.cr_id)
+        self.assertIn("return b * 2", r.code)
+        self.assertIn("def keep(a):\n    return a\n", r.code)
+        self.assertIn(f"cr_id: {self.cr_id}", r.code)
+        self.assertEqual(r.report['ops'], 2)
+        self.assertEqual(r.report['failed'], ['missing'])
+        self.assertEqual(r.report['status'], 'partial')
+        self.assertTrue(r.ok)
+
+    def test_create_and_remove(self):
+        create = "#--- cr_op: create, cr_type: file, cr_anc: new.py ---#\nimport os\n"
+        self.assertEqual(apply_text(None, create).code, "import os")
+        remove = "#--- cr_op: remove, cr_type: file, cr_anc: mod.py ---#\n"
+        r = apply_text(self.source, remove)
+        self.assertIsNone(r.code)
+        self.assertEqual(r.report['cr_op'], 'remove')
+
+    def test_apply_many(self):
+        pairs = [(self.source, self.update), (self.source, "no header"), (self.source, self.update)]
+        results = apply_many(pairs, max_workers=2, cr_id=self.cr_id)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(isinstance(r, ApplyResult) for r in results))
+        self.assertEqual(results[0].code, results[2].code)
+        self.assertFalse(results[1].ok)
+        self.assertIsNone(results[1].code)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# test_black_format.py
+
+import os, shutil, tempfile
+import unittest
+from unittest import mock
+
+import codeon.helpers.black_format as black_format
+from codeon.creator import Validator_Formatter
+from codeon.parsers import CSTSource, CSTDelta
+from codeon.transformer import Transformer
+
+
+@unittest.skipUnless(black_format.BLACK_AVAILABLE, "black not installed")
+class Test_black_format(unittest.TestCase):
+    code = "def f( a ):\n  return {'a':a}\n"
+    formatted = 'def f(a):\n    return {"a": a}\n'
+
+    def setUp(self):
+        black_format._cache.clear()
+
+    def test_formatter_flag(self):
+        self.assertEqual(Validator_Formatter()(self.code, black=True), self.formatted)
+        self.assertEqual(Validator_Formatter()(self.code), self.code)
+
+    def test_cache(self):
+        with mock.patch.object(black_format, "_format_str",
+                                wraps=black_format._format_str) as fmt:
+            for _ in range(3):
+                self.assertEqual(black_format.format_code(self.code), self.formatted)
+            black_format.format_code(self.code, line_length=40)
+        # one call per mode, the repeats are served from the cache
+        self.assertEqual(fmt.call_count, 2)
+
+    def test_project_config(self):
+        """[tool.black] of the target project is used, -l only if a length is set."""
+        project_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, project_dir, ignore_errors=True)
+        with open(os.path.join(project_dir, "pyproject.toml"), "w") as f:
+            f.write("[tool.black]\nline-length = 40\nskip-string-normalization = true\n")
+        source_path = os.path.join(project_dir, "mod.py")
+        code = "x = call_something(first_argument, second_argument)\n"
+        out = black_format.format_code(code, source_path=source_path)
+        self.assertEqual(out, "x = call_something(\n    first_argument, second_argument\n)\n")
+        self.assertEqual(black_format.format_code("x = 'a'\n", source_path=source_path),
+                            "x = 'a'\n")
+        self.assertEqual(black_format.format_code(code, source_path=source_path,
+                                                    line_length=88), code)
+        with mock.patch.object(black_format.shutil, "which", return_value="black"), \
+                mock.patch.object(black_format.subprocess, "run") as run:
+            key = black_format.mode_key(source_path=source_path)
+            black_format._format_subprocess(code, *key)
+            self.assertNotIn("-l", run.call_args.args[0])
+            black_format._format_subprocess(code, *black_format.mode_key(line_length=99))
+            self.assertIn("-l", run.call_args.args[0])
+
+    def test_worker_pool(self):
+        with black_format.worker_pool(2):
+            self.assertEqual(black_format.format_code(self.code), self.formatted)
+        self.assertIsNone(black_format._pool)
+
+    def test_worker_pool_shared(self):
+        """A batch that leaves first must not shut down the pool of a running one."""
+        first, second = black_format.worker_pool(2), black_format.worker_pool(2)
+        pool = first.__enter__()
+        self.assertIs(second.__enter__(), pool)
+        first.__exit__(None, None, None)
+        self.assertEqual(black_format.format_code("y = ( 1 )\n"), "y = 1\n")
+        self.assertIs(black_format._pool, pool)
+        second.__exit__(None, None, None)
+        self.assertIsNone(black_format._pool)
+
+    def test_invalid_code(self):
+        self.assertIsNone(black_format.format_code("def f(:\n"))
+
+
+@unittest.skipUnless(black_format.BLACK_AVAILABLE, "black not installed")
+class Test_scoped_black(unittest.TestCase):
+    source = "def keep( a ):\n    return {'a':a}\n\n\ndef change( b ):\n    return b\n"
+    delta = (   "#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n"
+                "#-- cr_op: replace, cr_type: function, cr_anc: change --#\n"
+                "def change( b ):\n    return {'b':b}\n")
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        paths = {}
+        for name, content in (("source", self.source), ("delta", self.delta)):
+            paths[name] = os.path.join(self.test_dir, f"{name}.py")
+            with open(paths[name], "w") as f:
+                f.write(content)
+        csts, cstd = CSTSource(), CSTDelta()
+        csts(source_path=paths["source"])
+        cstd(source_path=paths["delta"], api='update')
+        self.tf = Transformer(csts.body, cstd.body, cr_id="2025-01-01-00-00-00")()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_touched_lines(self):
+        lines = self.tf.source.code.splitlines()
+        (start, end), = self.tf.touched_lines()
+        self.assertTrue(lines[start - 1].startswith("#-- cr_op: replace"))
+        self.assertEqual(lines[end - 1], "    return {'b':b}")
+
+    def test_scoped_format(self):
+        out = Validator_Formatter()(self.tf.source.code, black=True,
+                                        touched=self.tf.touched_lines)
+        self.assertIn("return {'a':a}", out)
+        self.assertIn('return {"b": b}', out)
+        out = Validator_Formatter()(self.tf.source.code, black=True, black_scope='module',
+                                        touched=self.tf.touched_lines)
+        self.assertIn('return {"a": a}', out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# test_blob_store.py
+
+import os, shutil, tempfile
+import unittest
+
+import codeon.settings as sts
+from codeon.helpers.blob_store import BlobStore
+from codeon.helpers.file_io import AtomicWriter
+
+
+class Test_BlobStore(unittest.TestCase):
+    pg_name = "codeon_blob_test"
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = BlobStore(self.pg_name)
+        os.makedirs(self.store.manifest_dir, exist_ok=True)
+        self.source_path = os.path.join(self.test_dir, "module.py")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(sts.temp_dir(self.pg_name), ignore_errors=True)
+
+    def archive(self, content: str, cr_id: str) -> dict:
+        with open(self.source_path, "w") as f:
+            f.write(content)
+        restore_path = os.path.join(self.store.manifest_dir,
+                                    sts.restore_file_name("module.py", cr_id))
+        return self.store.archive(self.source_path, restore_path, cr_id=cr_id)
+
+    def test_dedup_and_restore(self):
+        first = self.archive("x = 1\n" * 1000, "2025-01-01-00-00-00")
+        self.archive("x = 1\n" * 1000, "2025-01-01-00-00-01")
+        self.archive("x = 2\n", "2025-01-01-00-00-02")
+        self.assertEqual(len(self.store.manifests()), 3)
+        self.assertEqual(len(self.store._blob_paths()), 2)
+        blob = self.store.find_blob(first['sha256'])
+        self.assertLess(os.path.getsize(blob), first['size'])
+        restore_path = self.store.manifests()[0]['restore_path']
+        self.assertEqual(self.store.restore_bytes(restore_path), b"x = 1\n" * 1000)
+
+    def test_parallel_put(self):
+        """Two open transactions stage the same blob, both commit it."""
+        txs = [AtomicWriter(), AtomicWriter()]
+        digests = {self.store.put_bytes(b"y = 1\n" * 100, tx=tx) for tx in txs}
+        for tx in txs:
+            tx.commit()
+        digest, = digests
+        self.assertEqual(self.store.get(digest), b"y = 1\n" * 100)
+        blob_dir = os.path.dirname(self.store.find_blob(digest))
+        self.assertEqual(os.listdir(blob_dir), [os.path.basename(self.store.find_blob(digest))])
+
+    def test_gc_keep(self):
+        for i, content in enumerate(("a = 1\n", "a = 2\n", "a = 1\n", "a = 3\n")):
+            self.archive(content, f"2025-01-01-00-00-0{i}")
+        r = self.store.gc(keep=2, dry=True)
+        self.assertEqual((r['dropped_manifests'], r['removed_blobs']), (2, 1))
+        self.assertEqual(len(self.store.manifests()), 4)
+        self.store.gc(keep=2)
+        self.assertEqual([m['cr_id'][-2:] for m in self.store.manifests()], ["02", "03"])
+        self.assertEqual(len(self.store._blob_paths()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
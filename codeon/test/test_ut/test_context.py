@@ -0,0 +1,107 @@
+# test_context.py
+
+import io, os, shutil, tempfile, threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import codeon.settings as sts
+import codeon.helpers.context as context
+import codeon.helpers.printing as printing
+from codeon.helpers.printing import logprint
+
+try:
+    # apis.info needs the optional graphviz package
+    from codeon.apis.info import collect_infos
+    INFO_AVAILABLE = True
+except ImportError:
+    INFO_AVAILABLE = False
+
+
+class Test_request(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_settings(self):
+        self.assertIs(context.current(), context._default)
+        with context.request(settings={'partial_parse_min_bytes': 1}) as ctx:
+            self.assertIs(context.current(), ctx)
+            self.assertEqual(ctx.setting('partial_parse_min_bytes'), 1)
+            self.assertEqual(ctx.setting('package_name'), sts.package_name)
+            with context.request() as inner:
+                # nested requests inherit the overrides, not the error log
+                self.assertEqual(inner.setting('partial_parse_min_bytes'), 1)
+        self.assertEqual(context.current().setting('partial_parse_min_bytes'),
+                            sts.partial_parse_min_bytes)
+
+    def test_request_settings(self):
+        """Overrides reach the modules that read them, unsupported keys are rejected."""
+        import codeon.helpers.black_format as black_format
+        from codeon.helpers.blob_store import BlobStore
+        with self.assertRaises(ValueError):
+            with context.request(settings={'package_name': 'other'}):
+                pass
+        with context.request(settings={'black_line_length': 42, 'blob_compress': False}):
+            self.assertEqual(black_format.mode_key()[1], 42)
+            self.assertFalse(BlobStore("codeon_context_test").compress)
+        self.assertEqual(black_format.mode_key()[1], sts.black_line_length)
+
+    def test_default_context_unchanged(self):
+        """CrData outside of a request does not route the process' errors to its log."""
+        from codeon.cr_info import CrData
+        project_dir, pg_name = tempfile.mkdtemp(), "codeon_context_test"
+        self.addCleanup(shutil.rmtree, project_dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, sts.temp_dir(pg_name), ignore_errors=True)
+        CrData(pg_name=pg_name, work_file_name="mod.py", project_dir=project_dir)
+        self.assertIsNone(context._default.error_path)
+        with context.request() as ctx:
+            cr = CrData(pg_name=pg_name, work_file_name="mod.py", project_dir=project_dir)
+            self.assertEqual(ctx.error_path, cr.error_path)
+
+    def concurrent(self, log) -> list:
+        barrier = threading.Barrier(4)
+
+        def run(i: int):
+            with context.request(error_path=os.path.join(self.test_dir, f"cr_{i}_error.log")):
+                barrier.wait()
+                return log(i)
+
+        with mock.patch('sys.stdout', new_callable=io.StringIO):
+            with ThreadPoolExecutor(max_workers=4) as ex:
+                results = list(ex.map(run, range(4)))
+            printing.flush_logs()
+        return results
+
+    def test_concurrent_error_logs(self):
+        """Each request logs to its own *_error.log."""
+        def log(i: int):
+            for _ in range(20):
+                logprint(f"message {i}", level='warning', print_to_console=False)
+
+        self.concurrent(log)
+        for i in range(4):
+            path = os.path.join(self.test_dir, f"cr_{i}_error.log")
+            printing._file_router.targets.pop(path).close()
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            self.assertEqual(text.count(f"message {i}"), 20)
+            self.assertNotIn(f"message {(i + 1) % 4}", text)
+
+    @unittest.skipUnless(INFO_AVAILABLE, "graphviz not installed")
+    def test_concurrent_infos(self):
+        def log(i: int) -> list:
+            collect_infos('', True)
+            for _ in range(20):
+                collect_infos(f"info {i}")
+            return list(collect_infos(''))
+
+        for i, infos in enumerate(self.concurrent(log)):
+            self.assertEqual(infos, [f"info {i}"] * 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# test_cr_index.py
+
+import os, shutil
+import unittest
+
+import codeon.settings as sts
+from codeon.helpers.cr_index import CrIndex
+
+
+class Test_CrIndex(unittest.TestCase):
+    pg_name = "_test_cr_index"
+
+    def setUp(self):
+        shutil.rmtree(sts.temp_dir(self.pg_name), ignore_errors=True)
+        self.index = CrIndex(self.pg_name)
+
+    def tearDown(self):
+        shutil.rmtree(sts.temp_dir(self.pg_name), ignore_errors=True)
+
+    def test_record_upserts(self):
+        cr = {'cr_id': "2025-01-01-00-00-00", 'work_file_name': "mod.py", 'pg_op': 'update',
+                'json_file_exists': True, 'timings': [{'step': 'parse', 'wall_s': 0.1}]}
+        self.index.record(cr)
+        self.assertEqual(self.index.latest("mod.py")['status'], 'pending')
+        self.index.record({**cr, 'processing_file_exists': True, 'seconds': 0.5})
+        rows = self.index.history()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['status'], 'done')
+        # values not given again are kept
+        self.assertEqual(rows[0]['pg_op'], 'update')
+        self.assertIn('"parse"', rows[0]['timings'])
+
+    def test_history_filters(self):
+        for cr_id, wfn in (("2025-01-01-00-00-01", "a.py"), ("2025-01-01-00-00-02", "b.py"),
+                            ("2025-01-01-00-00-03", "a.py")):
+            self.index.record({'cr_id': cr_id, 'work_file_name': wfn})
+        self.index.set_status("2025-01-01-00-00-02", "b.py", "failed: KeyError()")
+        self.assertEqual([r['cr_id'] for r in self.index.history(work_file_name="a.py")],
+                            ["2025-01-01-00-00-03", "2025-01-01-00-00-01"])
+        self.assertEqual(self.index.latest("a.py")['cr_id'], "2025-01-01-00-00-03")
+        self.assertEqual([r['work_file_name'] for r in self.index.history(status='failed')],
+                            ["b.py"])
+        self.assertEqual(len(self.index.history(limit=2)), 2)
+        self.assertIsNone(self.index.latest("c.py"))
+
+    def test_rebuild_from_files(self):
+        cr_id = "2025-01-01-00-00-00"
+        for name in ('json_path', 'integration_path', 'error_path'):
+            _dir, f_name = sts.cr_paths[name]
+            os.makedirs(_dir(self.pg_name), exist_ok=True)
+            with open(os.path.join(_dir(self.pg_name), f_name("mod.py", cr_id)), 'w') as f:
+                f.write("")
+        self.assertEqual(self.index.rebuild(), 1)
+        row = self.index.latest("mod.py")
+        self.assertEqual(row['cr_id'], cr_id)
+        self.assertEqual(row['status'], 'pending')
+        self.assertTrue(row['integration_path'].endswith(f"cr_{cr_id}_mod.py"))
+        # already indexed CRs are not counted again
+        self.assertEqual(self.index.rebuild(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,13 @@
 import os
 import json
+import shutil, tempfile
 import unittest
+from unittest import mock
 
 import codeon.settings as sts
 from codeon.apis import create
+import codeon.parsers as parsers
+from codeon.creator import ProcessEngine
 import codeon.settings as sts
 
 
@@ -84,5 +88,45 @@ class Test__create(unittest.TestCase):
         self.assertEqual(expected_code, self.code)
 
 
+class Test_ProcessEngine_inputs(unittest.TestCase):
+    """Only update CRs are parsed by libcst, create and remove route by the header."""
+
+    def setUp(self, *args, **kwargs):
+        self.test_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.test_dir, "example.py")
+        with open(self.source_path, "w", encoding="utf-8") as f:
+            f.write("def a():\n    return 1\n")
+
+    def tearDown(self, *args, **kwargs):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def process(self, cr_op: str, body: str = "") -> tuple[ProcessEngine, int]:
+        integration_path = os.path.join(self.test_dir, f"cr_{cr_op}_example.py")
+        with open(integration_path, "w", encoding="utf-8") as f:
+            f.write(f"#--- cr_op: {cr_op}, cr_type: file, cr_anc: example.py ---#\n{body}")
+        pe = ProcessEngine('processing')
+        with mock.patch.object(parsers.cst, 'parse_module', wraps=parsers.cst.parse_module) as p:
+            pe.process_python(source_path=self.source_path, integration_path=integration_path,
+                                api='update')
+        return pe, p.call_count
+
+    def test_create_and_remove_skip_cst(self):
+        for cr_op in ('create', 'remove'):
+            with self.subTest(cr_op=cr_op):
+                pe, parses = self.process(cr_op, "def b():\n    return 2\n")
+                self.assertEqual(pe.pg_op, cr_op)
+                self.assertEqual(parses, 0)
+                self.assertIsNone(pe.csts.body)
+
+    def test_update_parses_source_and_delta(self):
+        pe, parses = self.process('update',
+                        "#-- cr_op: replace, cr_type: function, cr_anc: a --#\n"
+                        "def a():\n    return 2\n")
+        self.assertEqual(pe.pg_op, 'update')
+        # source module plus the body of the one unit op
+        self.assertEqual(parses, 2)
+        self.assertEqual(len(pe.cr_ops), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+# test_file_io.py
+
+import os, shutil, tempfile
+import unittest
+from unittest import mock
+
+import codeon.settings as sts
+import codeon.helpers.file_io as file_io
+from codeon.helpers.file_io import MappedFile, AtomicWriter, read_text, stream_wrapped
+from codeon.creator import FileHandler
+from codeon.helpers.blob_store import BlobStore
+
+
+class Test_MappedFile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(sts.test_data_dir, "cr_test_parsers_data.py"), "r") as f:
+            cls.text = f.read() + "\n# ünïcode\n"
+        cls.path = os.path.join(cls.test_dir, "cr_test.py")
+        with open(cls.path, "w", encoding="utf-8") as f:
+            f.write(cls.text)
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+
+    def test_mapped_and_read_agree(self):
+        for min_bytes in (0, 1 << 30):
+            with self.subTest(min_bytes=min_bytes):
+                with MappedFile(self.path, min_bytes=min_bytes) as mf:
+                    self.assertEqual(mf.is_mapped, min_bytes == 0)
+                    self.assertEqual(mf.text(), self.text)
+                    heads = [mf.text(*m.span(1))
+                                for m in mf.finditer(sts.patterns['b_unit_header'])]
+                self.assertEqual(heads, [h for h, _ in
+                                    sts.patterns['unit_header'].findall(self.text)])
+        self.assertEqual(read_text(self.path, min_bytes=0), self.text)
+
+    def test_crlf_like_open(self):
+        path = os.path.join(self.test_dir, "crlf.py")
+        with open(path, "wb") as f:
+            f.write(self.text.replace("\n", "\r\n").encode("utf-8"))
+        with open(path, "r", encoding="utf-8") as f:
+            expected = f.read()
+        for min_bytes in (0, 1 << 30):
+            with self.subTest(min_bytes=min_bytes):
+                self.assertEqual(read_text(path, min_bytes=min_bytes), expected)
+        self.assertNotIn("\r", expected)
+
+    def test_stream_wrapped(self):
+        out = os.path.join(self.test_dir, "wrapped.py")
+        stream_wrapped(out, self.path, head='"""\n', tail='\n"""\n')
+        self.assertEqual(read_text(out), f'"""\n{self.text}\n"""\n')
+
+
+class Test_AtomicWriter(unittest.TestCase):
+    pg_name = "codeon_atomic_test"
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.paths = {n: os.path.join(self.test_dir, f"{n}.{'json' if n == 'restore' else 'py'}")
+                                        for n in ("processing", "restore", "source")}
+        with open(self.paths["source"], "w") as f:
+            f.write("old source")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(sts.temp_dir(self.pg_name), ignore_errors=True)
+
+    def contents(self):
+        return {n: read_text(p) if os.path.exists(p) else None for n, p in self.paths.items()
+                                                                        if n != "restore"}
+
+    def write_operation(self):
+        FileHandler('processing').write_operation("new source", hot=True,
+                                                    path=self.paths["processing"],
+                                                    source_path=self.paths["source"],
+                                                    restore_path=self.paths["restore"],
+                                                    pg_name=self.pg_name,
+                                                    cr_id="2025-01-01-00-00-00")
+
+    def test_hot_write_operation(self):
+        self.write_operation()
+        self.assertEqual(self.contents(), {"processing": "new source", "source": "new source"})
+        self.assertEqual(BlobStore(self.pg_name).restore_bytes(self.paths["restore"]),
+                            b"old source")
+        self.assertEqual(sorted(os.listdir(self.test_dir)),
+                            sorted(os.path.basename(p) for p in self.paths.values()))
+
+    def test_rollback_on_failed_rename(self):
+        before = self.contents()
+        replace, calls = os.replace, []
+        def failing_replace(src, dst):
+            calls.append(dst)
+            if len(calls) == 3:
+                raise OSError("disk full")
+            return replace(src, dst)
+        with mock.patch.object(file_io.os, "replace", side_effect=failing_replace):
+            with self.assertRaises(OSError):
+                self.write_operation()
+        self.assertEqual(self.contents(), before)
+        self.assertEqual(os.listdir(self.test_dir), ["source.py"])
+        self.assertEqual(BlobStore(self.pg_name)._blob_paths(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
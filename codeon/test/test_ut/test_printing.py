@@ -0,0 +1,90 @@
+# test_printing.py
+
+import io, os, shutil, tempfile
+import unittest
+from unittest import mock
+
+import codeon.settings as sts
+import codeon.helpers.printing as printing
+import codeon.helpers.context as context
+from codeon.helpers.printing import logprint
+
+
+class Test_logprint(unittest.TestCase):
+
+    def setUp(self, *args, **kwargs):
+        self.threshold = printing._threshold
+        printing.set_level('info')
+
+    def tearDown(self, *args, **kwargs):
+        printing._threshold = self.threshold
+
+    def console(self, *args, **kwargs) -> str:
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+            logprint(*args, **kwargs)
+            printing.flush_logs()
+        return out.getvalue()
+
+    def test_shown_with_caller(self):
+        out = self.console('hello', level='info')
+        self.assertIn('hello', out)
+        self.assertIn('test_printing.Test_logprint.console INFO', out)
+
+    def test_gated_message_is_not_built(self):
+        build = mock.Mock(return_value='dev message')
+        with mock.patch.object(printing, '_caller_info') as caller:
+            self.assertEqual(self.console(build, level='dev'), '')
+            caller.assert_not_called()
+        build.assert_not_called()
+
+    def test_lazy_message_when_enabled(self):
+        printing.set_level('dev')
+        self.assertIn('dev message', self.console(lambda: 'dev message', level='dev'))
+        self.assertTrue(printing.is_enabled('debug'))
+
+    def test_errors_logged_to_file(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, 'cr_test_error.log')
+            printing.set_level('error')
+            with context.request(error_path=path):
+                self.console('warn message', level='warning')
+            printing._file_router.targets.pop(path).close()
+            with open(path, encoding='utf-8') as f:
+                self.assertIn('warn message', f.read())
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+
+class Test_pretty_dict(unittest.TestCase):
+
+    def setUp(self, *args, **kwargs):
+        self.threshold = printing._threshold
+        printing.set_level('info')
+
+    def tearDown(self, *args, **kwargs):
+        printing._threshold = self.threshold
+
+    def test_gated_dict_is_not_built(self):
+        build = mock.Mock(return_value={'a': 1})
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+            printing.pretty_dict('test', build, level='debug')
+        build.assert_not_called()
+        self.assertEqual(out.getvalue(), '')
+
+    def test_values_are_shortened(self):
+        source = 'x' * (sts.pretty_max_chars * 10)
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+            printing.pretty_dict('test', lambda: {'source': source, 'n': 3})
+        self.assertIn(f"[{len(source)} chars]", out.getvalue())
+        self.assertLess(len(out.getvalue()), sts.pretty_max_chars * 2)
+        self.assertIn('n: \x1b[39m3', out.getvalue())
+
+    def test_shorten(self):
+        self.assertEqual(printing.shorten('abc'), 'abc')
+        self.assertEqual(printing.shorten(None), None)
+        self.assertIn('...', printing.shorten(list(range(100))))
+
+
+if __name__ == "__main__":
+    unittest.main()
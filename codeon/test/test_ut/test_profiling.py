@@ -0,0 +1,78 @@
+# test_profiling.py
+
+import os, pstats, shutil, tempfile
+import unittest
+from unittest import mock
+
+import codeon.settings as sts
+import codeon.helpers.profiling as profiling
+from codeon.helpers.profiling import Profiler
+
+
+class Test_Profiler(unittest.TestCase):
+
+    def test_nested_steps(self):
+        p = Profiler()
+        with p.activate():
+            with profiling.step('processing'):
+                with profiling.step('transform'):
+                    pass
+                with profiling.step('write'):
+                    pass
+        self.assertEqual([r['step'] for r in p.records],
+                            ['processing.transform', 'processing.write', 'processing'])
+        for r in p.records:
+            self.assertGreaterEqual(r['wall_s'], 0)
+            self.assertIn('cpu_s', r)
+
+    def test_step_without_profiler(self):
+        with profiling.step('processing'):
+            x = 1
+        self.assertEqual(x, 1)
+
+    def test_step_records_on_error(self):
+        p = Profiler()
+        with p.activate(), self.assertRaises(ValueError):
+            with profiling.step('processing'):
+                raise ValueError('stop')
+        self.assertEqual([r['step'] for r in p.records], ['processing'])
+
+    def test_table_has_same_keys(self):
+        p = Profiler()
+        p.add('settings', 0.1)
+        with p.activate(), profiling.step('json'):
+            pass
+        table = p.table()
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table[0].keys(), table[1].keys())
+        self.assertIsNone(table[0]['cpu_s'])
+
+
+class Test_cprofile(unittest.TestCase):
+
+    def setUp(self, *args, **kwargs):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'logs', 'cr_test.prof')
+
+    def tearDown(self, *args, **kwargs):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_no_dump_without_env_var(self):
+        with mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop(sts.profile_env_var, None)
+            with profiling.cprofile(self.path) as prof:
+                self.assertIsNone(prof)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_dump_with_env_var(self):
+        with mock.patch.dict(os.environ, {sts.profile_env_var: '1'}):
+            with profiling.cprofile(self.path) as prof:
+                sum(range(1000))
+        if prof is None:
+            self.skipTest('another profiler is active')
+        self.assertTrue(os.path.exists(self.path))
+        self.assertTrue(pstats.Stats(self.path).total_calls > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
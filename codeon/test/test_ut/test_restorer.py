@@ -0,0 +1,69 @@
+# test_restorer.py
+
+import os, shutil, tempfile
+import unittest
+
+import codeon.settings as sts
+from codeon.helpers.blob_store import BlobStore
+from codeon.restorer import Restorer
+
+
+class Test_Restorer(unittest.TestCase):
+    pg_name = "codeon_restore_test"
+    cr_ids = ("2025-01-01-00-00-00", "2025-01-01-00-00-01", "2025-01-01-00-00-02")
+
+    def setUp(self):
+        """Three CRs: two updates of first.py, the last one also creates second.py."""
+        self.test_dir = tempfile.mkdtemp()
+        self.store = BlobStore(self.pg_name)
+        os.makedirs(self.store.manifest_dir, exist_ok=True)
+        self.first = os.path.join(self.test_dir, "first.py")
+        self.second = os.path.join(self.test_dir, "second.py")
+        self.write(self.first, "v0")
+        self.cr(self.cr_ids[0], self.first, "v1")
+        self.cr(self.cr_ids[1], self.first, "v2")
+        self.cr(self.cr_ids[2], self.second, "created")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(sts.temp_dir(self.pg_name), ignore_errors=True)
+
+    @staticmethod
+    def write(path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    @staticmethod
+    def read(path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def cr(self, cr_id, path, content):
+        restore_path = os.path.join(self.store.manifest_dir,
+                                    sts.restore_file_name(os.path.basename(path), cr_id))
+        self.store.archive(path, restore_path, cr_id=cr_id)
+        self.write(path, content)
+
+    def test_explicit(self):
+        records = Restorer(self.pg_name)(self.cr_ids[1])
+        self.assertEqual([(r['action'], r['status']) for r in records], [('write', 'verified')])
+        self.assertEqual(self.read(self.first), "v1")
+        self.assertTrue(os.path.exists(self.second))
+
+    def test_with_later_crs(self):
+        records = Restorer(self.pg_name)(self.cr_ids[0], explicit=False)
+        self.assertEqual({r['status'] for r in records}, {'verified'})
+        self.assertEqual(self.read(self.first), "v0")
+        self.assertFalse(os.path.exists(self.second))
+        # a second restore has nothing left to do
+        records = Restorer(self.pg_name)(self.cr_ids[0], explicit=False)
+        self.assertEqual({r['action'] for r in records}, {'skip'})
+
+    def test_dry(self):
+        records = Restorer(self.pg_name)(self.cr_ids[0], explicit=False, dry=True)
+        self.assertEqual(sorted(r['action'] for r in records), ['remove', 'write'])
+        self.assertEqual(self.read(self.first), "v2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# test_settings.py
+
+import os, shutil, tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import codeon.settings as sts
+from codeon.cr_info import CrData
+
+
+class Test_new_cr_id(unittest.TestCase):
+    pg_name = "codeon_cr_id_test"
+
+    def test_unique_and_sorted(self):
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            cr_ids = list(ex.map(lambda _: sts.new_cr_id(), range(2000)))
+        self.assertEqual(len(set(cr_ids)), len(cr_ids))
+        # ids of one process sort in creation order
+        ordered = [sts.new_cr_id() for _ in range(200)]
+        self.assertEqual(ordered, sorted(ordered))
+        self.assertTrue(ordered[0].split('-')[-2].endswith(str(os.getpid())))
+
+    def test_both_formats(self):
+        for cr_id in (sts.new_cr_id(), "2025-10-09-12-32-22"):
+            with self.subTest(cr_id=cr_id):
+                file_info = sts.patterns['cr_file'].search(f"cr_{cr_id}_mod.py").groupdict()
+                self.assertEqual(file_info, {'cr_id': cr_id, 'file_name': 'mod.py'})
+                self.assertEqual(sts.to_dt(cr_id).strftime("%Y-%m-%d-%H-%M-%S"), cr_id[:19])
+                valid_cr_id, _ = CrData._validate_file_info(None, file_info)
+                self.assertTrue(valid_cr_id)
+        # old ids sort before new ids of the same second
+        self.assertLess("2025-10-09-12-32-22", "2025-10-09-12-32-22-000000-0000001-0000")
+        for bad in ("2025-10-09-12-32", "2025-10-09-12-32-22-1", "2025-13-09-12-32-22"):
+            with self.subTest(bad=bad), self.assertRaises(ValueError):
+                sts.to_dt(bad)
+
+    def test_cr_data_ids(self):
+        """CrData without a cr_id get their own one, not one per process."""
+        project_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, project_dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, sts.temp_dir(self.pg_name), ignore_errors=True)
+        first, second = (CrData(pg_name=self.pg_name, work_file_name="mod.py",
+                                            project_dir=project_dir) for _ in range(2))
+        self.assertNotEqual(first.cr_id, second.cr_id)
+        self.assertNotEqual(first.cr_id, sts.session_time_stamp)
+        crs = CrData.from_records([{sts.target_key: n} for n in ("a.py", "b.py")],
+                                    pg_name=self.pg_name, project_dir=project_dir)
+        self.assertEqual(crs[0].cr_id, crs[1].cr_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+# test_string_parser.py
+
+import json
+import unittest
+
+import codeon.settings as sts
+from codeon.helpers.string_parser import JsonParser
+from codeon.test.benchmarks.bench_string_parser import load_payload, malformed_corpus
+
+
+class Test_JsonParser(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.payload = load_payload()
+        cls.corpus = malformed_corpus(cls.payload)
+
+    def test_malformed_corpus(self):
+        for name, text in self.corpus.items():
+            with self.subTest(corpus=name):
+                self.assertEqual(JsonParser(text=text)(), self.payload)
+
+    def test_braces_inside_strings(self):
+        text = 'noise {"target": "a.py", "code": "def f():\n    return {\'}\': [1,]}",}'
+        d = JsonParser(text=text)()
+        self.assertEqual(d[sts.content_key], "def f():\n    return {'}': [1,]}")
+
+    def test_no_target(self):
+        self.assertIsNone(JsonParser(text='{"code": "print(1)"} and {broken')())
+
+    def test_array_of_crs(self):
+        records = [dict(self.payload, **{sts.target_key: n}) for n in ("a.py", "b.py")]
+        # trailing comma after the last record
+        text = json.dumps(records, indent=4)[:-2] + ",\n]"
+        self.assertEqual(JsonParser(text=f"two CRs:\n{text}\nthanks")(), records)
+
+
+if __name__ == "__main__":
+    unittest.main()
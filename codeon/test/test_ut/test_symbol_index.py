@@ -0,0 +1,163 @@
+# test_symbol_index.py
+
+import os, shutil, tempfile, time
+import unittest
+from unittest import mock
+
+import codeon.settings as sts
+import codeon.parsers as parsers
+import codeon.apis.watch
+from codeon.headers import UnitCrHeads
+from codeon.creator import ProcessEngine
+from codeon.transformer import Transformer
+from codeon.helpers.anchor_index import NUMPY_AVAILABLE
+from codeon.helpers.symbol_index import SymbolIndex, module_symbols, check_anchors, preflight
+
+
+SOURCE = (  "import os\nfrom re import compile\n\nX = 1\n\n\n"
+            "def load_file(p):\n    return p\n\n\n"
+            "class Parser:\n    def parse_header(self):\n        return 1\n")
+
+
+def op(cr_op: str, cr_type: str, cr_anc: str, body: str = "") -> tuple:
+    head = UnitCrHeads()
+    head(head=f"#-- cr_op: {cr_op}, cr_type: {cr_type}, cr_anc: {cr_anc} --#")
+    return head, body
+
+
+class Test_SymbolIndex(unittest.TestCase):
+    pg_name = "_test_symbol_index"
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.test_dir, "mod.py")
+        with open(self.source_path, "w") as f:
+            f.write(SOURCE)
+        self.index_path = os.path.join(self.test_dir, "index", "symbols.json")
+        SymbolIndex._instances.pop(self.index_path, None)
+
+    def tearDown(self):
+        SymbolIndex._instances.pop(self.index_path, None)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_module_symbols(self):
+        symbols = module_symbols(SOURCE)
+        self.assertEqual(symbols['functions'], ['load_file'])
+        self.assertEqual(symbols['classes'], {'Parser': ['parse_header']})
+        self.assertEqual(symbols['imports'], ['import os', 'from re import compile'])
+        self.assertEqual(symbols['statements'], ['x=1'])
+        # b is no anchor of its own, it shares the statement line of a
+        self.assertEqual(module_symbols("a = 1; b = 2\nimport os; import re\n"),
+                            {'functions': [], 'classes': {}, 'imports': ['import os'],
+                                                                'statements': ['a=1']})
+
+    def test_incremental_refresh(self):
+        index = SymbolIndex(self.pg_name, path=self.index_path)
+        self.assertEqual(index.refresh(self.test_dir), {'files': 1, 'changed': 1, 'removed': 0})
+        self.assertEqual(index.refresh(self.test_dir)['changed'], 0)
+        # a new process reads the stored index, unchanged files are not read again
+        SymbolIndex._instances.pop(self.index_path)
+        with mock.patch('codeon.helpers.symbol_index.read_text') as read:
+            symbols = SymbolIndex(self.pg_name, path=self.index_path).symbols(self.source_path)
+            read.assert_not_called()
+        self.assertEqual(symbols['functions'], ['load_file'])
+        with open(self.source_path, "a") as f:
+            f.write("\n\ndef added():\n    return 0\n")
+        symbols = SymbolIndex(self.pg_name, path=self.index_path).symbols(self.source_path)
+        self.assertEqual(symbols['functions'], ['load_file', 'added'])
+        os.remove(self.source_path)
+        self.assertEqual(index.refresh(self.test_dir)['removed'], 1)
+
+    def test_check_anchors(self):
+        symbols = module_symbols(SOURCE)
+        problems = check_anchors(symbols, [
+                op('replace', 'function', 'load_file'),
+                op('insert_after', 'function', 'X = 1'),
+                op('insert_before', 'import', 'from re import compile'),
+                op('insert_after', 'method', 'Parser.parse_header', "def parse_body(self):\n    pass\n"),
+                # parse_body is added by the op above
+                op('insert_after', 'method', 'Parser.parse_body'),
+                op('replace', 'function', 'unknown_helper'),
+                op('replace', 'method', 'Lexer.parse_header'),
+        ])
+        self.assertEqual([(p['cr_anc'], p['status']) for p in problems],
+                            [('unknown_helper', 'missing'), ('Lexer.parse_header', 'missing')])
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "numpy not installed")
+    def test_fuzzy_anchors_pass(self):
+        problems = check_anchors(module_symbols(SOURCE), [
+                op('replace', 'function', 'load_files', "def load_file(p):\n    pass\n"),
+                op('replace', 'method', 'Parser.parseHeader',
+                                                "def parse_header(self):\n    pass\n"),
+                op('replace', 'function', 'load'),
+                op('insert_after', 'function', 'load_files'),
+        ])
+        self.assertEqual([p['status'] for p in problems], ['fuzzy', 'fuzzy', 'missing', 'fuzzy'])
+        self.assertEqual(problems[2]['suggestions'][0][0], 'load_file')
+        # a replace or remove never resolves to a definition of another name
+        problems = check_anchors(module_symbols(SOURCE), [
+                op('replace', 'function', 'load_files', "def load_files(p):\n    pass\n"),
+                op('remove', 'function', 'load_filez'),
+        ])
+        self.assertEqual([p['status'] for p in problems], ['missing', 'missing'])
+
+    def test_preflight_rejects_before_libcst(self):
+        integration_path = os.path.join(self.test_dir, "cr_mod.py")
+        with open(integration_path, "w") as f:
+            f.write("#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n"
+                    "#-- cr_op: replace, cr_type: function, cr_anc: load_file --#\n"
+                    "def load_file(p):\n    return p * 2\n\n"
+                    "#-- cr_op: insert_after, cr_type: function, cr_anc: unknown_helper --#\n"
+                    "def other():\n    return 0\n")
+        with mock.patch.object(sts, 'symbol_index_path', lambda pg_name: self.index_path), \
+                mock.patch.object(parsers.cst, 'parse_module') as parse:
+            with self.assertRaises(AssertionError):
+                preflight(source_path=self.source_path, integration_path=integration_path,
+                            pg_name=self.pg_name)
+            parse.assert_not_called()
+
+    def test_watch_indexes_package(self):
+        """The warm watch process indexes its package once on startup."""
+        pg_name = "codeon_watch_test"
+        project_dir = os.path.join(self.test_dir, "project")
+        os.makedirs(os.path.join(project_dir, pg_name))
+        for n in ("setup.py", os.path.join(pg_name, "__main__.py")):
+            open(os.path.join(project_dir, n), "w").close()
+        shutil.copy(self.source_path, os.path.join(project_dir, pg_name, "mod.py"))
+        try:
+            with mock.patch.object(sts, 'symbol_index_path', lambda pg_name: self.index_path), \
+                    mock.patch.object(codeon.apis.watch, 'DirWatcher') as watcher:
+                watcher.return_value.__iter__.return_value = iter([])
+                codeon.apis.watch.watch(work_dir=project_dir, api='update')
+        finally:
+            shutil.rmtree(sts.temp_dir(pg_name), ignore_errors=True)
+        indexed = SymbolIndex(pg_name, path=self.index_path).files
+        self.assertEqual([os.path.relpath(p, project_dir) for p in sorted(indexed)],
+                            [os.path.join(pg_name, "__main__.py"), os.path.join(pg_name, "mod.py")])
+
+    def process(self, cr_anc: str) -> ProcessEngine:
+        """Runs an insert_after function CR of mod.py up to its parsed inputs."""
+        integration_path = os.path.join(self.test_dir, "cr_mod.py")
+        with open(integration_path, "w") as f:
+            f.write("#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n"
+                    f"#-- cr_op: insert_after, cr_type: function, cr_anc: {cr_anc} --#\n"
+                    "def other():\n    return 0\n")
+        pe = ProcessEngine('processing')
+        with mock.patch.object(sts, 'symbol_index_path', lambda pg_name: self.index_path):
+            pe.process_python(source_path=self.source_path, integration_path=integration_path,
+                                pg_name=self.pg_name, api='update')
+        return pe
+
+    def test_preflight_matches_transformer(self):
+        """Any top level statement is an anchor for the Transformer, imports too."""
+        for cr_anc in ("import os", "from  re import compile", "X = 1"):
+            with self.subTest(cr_anc=cr_anc):
+                pe = self.process(cr_anc)
+                tf = Transformer(pe.csts.body, pe.cstd.body, cr_id="2025-01-01-00-00-00")()
+                self.assertEqual(tf.failed_ops, [])
+        with self.assertRaises(AssertionError):
+            self.process("import sys")
+
+
+if __name__ == "__main__":
+    unittest.main()
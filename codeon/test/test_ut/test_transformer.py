@@ -0,0 +1,173 @@
+# test_transformer.py
+
+import os, shutil, tempfile
+import unittest
+from unittest import mock
+
+import libcst as cst
+import codeon.transformer as transformer
+from codeon.parsers import CSTDelta, SourceRegions
+from codeon.transformer import Transformer, RegionTransformer
+from codeon.helpers.anchor_index import NUMPY_AVAILABLE
+
+
+def mk_source(n: int = 40) -> str:
+    """Module header, imports, many functions, a decorated class and a footer comment."""
+    parts = ["# header comment\n\nimport os\nimport re\n\nX = 1; Y = 2\n"]
+    for i in range(n):
+        parts.append(f"\n\n# about f{i}\ndef f{i}(a):\n    return a + {i}\n")
+    parts.append("\n\n@decorator\nclass C:\n    def m1(self):\n        return 1\n\n"
+                    "    def m2(self):\n        if self:\n            return 2\n"
+                    "        else:\n            return 3\n")
+    parts.append("\n\nif __name__ == '__main__':\n    f0(1)\nelse:\n    pass\n# footer\n")
+    return ''.join(parts)
+
+
+class Test_SourceRegions(unittest.TestCase):
+
+    def test_regions_rebuild_the_text(self):
+        source = mk_source()
+        regions = SourceRegions(source)
+        self.assertEqual(regions.region_text(0, len(regions)), source)
+        self.assertEqual(''.join(regions.region_text(i) for i in range(len(regions))), source)
+
+    def test_region_spans(self):
+        regions = SourceRegions(mk_source(3))
+        # a; b on one line are one region, the decorator belongs to its class
+        self.assertEqual(regions.statement_text(2), "X = 1; Y = 2\n")
+        i = regions.names.index('C')
+        self.assertTrue(regions.statement_text(i).startswith("@decorator\nclass C:"))
+        self.assertTrue(regions.region_text(len(regions) - 1).endswith("# footer\n"))
+        self.assertIn("# about f1\n", regions.region_text(regions.names.index('f1')))
+
+
+class Test_RegionTransformer(unittest.TestCase):
+    cr_id = "2025-01-01-00-00-00"
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source = mk_source()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def delta(self, ops: str) -> tuple:
+        path = os.path.join(self.test_dir, "delta.py")
+        with open(path, "w") as f:
+            f.write(f"#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n{ops}")
+        cstd = CSTDelta()
+        cstd(source_path=path, api='update')
+        return cstd.body
+
+    def both(self, ops: str) -> tuple[RegionTransformer, Transformer, list[str]]:
+        body = self.delta(ops)
+        with mock.patch.object(transformer.cst, 'parse_module',
+                                            wraps=cst.parse_module) as parse:
+            rtf = RegionTransformer(self.source, body, cr_id=self.cr_id)()
+        parsed = [c.args[0] for c in parse.call_args_list]
+        tf = Transformer(cst.parse_module(self.source), body, cr_id=self.cr_id)()
+        return rtf, tf, parsed
+
+    def test_same_code_as_full_parse(self):
+        rtf, tf, parsed = self.both(
+                "#-- cr_op: replace, cr_type: function, cr_anc: f20 --#\n"
+                "def f20(a):\n    return a * 20\n\n"
+                "#-- cr_op: insert_after, cr_type: method, cr_anc: C.m1 --#\n"
+                "def m3(self):\n    return 3\n\n"
+                "#-- cr_op: insert_before, cr_type: import, cr_anc: import re --#\n"
+                "import sys\n")
+        self.assertTrue(rtf.partial)
+        self.assertEqual(rtf.code, tf.code)
+        self.assertEqual(rtf.touched_lines(), tf.touched_lines())
+        # three windows, none of them holds f10
+        self.assertEqual(len(parsed), 3)
+        self.assertFalse(any("def f10(" in p for p in parsed))
+
+    def test_unicode_line_separators(self):
+        """Only line breaks end a line, as for ast and libcst, not \\x0c or \\u2028."""
+        seps = "\u2028\x85\u2029\x1c" * 10
+        self.source = self.source.replace("# about f10\n", f"# about f10\nS = '{seps}'  # \x0c\n")
+        self.assertEqual(len(SourceRegions(self.source).lines), self.source.count("\n"))
+        rtf, tf, parsed = self.both(
+                "#-- cr_op: replace, cr_type: function, cr_anc: f20 --#\n"
+                "def f20(a):\n    return a * 20\n")
+        self.assertTrue(rtf.partial)
+        self.assertEqual(rtf.code, tf.code)
+        self.assertEqual(rtf.touched_lines(), tf.touched_lines())
+
+    def test_unknown_anchor_falls_back_to_full_parse(self):
+        rtf, tf, parsed = self.both(
+                "#-- cr_op: insert_after, cr_type: function, cr_anc: g --#\n"
+                "def h():\n    return 0\n\n"
+                "#-- cr_op: insert_after, cr_type: function, cr_anc: f1 --#\n"
+                "def g():\n    return 1\n")
+        self.assertFalse(rtf.partial)
+        self.assertEqual(parsed, [self.source])
+        self.assertEqual(rtf.code, tf.code)
+        self.assertIn("def h():", rtf.code)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "numpy not installed")
+class Test_fuzzy_anchor(unittest.TestCase):
+    cr_id = "2025-01-01-00-00-00"
+    source = ("import os\n\n\ndef compute_total(a):\n    return a\n\n\n"
+                "def load_file(p):\n    return p\n\n\n"
+                "class Parser:\n    def parse_header(self):\n        return 1\n")
+
+    def run_ops(self, ops: str, source: str = None) -> Transformer:
+        cstd = CSTDelta()
+        body = cstd.parse_text(f"#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n{ops}",
+                                api='update')
+        return Transformer(cst.parse_module(source or self.source), body, cr_id=self.cr_id)()
+
+    def test_resolves_typos(self):
+        tf = self.run_ops(
+                "#-- cr_op: replace, cr_type: function, cr_anc: compute_totl --#\n"
+                "def compute_total(a):\n    return a * 2\n\n"
+                "#-- cr_op: insert_after, cr_type: method, cr_anc: Parser.parseHeader --#\n"
+                "def parse_body(self):\n    return 2\n")
+        self.assertEqual(tf.failed_ops, [])
+        self.assertIn("return a * 2", tf.code)
+        self.assertNotIn("return a\n", tf.code)
+        self.assertLess(tf.code.index("def parse_header"), tf.code.index("def parse_body"))
+        self.assertEqual({anc: label for anc, (label, _) in tf.resolved.items()},
+                            {'compute_totl': 'compute_total', 'Parser.parseHeader': 'parse_header'})
+
+    def test_destructive_ops_keep_other_definitions(self):
+        """A replace or remove never resolves to a definition of another name."""
+        source = "def get_user(i):\n    return i\n"
+        tf = self.run_ops(
+                "#-- cr_op: replace, cr_type: function, cr_anc: get_user_id --#\n"
+                "def get_user_id(i):\n    return i.id\n\n"
+                "#-- cr_op: remove, cr_type: function, cr_anc: get_userr --#\n", source=source)
+        self.assertEqual([h.cr_anc for h, _ in tf.failed_ops], ['get_user_id', 'get_userr'])
+        self.assertEqual(tf.code, source)
+        self.assertEqual(tf.resolved, {})
+        self.assertEqual(tf.suggestions['get_user_id'][0][0], 'get_user')
+
+    def test_low_scores_are_suggestions(self):
+        with mock.patch.object(transformer, 'AnchorIndex',
+                                            wraps=transformer.AnchorIndex) as index:
+            tf = self.run_ops(
+                    "#-- cr_op: insert_after, cr_type: function, cr_anc: load --#\n"
+                    "def a():\n    return 0\n\n"
+                    "#-- cr_op: insert_after, cr_type: function, cr_anc: loader --#\n"
+                    "def b():\n    return 0\n")
+        self.assertEqual([h.cr_anc for h, _ in tf.failed_ops], ['load', 'loader'])
+        self.assertEqual(tf.suggestions['load'][0][0], 'load_file')
+        self.assertEqual(tf.code, self.source)
+        # one index for the module scope, shared by both ops
+        self.assertEqual(index.call_count, 1)
+
+    def test_exact_anchor_from_later_op_wins(self):
+        tf = self.run_ops(
+                "#-- cr_op: insert_after, cr_type: function, cr_anc: load_filez --#\n"
+                "def c():\n    return 0\n\n"
+                "#-- cr_op: insert_after, cr_type: function, cr_anc: load_file --#\n"
+                "def load_filez():\n    return 1\n")
+        self.assertEqual(tf.failed_ops, [])
+        self.assertLess(tf.code.index("def load_filez"), tf.code.index("def c()"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,51 @@
 # test_update.py
 
-import os, re, shutil, sys, time, yaml
+import json, os, re, shutil, sys, tempfile, time, yaml
 import unittest
+from unittest import mock
 
 # test package imports
 import codeon.settings as sts
 
 import codeon.apis.update
+import codeon.contracts as contracts
+from codeon.cr_info import CrData
+from codeon.updater import Updater
+import codeon.creator as creator
+from codeon.creator import FileHandler
+from codeon.helpers.cr_index import CrIndex
+
+
+def mk_project(pg_name: str, files: dict = None) -> str:
+    """
+    Throw away project dir with setup.py and package pg_name, files are written
+    relative to the package dir. Returns the project dir.
+    """
+    project_dir = tempfile.mkdtemp()
+    files = {"setup.py": "", os.path.join(pg_name, "__main__.py"): "",
+                **{os.path.join(pg_name, n): c for n, c in (files or {}).items()}}
+    for name, content in files.items():
+        path = os.path.join(project_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    return project_dir
+
+def rm_project(project_dir: str, pg_name: str) -> None:
+    shutil.rmtree(project_dir, ignore_errors=True)
+    shutil.rmtree(sts.temp_dir(pg_name), ignore_errors=True)
+
+
+def assert_processed(test, pg_name, records):
+    """Index and CR log of every record must show the committed processing file."""
+    index = CrIndex(pg_name)
+    for r in records:
+        row, = index.history(cr_id=r['cr_id'], work_file_name=r['work_file_name'])
+        test.assertEqual((row['status'], row['current_phase']), ('done', 'processing'))
+        log_path = os.path.join(sts.logs_dir(pg_name),
+                                sts.log_file_name(r['work_file_name'], r['cr_id']))
+        with open(log_path, "r") as f:
+            test.assertTrue(yaml.safe_load(f)['processing_file_exists'])
 
 
 class Test__update(unittest.TestCase):
@@ -75,5 +114,316 @@ class Test__update(unittest.TestCase):
         # self.assertEqual(cm.exception.code, 1)
 
 
+class Test__update_batch(unittest.TestCase):
+    """Runs all pending integration files of a throw away package in one batch."""
+
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.pg_name = "codeon_batch_test"
+        cls.project_dir = mk_project(cls.pg_name)
+        cls.package_dir = os.path.join(cls.project_dir, cls.pg_name)
+        # two independent source files, one CR each and one CR that is already processed
+        cls.cr_ids = ("2025-01-01-00-00-00", "2025-01-01-00-00-01")
+        cls.work_file_names = ("first_module.py", "second_module.py")
+        os.makedirs(sts.integration_dir(cls.pg_name), exist_ok=True)
+        os.makedirs(sts.processing_dir(cls.pg_name), exist_ok=True)
+        with open(os.path.join(sts.test_data_dir, "cr_test_parsers_data.py"), "r") as f:
+            cr_text = f.read()
+        for cr_id, name in zip(cls.cr_ids, cls.work_file_names):
+            shutil.copy(os.path.join(sts.test_data_dir, "test_parsers_data.py"),
+                        os.path.join(cls.package_dir, name))
+            with open(os.path.join(sts.integration_dir(cls.pg_name),
+                                    sts.integration_file_name(name, cr_id)), "w") as f:
+                f.write(cr_text.replace("test_parsers_data.py", name))
+        done = sts.integration_file_name("first_module.py", "2024-01-01-00-00-00")
+        for _dir in (sts.integration_dir(cls.pg_name), sts.processing_dir(cls.pg_name)):
+            shutil.copy(os.path.join(sts.test_data_dir, "test_parsers_data.py"),
+                        os.path.join(_dir, done))
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        rm_project(cls.project_dir, cls.pg_name)
+
+    def test_find_pending(self):
+        pending = CrData.find_pending(self.pg_name)
+        self.assertEqual([p['cr_id'] for p in pending], list(self.cr_ids))
+        self.assertEqual({p['entry_phase'] for p in pending}, {'integration'})
+
+    def test_update_batch(self):
+        records = codeon.apis.update.main(work_dir=self.project_dir, batch=True,
+                                            api='update', verbose=0)
+        self.assertEqual(len(records), 2)
+        self.assertEqual({r['status'] for r in records}, {'done'})
+        for r in records:
+            with open(r['processing_path'], "r") as f:
+                self.assertIn(f"cr_id: {r['cr_id']}", f.read())
+        self.assertEqual(CrData.find_pending(self.pg_name), [])
+        assert_processed(self, self.pg_name, records)
+
+
+class Test__update_fan_out(unittest.TestCase):
+    """One json array with a CR per target file fans out into one CR per file."""
+
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.pg_name = "codeon_fan_out_test"
+        cls.cr_id = "2025-02-02-00-00-00"
+        cls.project_dir = mk_project(cls.pg_name)
+        with open(os.path.join(sts.test_data_dir, "cr_test_parsers_data.py"), "r") as f:
+            cr_text = f.read()
+        cls.records = []
+        for name in ("first_module.py", "second_module.py"):
+            shutil.copy(os.path.join(sts.test_data_dir, "test_parsers_data.py"),
+                        os.path.join(cls.project_dir, cls.pg_name, name))
+            cls.records.append({sts.target_key: name,
+                                sts.content_key: cr_text.replace("test_parsers_data.py", name)})
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        rm_project(cls.project_dir, cls.pg_name)
+
+    def test_fan_out(self):
+        json_string = f"Here are the changes:\n{json.dumps(self.records, indent=4)}"
+        records = Updater(api='update')(cr_id=self.cr_id, json_string=json_string,
+                                        update_source_type='string', entry_phase='json',
+                                        work_dir=self.project_dir, api='update')
+        self.assertEqual([r['work_file_name'] for r in records],
+                            [r[sts.target_key] for r in self.records])
+        self.assertEqual({r['status'] for r in records}, {'done'})
+        for r in records:
+            self.assertTrue(os.path.isfile(os.path.join(sts.json_dir(self.pg_name),
+                                    sts.json_file_name(r['work_file_name'], self.cr_id))))
+            with open(r['processing_path'], "r") as f:
+                self.assertIn("InsertedClass", f.read())
+        assert_processed(self, self.pg_name, records)
+
+    def test_fan_out_api(self):
+        json_string = json.dumps(self.records, indent=4)
+        records = codeon.apis.update.main(cr_id="2025-02-02-00-00-01", json_string=json_string,
+                                            update_source_type='string', entry_phase='json',
+                                            work_dir=self.project_dir, api='update')
+        self.assertEqual([r['work_file_name'] for r in records],
+                            [r[sts.target_key] for r in self.records])
+        self.assertEqual({r['status'] for r in records}, {'done'})
+
+    def test_fan_out_settings(self):
+        """Request settings reach the ProcessEngine of every fanned out CR."""
+        for cr_id, settings, calls in (("2025-02-02-00-00-03", None, 2),
+                ("2025-02-02-00-00-04", {'cr_index': False, 'anchor_preflight': False}, 0)):
+            with mock.patch.object(creator.symbol_index, 'preflight') as preflight:
+                records = Updater(api='update')(cr_id=cr_id, json_string=json.dumps(self.records),
+                                                update_source_type='string', entry_phase='json',
+                                                work_dir=self.project_dir, api='update',
+                                                settings=settings)
+            self.assertEqual({r['status'] for r in records}, {'done'})
+            self.assertEqual(preflight.call_count, calls)
+            self.assertEqual(len(CrIndex(self.pg_name).history(cr_id=cr_id)), calls)
+
+    def test_fan_out_rolls_back(self):
+        """The files of one CR share a transaction, a failing file rolls back the others."""
+        cr_id, write_operation = "2025-02-02-00-00-02", FileHandler.write_operation
+        def failing(handler, content, *args, path, **kwargs):
+            write_operation(handler, content, *args, path=path, **kwargs)
+            if 'second_module' in path:
+                raise OSError("disk full")
+        with mock.patch.object(FileHandler, 'write_operation', failing):
+            records = Updater(api='update')(cr_id=cr_id, json_string=json.dumps(self.records),
+                                            update_source_type='string', entry_phase='json',
+                                            work_dir=self.project_dir, api='update',
+                                            max_workers=1)
+        self.assertEqual([r['status'] for r in records],
+                            ['rolled back: second_module.py failed',
+                             "failed: OSError('disk full')"])
+        for name in ("first_module.py", "second_module.py"):
+            self.assertFalse(os.path.exists(os.path.join(sts.processing_dir(self.pg_name),
+                                                    sts.processing_file_name(name, cr_id))))
+        self.assertFalse([n for n in os.listdir(sts.processing_dir(self.pg_name))
+                                                                    if n.endswith('-tmp')])
+        self.assertEqual({p['work_file_name'] for p in CrData.find_pending(self.pg_name)
+                                                                    if p['cr_id'] == cr_id},
+                            {"first_module.py", "second_module.py"})
+        self.assertEqual({r['work_file_name']: r['status']
+                                        for r in CrIndex(self.pg_name).history(cr_id=cr_id)},
+                            {r['work_file_name']: r['status'] for r in records})
+
+
+class Test__update_chain(unittest.TestCase):
+    """--chain applies all pending CRs of a file on one parsed tree and writes once."""
+    source = "def one(a):\n    return a\n\n\ndef two(b):\n    return b\n"
+    crs = {
+        "2025-03-03-00-00-01": ("replace", "one", "def one(a):\n    return a + 1\n"),
+        "2025-03-03-00-00-02": ("replace", "two", "def two(b):\n    return b + 2\n"),
+    }
+    pg_name = "codeon_chain_test"
+    # extra project files, relative to the package dir
+    files = {}
+
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.project_dir = mk_project(cls.pg_name, {"chained.py": cls.source, **cls.files})
+        cls.source_path = os.path.join(cls.project_dir, cls.pg_name, "chained.py")
+        os.makedirs(sts.integration_dir(cls.pg_name), exist_ok=True)
+        for cr_id, (cr_op, anc, code) in cls.crs.items():
+            path = os.path.join(sts.integration_dir(cls.pg_name),
+                                sts.integration_file_name("chained.py", cr_id))
+            with open(path, "w") as f:
+                f.write("#--- cr_op: update, cr_type: file, cr_anc: chained.py ---#\n\n"
+                        f"#-- cr_op: {cr_op}, cr_type: function, cr_anc: {anc} --#\n{code}")
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        rm_project(cls.project_dir, cls.pg_name)
+
+    def test_chain(self):
+        from codeon.helpers.blob_store import BlobStore
+        pending = CrData.find_pending(self.pg_name)
+        records = Updater(api='update').batch(pending, pg_name=self.pg_name, chain=True,
+                                                hot=True, work_dir=self.project_dir,
+                                                api='update')
+        self.assertEqual({r['status'] for r in records}, {'chained'})
+        with open(self.source_path) as f:
+            out = f.read()
+        self.assertIn("return a + 1", out)
+        self.assertIn("return b + 2", out)
+        for cr_id in self.crs:
+            self.assertIn(f"cr_id: {cr_id}", out)
+        first, second = [r['processing_path'] for r in records]
+        with open(first) as f:
+            self.assertNotIn("return b + 2", f.read())
+        # restore files hold the state before each CR
+        store = BlobStore(self.pg_name)
+        manifests = {m['cr_id']: m for m in store.manifests()}
+        before = [store.restore_bytes(manifests[cr_id]['restore_path']).decode()
+                                                                    for cr_id in self.crs]
+        self.assertEqual(before[0], self.source)
+        self.assertIn("return a + 1", before[1])
+        self.assertNotIn("return b + 2", before[1])
+        self.assertEqual(CrData.find_pending(self.pg_name), [])
+
+
+class Test__update_chain_partial(Test__update_chain):
+    """A chained CR whose anchor is not found stops the chain before it writes."""
+    crs = {
+        "2025-03-03-00-00-01": ("replace", "one", "def one(a):\n    return a + 1\n"),
+        "2025-03-03-00-00-02": ("replace", "missing_helper_xyz",
+                                                        "def two(b):\n    return b + 2\n"),
+    }
+    pg_name = "codeon_chain_partial_test"
+
+    def test_chain(self):
+        pending = CrData.find_pending(self.pg_name)
+        records = Updater(api='update').batch(pending, pg_name=self.pg_name, chain=True,
+                                                hot=True, work_dir=self.project_dir,
+                                                api='update')
+        self.assertEqual([r['status'] for r in records], [
+                            "failed: chain not written, partial CRs ['2025-03-03-00-00-02']",
+                            "partial: cr_anc not found ['missing_helper_xyz']"])
+        with open(self.source_path) as f:
+            self.assertEqual(f.read(), self.source)
+        self.assertEqual(len(CrData.find_pending(self.pg_name)), 2)
+
+
+class Test__update_chain_anchors(Test__update_chain):
+    """
+    A chained CR may anchor on what an earlier CR added, so the chain skips the anchor
+    preflight of the source. It also skips region parsing, all CRs share one full parse.
+    """
+    crs = {
+        "2025-03-03-00-00-01": ("insert_after", "one", "def three(c):\n    return c\n"),
+        "2025-03-03-00-00-02": ("replace", "three", "def three(c):\n    return c + 3\n"),
+    }
+    pg_name = "codeon_chain_anchors_test"
+
+    def test_chain(self):
+        pending = CrData.find_pending(self.pg_name)
+        with mock.patch.object(creator, 'RegionTransformer') as regions:
+            records = Updater(api='update').batch(pending, pg_name=self.pg_name, chain=True,
+                                                    hot=True, work_dir=self.project_dir,
+                                                    api='update',
+                                                    settings={'partial_parse_min_bytes': 0})
+        regions.assert_not_called()
+        self.assertEqual([r['status'] for r in records], ['chained', 'chained'])
+        with open(self.source_path) as f:
+            self.assertIn("return c + 3", f.read())
+
+
+class Test__update_chain_validation(Test__update_chain):
+    """-t validates the chained result before anything is written."""
+    files = {"test/test_chained.py": ("import unittest\nfrom {pg_name}.chained import one\n\n"
+                                        "class T(unittest.TestCase):\n"
+                                        "    def test_one(self):\n"
+                                        "        self.assertEqual(one(1), 1)\n")}
+    pg_name = "codeon_chain_validation_test"
+
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.files = {n: c.format(pg_name=cls.pg_name) for n, c in cls.files.items()}
+        super().setUpClass(*args, **kwargs)
+
+    def test_chain(self):
+        pending = CrData.find_pending(self.pg_name)
+        records = Updater(api='update').batch(pending, pg_name=self.pg_name, chain=True,
+                                                hot=True, testing=True,
+                                                work_dir=self.project_dir, api='update')
+        self.assertEqual(len(records), 2)
+        for r in records:
+            self.assertTrue(r['status'].startswith("failed: AssertionError('validation failed"),
+                                                                                    r['status'])
+        with open(self.source_path) as f:
+            self.assertEqual(f.read(), self.source)
+        self.assertEqual(len(CrData.find_pending(self.pg_name)), 2)
+
+
+class Test__update_work_dirs(unittest.TestCase):
+    """Threads of one process update different projects, nothing relies on the cwd."""
+    pg_names = ("codeon_wd_test_a", "codeon_wd_test_b")
+    cr_id = "2025-04-04-00-00-01"
+
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.project_dirs = {}
+        for pg_name in cls.pg_names:
+            project_dir = mk_project(pg_name)
+            with open(os.path.join(project_dir, pg_name, "mod.py"), "w") as f:
+                f.write(f"def name():\n    return None\n\n\ndef origin():\n    return '{project_dir}'\n")
+            os.makedirs(sts.integration_dir(pg_name), exist_ok=True)
+            with open(os.path.join(sts.integration_dir(pg_name),
+                                    sts.integration_file_name("mod.py", cls.cr_id)), "w") as f:
+                f.write("#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n"
+                        "#-- cr_op: replace, cr_type: function, cr_anc: name --#\n"
+                        f"def name():\n    return '{pg_name}'\n")
+            cls.project_dirs[pg_name] = project_dir
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        for pg_name, project_dir in cls.project_dirs.items():
+            rm_project(project_dir, pg_name)
+
+    def run_project(self, pg_name: str) -> list[dict]:
+        work_dir = self.project_dirs[pg_name]
+        pg_name = contracts.get_package_data(work_dir=work_dir)['pg_name']
+        return Updater(api='update').batch(CrData.find_pending(pg_name), pg_name=pg_name,
+                                            work_dir=work_dir, api='update')
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        cwd = os.getcwd()
+        with ThreadPoolExecutor(max_workers=len(self.pg_names)) as ex:
+            results = dict(zip(self.pg_names, ex.map(self.run_project, self.pg_names)))
+        self.assertEqual(os.getcwd(), cwd)
+        for pg_name, records in results.items():
+            self.assertEqual([r['status'] for r in records], ['done'])
+            # the CR of each project was applied to the source of that project
+            with open(records[0]['processing_path']) as f:
+                out = f.read()
+            self.assertIn(f"return '{pg_name}'", out)
+            self.assertIn(f"return '{self.project_dirs[pg_name]}'", out)
+
+    def test_normalize_path(self):
+        work_dir = self.project_dirs[self.pg_names[0]]
+        self.assertEqual(contracts.normalize_path("setup.py", work_dir=work_dir),
+                            os.path.join(work_dir, "setup.py"))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,105 @@
+# test_validator.py
+
+import json, os, shutil, tempfile
+import unittest
+
+import codeon.settings as sts
+from codeon.updater import Updater
+from codeon.helpers.cr_index import CrIndex
+from codeon.validator import Validator, module_map
+
+
+class Test_Validator(unittest.TestCase):
+    """Validates transformed code of a throw away package pg/mod.py with test pg/test/test_mod.py."""
+    pg_name = "pg"
+
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        cls.project_dir = tempfile.mkdtemp()
+        files = {
+            "setup.py": "",
+            "pg/__init__.py": "",
+            "pg/__main__.py": "",
+            "pg/helpers.py": "def helper():\n    return 1\n",
+            "pg/mod.py": "def answer():\n    return 42\n",
+            "pg/test/test_mod.py": (
+                "import unittest\nfrom pg.mod import answer\n\n"
+                "class T(unittest.TestCase):\n"
+                "    def test_answer(self):\n        self.assertEqual(answer(), 42)\n"),
+        }
+        for name, content in files.items():
+            path = os.path.join(cls.project_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        cls.source_path = os.path.join(cls.project_dir, "pg", "mod.py")
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(cls.project_dir, ignore_errors=True)
+        shutil.rmtree(sts.temp_dir(cls.pg_name), ignore_errors=True)
+
+    def validate(self, code):
+        return {r['stage']: r['status'] for r in Validator()(code,
+                                                    source_path=self.source_path,
+                                                    project_dir=self.project_dir,
+                                                    pg_name=self.pg_name)}
+
+    def test_ok(self):
+        code = "from pg.helpers import helper\nfrom . import helpers\n\ndef answer():\n    return 42\n"
+        self.assertEqual(self.validate(code), {'compile': 'ok', 'imports': 'ok', 'tests': 'ok'})
+
+    def test_syntax_error(self):
+        self.assertEqual(self.validate("def answer(:\n"), {'compile': 'failed'})
+
+    def test_unresolved_import(self):
+        code = "from pg.helpers import missing\n\ndef answer():\n    return 42\n"
+        self.assertEqual(self.validate(code)['imports'], 'failed')
+
+    def test_failing_test_runs_on_transformed_code(self):
+        self.assertEqual(self.validate("def answer():\n    return 41\n")['tests'], 'failed')
+
+    def update(self, cr_id, body):
+        """Runs a hot update CR of mod.py with -t through the Updater."""
+        cr = (  "#--- cr_op: update, cr_type: file, cr_anc: mod.py ---#\n\n"
+                f"#-- cr_op: replace, cr_type: function, cr_anc: answer --#\n{body}")
+        return Updater(api='update')(cr_id=cr_id, update_source_type='string',
+                                    json_string=json.dumps({sts.target_key: "mod.py",
+                                                            sts.content_key: cr}),
+                                    entry_phase='json', work_dir=self.project_dir,
+                                    api='update', hot=True, testing=True)
+
+    def read_source(self):
+        with open(self.source_path, "r") as f:
+            return f.read()
+
+    def test_update_validates_before_write(self):
+        cr_id = "2025-04-04-00-00-00"
+        with self.assertRaises(AssertionError):
+            self.update(cr_id, "def answer():\n    return 41\n")
+        self.assertEqual(self.read_source(), "def answer():\n    return 42\n")
+        self.assertFalse(os.path.exists(os.path.join(sts.processing_dir(self.pg_name),
+                                                sts.processing_file_name("mod.py", cr_id))))
+        row, = CrIndex(self.pg_name).history(cr_id=cr_id)
+        self.assertTrue(row['status'].startswith("failed: AssertionError"))
+
+    def test_update_writes_valid_code(self):
+        try:
+            self.update("2025-04-04-00-00-01", "def answer():\n    return 40 + 2\n")
+            self.assertIn("def answer():\n    return 40 + 2\n", self.read_source())
+        finally:
+            with open(self.source_path, "w") as f:
+                f.write("def answer():\n    return 42\n")
+
+    def test_module_map_refresh(self):
+        self.assertNotIn("pg.new", module_map(self.project_dir))
+        path = os.path.join(self.project_dir, "pg", "new.py")
+        open(path, "w").close()
+        try:
+            self.assertIn("pg.new", module_map(self.project_dir))
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# test_watcher.py
+
+import os, shutil, tempfile, threading, time
+import unittest
+
+from codeon.helpers.watcher import DirWatcher, INOTIFY_AVAILABLE
+
+
+class Test_DirWatcher(unittest.TestCase):
+    """Runs the same debounce checks for the polling fallback and inotify (if installed)."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, "cr_existing.py"), "w") as f:
+            f.write("# already there")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_debounce(self, use_inotify: bool):
+        w = DirWatcher(self.test_dir, debounce=0.3, poll_interval=0.05, use_inotify=use_inotify)
+        try:
+            path = os.path.join(self.test_dir, "cr_new.py")
+            with open(path, "w") as f:
+                f.write("# first write")
+            # not settled yet
+            self.assertEqual(w.poll(), [])
+            settled, deadline = [], time.monotonic() + 3
+            while not settled and time.monotonic() < deadline:
+                settled = w.poll()
+            # existing files are never reported, new ones only once
+            self.assertEqual(settled, [path])
+            self.assertEqual(w.poll(), [])
+        finally:
+            w.close()
+
+    def run_chunked(self, use_inotify: bool):
+        """A file written in chunks over longer than debounce is reported once, complete."""
+        w = DirWatcher(self.test_dir, debounce=0.3, poll_interval=0.05, use_inotify=use_inotify)
+        path, chunks = os.path.join(self.test_dir, "cr_slow.py"), 8
+
+        def write():
+            with open(path, "w") as f:
+                for i in range(chunks):
+                    f.write(f"# chunk {i}\n")
+                    f.flush()
+                    time.sleep(0.1)
+
+        writer = threading.Thread(target=write)
+        try:
+            writer.start()
+            settled, deadline = [], time.monotonic() + 5
+            while not settled and time.monotonic() < deadline:
+                settled = w.poll()
+            self.assertEqual(settled, [path])
+            with open(path) as f:
+                self.assertEqual(f.read().count("# chunk"), chunks)
+        finally:
+            writer.join()
+            w.close()
+
+    def test_polling(self):
+        self.run_debounce(use_inotify=False)
+        self.run_chunked(use_inotify=False)
+
+    @unittest.skipUnless(INOTIFY_AVAILABLE, "inotify_simple not installed")
+    def test_inotify(self):
+        self.run_debounce(use_inotify=True)
+        self.run_chunked(use_inotify=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
 # C:\Users\lars\python_venvs\packages\acodeon\codeon\transformer.py
 
 import libcst as cst
+from libcst.metadata import PositionProvider
 from colorama import Fore, Style
 from codeon.headers import CrHeads, CR_OPS
+from codeon.parsers import SourceRegions
+from codeon.helpers.anchor_index import AnchorIndex, NUMPY_AVAILABLE
+import codeon.helpers.context as context
 from typing import TypeVar
 
 # Define a type variable for cleaner type hints in generics
@@ -61,6 +65,14 @@ class _BaseTransformer(_BaseOpMixin):
 
     def __init__(self, *args, cr_id: str, **kwargs):
         self.cr_id: str = cr_id
+        # every node spliced into a body, see Transformer.touched_lines
+        self.touched: list[cst.CSTNode] = []
+        # cr_anc -> [(label, score)] of anchors that were not found exactly
+        self.suggestions: dict[str, list[tuple[str, float]]] = {}
+        # cr_anc -> (label, score) of anchors the fuzzy fallback resolved
+        self.resolved: dict[str, tuple[str, float]] = {}
+        # id(body) -> (body, AnchorIndex), bodies are tuples, a changed scope is a new one
+        self._anchor_indexes: dict[int, tuple] = {}
 
     def _create_marker_node(self, head: CrHeads, *args, **kwargs) -> cst.EmptyLine:
         """Creates a marker node with the change request ID."""
@@ -69,16 +81,24 @@ class _BaseTransformer(_BaseOpMixin):
 
     #-- cr_op: replace, cr_type: method, cr_anc: _BaseTransformer.dispatch, cr_id: 2025-11-03-12-29-12 --#
     def dispatch(
-        self, *args, head: CrHeads, node: cst.CSTNode | None, source: cst.CSTNode, **kwargs
+        self, *args, head: CrHeads, node: cst.CSTNode | None, source: cst.CSTNode,
+        fuzzy: bool = False, **kwargs
         ) -> tuple[cst.CSTNode, bool]:
-        """Route op; skip no-ops; build nodes; apply op. Includes anchor validation."""
+        """
+        Route op; skip no-ops; build nodes; apply op. Includes anchor validation.
+        fuzzy: resolve a missed anchor to the most similar statement of the scope.
+        """
         idx = self._find_anchor_index(head, source, *args, **kwargs)
+        if idx == -1 and fuzzy:
+            idx = self._fuzzy_anchor_index(head, source, *args, node=node, **kwargs)
 
         # --- ANCHOR VALIDATION ---
         if idx == -1:
             print(f"{Fore.RED}CR Anchor NOT FOUND: "
                   f"cr_anc='{head.cr_anc}' cr_type='{head.cr_type}' "
-                  f"in source.{Style.RESET_ALL}")
+                  f"in source.{Style.RESET_ALL}"
+                  + (f" Similar: {self.suggestions[head.cr_anc]}"
+                                                if self.suggestions.get(head.cr_anc) else ""))
             return source, False
         # -------------------------
 
@@ -88,6 +108,7 @@ class _BaseTransformer(_BaseOpMixin):
         nodes = self._nodes_for(head, node, *args, **kwargs)
         op = getattr(self, f"_{head.cr_op}")
         new_body = op(*args, body=body, idx=idx, nodes=nodes, marker=nodes[0], **kwargs)
+        self.touched.extend(nodes)
         return self._wrap_new_body_with(source, new_body), True
 
 
@@ -155,6 +176,66 @@ class _BaseTransformer(_BaseOpMixin):
     def _find_anchor_index(self, head: CrHeads, source: cst.CSTNode, *args, **kwargs) -> int:
         raise NotImplementedError("Subclasses must implement _find_anchor_index.")
 
+    def _fuzzy_target(self, head: CrHeads, source: cst.CSTNode, *args, **kwargs
+        ) -> tuple[str, set[str]] | None:
+        """The part of cr_anc to score and the statement kinds it can match."""
+        if head.cr_type == "import":
+            return head.cr_anc, {"import"}
+        return head.cr_anc, {head.cr_type, "statement"}
+
+    def _fuzzy_anchor_index(self, head: CrHeads, source: cst.CSTNode, *args,
+        node: cst.CSTNode | None = None, **kwargs) -> int:
+        """
+        Fallback if cr_anc is not found exactly: the most similar statement of the scope,
+        if it is similar enough (see helpers/anchor_index.py). -1 otherwise.
+        replace and remove only resolve to a statement the op's node has the label of,
+        they must never hit a different definition (get_user_id -> get_user).
+        """
+        target = self._fuzzy_target(head, source, *args, **kwargs)
+        if not NUMPY_AVAILABLE or target is None:
+            return -1
+        anchor, kinds = target
+        body = self._access_body(source)
+        cached = self._anchor_indexes.get(id(body))
+        if cached is None or cached[0] is not body:
+            if len(self._anchor_indexes) >= 8:
+                self._anchor_indexes.clear()
+            cached = self._anchor_indexes[id(body)] = (body, AnchorIndex(*self._labels(body)))
+        ctx = context.current()
+        idx, self.suggestions[head.cr_anc] = cached[1].match(anchor, kinds,
+                                                min_score=ctx.setting('anchor_min_score'),
+                                                hint_score=ctx.setting('anchor_hint_score'))
+        if idx == -1:
+            return -1
+        label = cached[1].labels[idx]
+        if head.cr_op in {"replace", "remove"} and (node is None
+                                                    or self._label(node)[0] != label):
+            print(f"{Fore.RED}CR Anchor NOT RESOLVED: cr_anc='{head.cr_anc}' is similar to "
+                  f"'{label}', but {head.cr_op} would hit a different statement{Style.RESET_ALL}")
+            return -1
+        self.resolved[head.cr_anc] = next((l, sc) for l, sc in self.suggestions[head.cr_anc]
+                                                                            if l == label)
+        print(f"{Fore.YELLOW}CR Anchor RESOLVED: cr_anc='{head.cr_anc}' -> "
+              f"'{label}'{Style.RESET_ALL}")
+        return idx
+
+    def _labels(self, body: tuple, *args, **kwargs) -> tuple[list[str], list[str]]:
+        """Name (definitions) or code (other statements) and kind of every statement."""
+        labels, kinds = [], []
+        for stmt in body:
+            label, kind = self._label(stmt)
+            labels.append(label)
+            kinds.append(kind)
+        return labels, kinds
+
+    @staticmethod
+    def _label(stmt: cst.CSTNode) -> tuple[str, str]:
+        s = stmt.body[0] if isinstance(stmt, cst.SimpleStatementLine) else stmt
+        if isinstance(s, (cst.ClassDef, cst.FunctionDef)):
+            return s.name.value, "class" if isinstance(s, cst.ClassDef) else "function"
+        label = cst.Module([s]).code.strip() if isinstance(s, cst.CSTNode) else ""
+        return label, "import" if isinstance(s, (cst.Import, cst.ImportFrom)) else "statement"
+
 
 class ModuleTransformer(_BaseTransformer):
     """Handles top-level imports, classes, and functions."""
@@ -215,6 +296,14 @@ class ClassMethodTransformer(_BaseTransformer):
                 return i
         return -1
 
+    def _fuzzy_target(self, head: CrHeads, source: cst.ClassDef, *args, **kwargs
+        ) -> tuple[str, set[str]] | None:
+        """Only the method name is scored, the class was found exactly."""
+        class_name, _, method_name = head.cr_anc.partition(".")
+        if head.cr_type != "method" or not method_name or class_name != source.name.value:
+            return None
+        return method_name, {"function"}
+
     def _access_body(self, source: cst.ClassDef) -> tuple[cst.BaseStatement, ...]:
         """Returns the class body's statements tuple (source.body.body)."""
         body: tuple[cst.BaseStatement, ...] = source.body.body
@@ -236,22 +325,31 @@ class Transformer:
         self.pg_head, self.cr_ops = self.cstd_body
         self.cr_id: str = cr_id
         self.applied_ops: set[str] = set()
+        # (head, node) of ops whose anchor was never found
+        self.failed_ops: list[tuple] = []
         self.module_handler = ModuleTransformer(*args, cr_id=cr_id, **kwargs)
         self.class_handler = ClassMethodTransformer(*args, cr_id=cr_id, **kwargs)
 
     #-- cr_op: replace, cr_type: method, cr_anc: Transformer.__call__, cr_id: 2025-11-05-14-21-57 --#
     def __call__(self, *args, **kwargs) -> 'Transformer':
-        """Main multi-pass loop to resolve dependencies."""
+        """
+        Main multi-pass loop to resolve dependencies. Anchors are matched exactly until
+        no op applies anymore, only then missed anchors are resolved by similarity, so
+        an anchor created by a later op is never mistaken for a similar one.
+        """
         pending_ops = list(self.cr_ops)
+        fuzzy = False
         while True:
             ops_applied_this_pass = 0
             remaining_ops = []
             # Process each pending operation
             for head, node in pending_ops:
                 if head.cr_type == "method":
-                    new_source, success = self._apply_class_op(head, node, *args, **kwargs)
+                    new_source, success = self._apply_class_op(head, node, *args,
+                                                                    fuzzy=fuzzy, **kwargs)
                 elif head.cr_type in {"import", "class", "function"}:
-                    new_source, success = self._apply_module_op(head, node, *args, **kwargs)
+                    new_source, success = self._apply_module_op(head, node, *args,
+                                                                    fuzzy=fuzzy, **kwargs)
                 else:
                     new_source, success = self.source, False # Unsupported type
                 if success:
@@ -259,14 +357,46 @@ class Transformer:
                     ops_applied_this_pass += 1
                 else:
                     remaining_ops.append((head, node))
-            if ops_applied_this_pass == 0 or not remaining_ops:
+            if not remaining_ops:
                 break
+            if ops_applied_this_pass == 0:
+                if fuzzy or not NUMPY_AVAILABLE:
+                    break
+                fuzzy = True
             pending_ops = remaining_ops
+        self.failed_ops = remaining_ops
         if remaining_ops:
             print(f"{Fore.YELLOW}Warning: Could not apply all changes...{Style.RESET_ALL}")
         # Return the instance itself so we can access properties like 'code'
         return self
 
+    @property
+    def code(self) -> str:
+        return self.source.code
+
+    def touched_lines(self, *args, **kwargs) -> list[tuple[int, int]]:
+        """
+        Returns the merged (start, end) line ranges (1 based, inclusive) of all nodes the
+        ops spliced into the final source. Nodes replaced by a later op are gone.
+        """
+        return touched_lines(self.source, self.touched_nodes)
+
+    @property
+    def touched_nodes(self) -> list[cst.CSTNode]:
+        return self.module_handler.touched + self.class_handler.touched
+
+    @property
+    def suggestions(self) -> dict[str, list[tuple[str, float]]]:
+        """Similar statements of the failed ops' anchors, see _BaseTransformer.dispatch."""
+        failed = {head.cr_anc for head, _ in self.failed_ops}
+        return {anc: hints for h in (self.module_handler, self.class_handler)
+                            for anc, hints in h.suggestions.items() if anc in failed and hints}
+
+    @property
+    def resolved(self) -> dict[str, tuple[str, float]]:
+        """cr_anc -> (label, score) of every anchor the fuzzy fallback resolved."""
+        return {**self.module_handler.resolved, **self.class_handler.resolved}
+
     def _apply_module_op(self, head: CrHeads, node: cst.CSTNode | None, *args, **kwargs) -> tuple[cst.Module, bool]:
         """Applies operations targeting the top-level module body."""
         return self.module_handler.dispatch(head=head, node=node, source=self.source, *args, **kwargs)
@@ -292,4 +422,100 @@ class Transformer:
         # 3. Replace the old ClassDef node with the new one in the module body
         new_module_body = list(self.source.body)
         new_module_body[tgt_cls_idx] = new_class_node
-        return self.source.with_changes(body=tuple(new_module_body)), True
\ No newline at end of file
+        return self.source.with_changes(body=tuple(new_module_body)), True
+
+
+def touched_lines(source: cst.Module, nodes: list[cst.CSTNode]) -> list[tuple[int, int]]:
+    """Merged (start, end) line ranges of nodes that are still part of source."""
+    touched = {id(n) for n in nodes}
+    # unsafe_skip_copy keeps node identity, so the touched nodes can be found again
+    wrapper = cst.MetadataWrapper(source, unsafe_skip_copy=True)
+    positions = wrapper.resolve(PositionProvider)
+    ranges = sorted((p.start.line, p.end.line) for n, p in positions.items()
+                                                                if id(n) in touched)
+    merged: list[tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class RegionTransformer:
+    """
+    Runs the Transformer only on the top level regions the cr_ops target (see
+    parsers.SourceRegions). Each target region is parsed together with its neighbours,
+    so duplicate checks and marker handling see the same statements as in a full parse.
+    All other regions are copied as text and never parsed.
+    Falls back to a full parse if an anchor can not be located without libcst.
+    """
+
+    def __init__(self, source_text: str, cstd_body, *args, cr_id, **kwargs):
+        self.source_text: str = source_text
+        self.cstd_body = cstd_body
+        self.pg_head, self.cr_ops = cstd_body
+        self.cr_id: str = cr_id
+        self.code: str = None
+        self.partial: bool = False
+        # (first output line, Transformer) per parsed window, see touched_lines
+        self.windows: list[tuple[int, Transformer]] = []
+
+    def __call__(self, *args, **kwargs) -> 'RegionTransformer':
+        regions = SourceRegions(self.source_text)
+        targets = [regions.locate(head) for head, _ in self.cr_ops]
+        if not len(regions) or None in targets:
+            return self._full(*args, **kwargs)
+        self.partial = True
+        out, out_lines, pos = [], 0, 0
+        for first, last in self._windows(targets, len(regions)):
+            if pos < first:
+                out.append(regions.region_text(pos, first))
+                out_lines += out[-1].count('\n')
+            ops = [op for op, t in zip(self.cr_ops, targets) if first <= t < last]
+            window = cst.parse_module(regions.region_text(first, last))
+            tf = Transformer(window, (self.pg_head, ops), *args, cr_id=self.cr_id, **kwargs)
+            tf(*args, **kwargs)
+            self.windows.append((out_lines, tf))
+            out.append(tf.code)
+            out_lines += out[-1].count('\n')
+            pos = last
+        out.append(regions.region_text(pos, len(regions)) if pos < len(regions) else '')
+        self.code = ''.join(out)
+        return self
+
+    def _full(self, *args, **kwargs) -> 'RegionTransformer':
+        tf = Transformer(cst.parse_module(self.source_text), self.cstd_body, *args,
+                                                                    cr_id=self.cr_id, **kwargs)
+        tf(*args, **kwargs)
+        self.windows, self.code = [(0, tf)], tf.code
+        return self
+
+    @staticmethod
+    def _windows(targets: list[int], n: int) -> list[tuple[int, int]]:
+        """Merged (first, end) region ranges, every target plus one neighbour each side."""
+        windows: list[tuple[int, int]] = []
+        for t in sorted(set(targets)):
+            first, last = max(t - 1, 0), min(t + 2, n)
+            if windows and first <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], max(last, windows[-1][1]))
+            else:
+                windows.append((first, last))
+        return windows
+
+    @property
+    def failed_ops(self) -> list[tuple]:
+        return [op for _, tf in self.windows for op in tf.failed_ops]
+
+    @property
+    def suggestions(self) -> dict[str, list[tuple[str, float]]]:
+        return {anc: hints for _, tf in self.windows for anc, hints in tf.suggestions.items()}
+
+    @property
+    def resolved(self) -> dict[str, tuple[str, float]]:
+        return {anc: r for _, tf in self.windows for anc, r in tf.resolved.items()}
+
+    def touched_lines(self, *args, **kwargs) -> list[tuple[int, int]]:
+        """Like Transformer.touched_lines, shifted to the lines of the spliced output."""
+        return [(start + offset, end + offset) for offset, tf in self.windows
+                                                    for start, end in tf.touched_lines()]
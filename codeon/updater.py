@@ -1,5 +1,6 @@
 # C:\Users\lars\python_venvs\packages\acodeon\codeon\updater.py
-import os, shutil
+import contextlib, contextvars, os, shutil, time
+from concurrent.futures import ThreadPoolExecutor
 from colorama import Fore, Style
 from codeon.helpers.printing import logprint, Color, MODULE_COLORS
 MODULE_COLORS["updater"] = Color.BLUE
@@ -7,8 +8,15 @@ MODULE_COLORS["updater"] = Color.BLUE
 import codeon.contracts as contracts
 from codeon.cr_info import CrData
 
-from codeon.creator import SourceEngine
+from codeon.creator import SourceEngine, ChainEngine
+from codeon.parsers import CSTDelta
+from codeon.helpers.blob_store import BlobStore
+from codeon.helpers.cr_index import CrIndex
+from codeon.helpers.file_io import AtomicWriter
+import codeon.helpers.context as context
 import codeon.settings as sts
+import codeon.helpers.black_format as black_format
+import codeon.helpers.profiling as profiling
 import codeon.helpers.printing as printing
 
 
@@ -25,36 +33,294 @@ class Updater:
         self.status_dict = {}
         self.cr_data: CrData = None
 
-    def __call__(self, *args, entry_phase:str=None, up_to_phase:str=None, verbose:int=0, 
-        **kwargs) -> dict:
+    def __call__(self, *args, settings:dict=None, **kwargs) -> dict | list[dict]:
+        """
+        Runs the CR in its own request context (error log, settings overrides), so many
+        CRs can run concurrently in one process.
+        Returns the CrData dict, or one batch record per CR if a json array fanned out.
+        """
+        with context.request(settings=settings):
+            return self.run(*args, **kwargs)
+
+    def run(self, *args, entry_phase:str=None, up_to_phase:str=None, verbose:int=0, 
+        **kwargs) -> dict | list[dict]:
         """
         Main loop to run the update phases sequentially as defined in cls.phases. 
         """
         up_to_phase = up_to_phase if up_to_phase is not None else self.default_up_to_phase
         entry_phase = entry_phase if entry_phase is not None else self.default_entry_phase
-        kwargs.update(self.update_params(*args, up_to_phase=up_to_phase,
-                                                entry_phase=entry_phase,
-                                                **kwargs
-                        )
-        )
-        for i, phase in enumerate(sts.phases):
-            logprint(f"# {i}: RUN {phase.upper()}")
-            if self.phases[entry_phase] <= i <= self.phases[up_to_phase]:
-                kwargs.update(self.cr_phase(phase, *args, verbose=verbose, **kwargs))
+        call_kwargs = {k: vs for k, vs in kwargs.items() if k != 'json_string'}
+        self.profiler = profiling.Profiler()
+        self.profiler.add('settings', sts.load_seconds)
+        with self.profiler.activate():
+            kwargs.update(self.update_params(*args, up_to_phase=up_to_phase,
+                                                    entry_phase=entry_phase,
+                                                    **kwargs
+                            )
+            )
+            with profiling.cprofile(self.profile_path(*args, **kwargs)):
+                for i, phase in enumerate(sts.phases):
+                    logprint(f"# {i}: RUN {phase.upper()}")
+                    if self.phases[entry_phase] <= i <= self.phases[up_to_phase]:
+                        with profiling.step(phase):
+                            kwargs.update(self.cr_phase(phase, *args, verbose=verbose, **kwargs))
+                        # a json array holds many CRs, each continues on its own from integration
+                        if kwargs.get('fan_out'):
+                            return self.batch(kwargs['fan_out'], *args, up_to_phase=up_to_phase,
+                                                        verbose=verbose, **call_kwargs)
+                        # the prompt has to be answered by the user before the CR can continue
+                        if phase == 'prompt': exit()
+        self.log_profile(*args, verbose=verbose, **kwargs)
+        return self.cr_data.to_dict()
 
+    def profile_path(self, *args, pg_name:str=None, cr_id:str=None, work_file_name:str=None,
+        **kwargs) -> str | None:
+        if pg_name is None:
+            return None
+        return os.path.join(sts.logs_dir(pg_name),
+                            sts.profile_file_name(str(work_file_name), cr_id))
 
-            if phase == 'prompt': exit()
-        
+    def log_profile(self, *args, verbose:int=0, **kwargs) -> None:
+        """Timings go into the CR log, and are printed with -v or the profile env var set."""
+        self.cr_data.timings = self.profiler.table()
+        self.cr_data.log_cr_info(*args, **kwargs)
+        if context.current().setting('cr_index') and self.cr_data.pg_name:
+            CrIndex(self.cr_data.pg_name).record({
+                        **self.cr_data.to_dict(),
+                        **self.hashes(),
+                        'seconds': round(sum(r['wall_s'] for r in self.cr_data.timings
+                                                            if '.' not in r['step']), 4),
+            })
+        if verbose >= 1 or os.environ.get(sts.profile_env_var):
+            printing.records_to_table(f"Updater.profile {self.cr_data.cr_id}",
+                                        self.cr_data.timings)
 
-        return self.cr_data.to_dict()
+    def hashes(self, *args, **kwargs) -> dict:
+        """sha256 of the source file and of the CR output, for the CR index."""
+        out = {}
+        for k, path in (('source_sha256', self.cr_data.source_path),
+                        ('output_sha256', self.cr_data.processing_path)):
+            if path and os.path.isfile(str(path)):
+                out[k] = BlobStore.hash_file(path)
+        return out
+
+    def batch(self, pending:list[dict], *args, max_workers:int=None, settings:dict=None,
+        **kwargs) -> list[dict]:
+        """
+        Runs many pending CRs (see CrData.find_pending) through this Updater.
+        Contract checks run once and are shared, every CR gets its own CrData.
+        CRs for the same work_file_name run in cr_id order, independent files concurrently.
+        The files of one cr_id (i.e. a fanned out json array) share one transaction.
+        settings: request overrides for all CRs, on top of those of a running request.
+        """
+        with context.request(settings=settings):
+            return self._batch(pending, *args, max_workers=max_workers, **kwargs)
+
+    def _batch(self, pending:list[dict], *args, max_workers:int=None, **kwargs) -> list[dict]:
+        shared = contracts.update_params(*args, **kwargs)
+        if shared.get('chain'):
+            groups = {}
+            for p in sorted(pending, key=lambda p: p['cr_id']):
+                groups.setdefault(p['work_file_name'], []).append(p)
+            units, run = list(groups.values()), self._run_group
+        else:
+            units, run = self.cr_units(pending), self._run_unit
+        # formatting is cpu bound, so threads hand it to one shared process pool
+        fmt_pool = black_format.worker_pool(max_workers) if shared.get('black') \
+                                                        else contextlib.nullcontext()
+        with fmt_pool, ThreadPoolExecutor(max_workers=max_workers) as ex:
+            # threads do not inherit the request context, every unit runs in a copy of it
+            futures = [ex.submit(contextvars.copy_context().run, run, u, *args,
+                                    max_workers=max_workers, **shared) for u in units]
+            return [r for f in futures for r in f.result()]
+
+    @staticmethod
+    def cr_units(pending:list[dict]) -> list[list[list[dict]]]:
+        """
+        Splits pending into units that share neither a cr_id nor a work_file_name, so
+        units can run concurrently. A unit lists its CRs in cr_id order, each CR as the
+        pending files of one cr_id.
+        """
+        parent = {}
+        def find(k):
+            while parent.setdefault(k, k) != k:
+                k = parent[k]
+            return k
+        for p in pending:
+            parent[find(('cr_id', p['cr_id']))] = find(('file', p['work_file_name']))
+        units = {}
+        for p in sorted(pending, key=lambda p: (p['cr_id'], p['work_file_name'])):
+            crs = units.setdefault(find(('cr_id', p['cr_id'])), {})
+            crs.setdefault(p['cr_id'], []).append(p)
+        return [list(crs.values()) for crs in units.values()]
+
+    def _run_unit(self, crs:list[list[dict]], *args, **kwargs) -> list[dict]:
+        return [r for files in crs for r in self.run_cr(files, *args, **kwargs)]
+
+    def _run_group(self, group:list[dict], *args, chain:bool=False, max_workers:int=None,
+        **kwargs) -> list[dict]:
+        if chain and len(group) > 1:
+            return self.run_chain(group, *args, **kwargs)
+        return [self.run_pending(p, *args, **kwargs) for p in group]
+
+    def run_cr(self, files:list[dict], *args, max_workers:int=None, **kwargs) -> list[dict]:
+        """
+        Runs the pending files of one cr_id in one transaction (see file_io.AtomicWriter).
+        Nothing is written unless all files succeed, a failing file rolls back the others.
+        """
+        tx = AtomicWriter()
+        if len(files) == 1:
+            runs = [self._run_pending(files[0], *args, tx=tx, **kwargs)]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                # one copy of the request context per file, made in this thread
+                runs = list(ex.map(lambda ctx, p: ctx.run(self._run_pending, p, *args, tx=tx,
+                            **kwargs), [contextvars.copy_context() for _ in files], files))
+        records = [r for r, _ in runs]
+        failed = [r for r in records if r['status'] != 'done']
+        if failed:
+            tx.rollback()
+            status = f"rolled back: {failed[0]['work_file_name']} failed"
+        else:
+            try:
+                tx.commit()
+            except Exception as e:
+                status = f"failed: {e!r}"
+            else:
+                # the CR logs and the index were written before the files existed
+                for p, (_, u) in zip(files, runs):
+                    self.mark_processed(u, p, *args, **kwargs)
+                return records
+        logprint(f"CR {files[0]['cr_id']} {status}", level='error')
+        for r in records:
+            if r['status'] == 'done':
+                r.update(status=status, processing_path=None)
+                self.set_status(r, status, *args, **kwargs)
+        return records
+
+    def run_chain(self, group:list[dict], *args, **kwargs) -> list[dict]:
+        """
+        --chain: the CRs of one work_file_name run up to their integration file, then
+        ChainEngine applies all of them on one parsed tree and writes once.
+        Groups holding other than update CRs run one by one as without --chain.
+        """
+        start, prepared = time.perf_counter(), []
+        for p in group:
+            u = self.spawn()
+            try:
+                r = u(*args, **{**kwargs, **self.cr_pars(p), 'up_to_phase': 'integration'})
+            except (Exception, SystemExit) as e:
+                logprint(f"{p['path']} failed: {e!r}", level='error')
+                r = {}
+            prepared.append((p, u, r))
+        if not self._chainable([r for _, _, r in prepared]):
+            return [self.run_pending({**p, 'entry_phase': 'integration'} if r else p,
+                                                    *args, **kwargs) for p, _, r in prepared]
+        status, failed = 'chained', {}
+        # the chain logs to the error log of its first CR
+        with context.request(settings=kwargs.get('settings'),
+                                error_path=prepared[0][2].get('error_path')):
+            try:
+                failed = ChainEngine()([r for _, _, r in prepared], *args,
+                                **{k: vs for k, vs in kwargs.items() if not 'path' in k}).failed
+            except Exception as e:
+                status = f"failed: {e!r}"
+                logprint(f"chain of {group[0]['work_file_name']} {status}", level='error')
+        if failed:
+            # nothing was written, every CR of the chain stays pending
+            status = f"failed: chain not written, partial CRs {sorted(failed)}"
+        records = []
+        for p, u, r in prepared:
+            cr_status = f"partial: cr_anc not found {failed[p['cr_id']]}" \
+                                                    if p['cr_id'] in failed else status
+            if cr_status == 'chained':
+                self.mark_processed(u, p, *args, **kwargs)
+            else:
+                self.set_status(p, cr_status, *args, **kwargs)
+            records.append({
+                            'cr_id': p['cr_id'],
+                            'work_file_name': p['work_file_name'],
+                            'entry_phase': p['entry_phase'],
+                            'status': cr_status,
+                            'processing_path': r.get('processing_path'),
+                            'seconds': round(time.perf_counter() - start, 3),
+            })
+        return records
+
+    @staticmethod
+    def _chainable(crs:list[dict]) -> bool:
+        if not all(crs) or len({cr.get('source_path') for cr in crs}) != 1:
+            return False
+        if not os.path.isfile(str(crs[0]['source_path'])):
+            return False
+        for cr in crs:
+            if not str(cr.get('integration_path')).endswith('.py') \
+                                            or not os.path.isfile(cr['integration_path']):
+                return False
+            if CSTDelta().read_header(source_path=cr['integration_path']).cr_op != 'update':
+                return False
+        return True
+
+    @staticmethod
+    def cr_pars(pending:dict) -> dict:
+        return {
+                'cr_id': pending['cr_id'],
+                'source_path': pending.get('source_path') or pending['work_file_name'],
+                'work_file_name': pending['work_file_name'],
+                'entry_phase': pending['entry_phase'],
+                'update_source_type': 'file',
+        }
+
+    def run_pending(self, pending:dict, *args, **kwargs) -> dict:
+        """Runs a single pending CR file and returns its summary record."""
+        return self._run_pending(pending, *args, **kwargs)[0]
+
+    def _run_pending(self, pending:dict, *args, **kwargs) -> tuple[dict, 'Updater']:
+        start, status, u = time.perf_counter(), 'done', self.spawn()
+        kwargs.update(self.cr_pars(pending))
+        try:
+            r = u(*args, **kwargs)
+        except (Exception, SystemExit) as e:
+            r, status = {}, f"failed: {e!r}"
+            logprint(f"{pending['path']} {status}", level='error')
+            self.set_status(pending, status, *args, **kwargs)
+        return {
+                'cr_id': pending['cr_id'],
+                'work_file_name': pending['work_file_name'],
+                'entry_phase': pending['entry_phase'],
+                'status': status,
+                'processing_path': r.get('processing_path'),
+                'seconds': round(time.perf_counter() - start, 3),
+        }, u
+
+    def mark_processed(self, u:'Updater', pending:dict, *args, **kwargs) -> None:
+        """Updates CR log and index of a CR whose files were committed after it ran."""
+        with context.request(settings=kwargs.get('settings')):
+            u.update_params({'processing_file_exists': True, 'current_phase': 'processing'},
+                                *args, **{**kwargs, **self.cr_pars(pending)})
+
+    @staticmethod
+    def set_status(pending:dict, status:str, *args, pg_name:str=None, **kwargs) -> None:
+        if context.current().setting('cr_index') and pg_name:
+            CrIndex(pg_name).set_status(pending['cr_id'], pending['work_file_name'], status)
+
+    def spawn(self) -> 'Updater':
+        """Returns a fresh Updater for the same api, so CRs never share a CrData."""
+        return type(self)(api=self.api)
 
     def cr_phase(self, phase, *args, verbose:int=0, **kwargs) -> dict | None:
         # 1. Use SourceEngine to parse and validate the model output
         phase_pars = self.get_phase_params(phase, *args, **kwargs)
         if verbose >=2:
             printing.pretty_dict(f"Updater.{phase.upper()}.phase_pars going in ...", phase_pars)
-        data = SourceEngine(phase, *args, **phase_pars)(*args, **phase_pars)
-        if not data.get('work_file_name'):
+        try:
+            data = SourceEngine(phase, *args, **phase_pars)(*args, **phase_pars)
+        except (Exception, SystemExit) as e:
+            # nothing was written, the CR stays failed in the index until it is run again
+            if kwargs.get('cr_id') and kwargs.get('work_file_name'):
+                self.set_status(kwargs, f"failed: {e!r}", *args, **kwargs)
+            raise
+        if not (data.get('work_file_name') or data.get('fan_out')):
             self.error_handling(phase, *args, **kwargs)
         return self.update_params(data, *args, **kwargs)
 
@@ -69,15 +335,17 @@ class Updater:
     def update_params(self, new_params:dict=None, *args, **kwargs):
         if new_params is not None:
             kwargs.update(new_params)
-        kwargs = contracts.update_params(*args, **kwargs)
-        if self.cr_data is None:
-            self.cr_data = CrData(*args, **CrData.fields(*args, **kwargs))
-            kwargs.update(self.cr_data.to_dict())
-        else:
-            kwargs.update(self.cr_data.update_data(*args, **kwargs))
+        with profiling.step('contracts'):
+            kwargs = contracts.update_params(*args, **kwargs)
+        with profiling.step('cr_data'):
+            if self.cr_data is None:
+                self.cr_data = CrData(*args, **CrData.fields(*args, **kwargs))
+                kwargs.update(self.cr_data.to_dict())
+            else:
+                kwargs.update(self.cr_data.update_data(*args, **kwargs))
         return kwargs
 
-    def error_handling(phase, *args, **kwargs):
+    def error_handling(self, phase, *args, **kwargs):
         msg = f"{phase} parsing failed or was empty. No json file saved."
         logprint(msg, level='error')
         raise RuntimeError(msg)
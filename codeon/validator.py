@@ -0,0 +1,224 @@
+# validator.py
+import ast, atexit, functools, io, multiprocessing, os, sys, threading, time, unittest
+from concurrent.futures import ProcessPoolExecutor
+from colorama import Fore, Style
+from codeon.helpers.printing import logprint, Color, MODULE_COLORS
+MODULE_COLORS["validator"] = Color.CYAN
+
+import codeon.settings as sts
+import codeon.helpers.printing as printing
+from codeon.helpers.dir_context import DirContext
+
+
+class Validator:
+    """
+    Validates the transformed code of a CR in three stages (-t/--testing):
+    compile, local imports and the matching unit test module.
+    WHY: All stages run without starting a new interpreter. Imports are checked against a
+    cached module map of the project, tests run in one warm worker process.
+    """
+    stages = ('compile', 'imports', 'tests')
+
+    def __init__(self, *args, **kwargs):
+        self.records: list[dict] = []
+
+    def __call__(self, code: str, *args, source_path: str, project_dir: str, pg_name: str,
+        **kwargs) -> list[dict]:
+        self.records = []
+        import_path = DirContext._import_path(source_path, project_dir)
+        for stage in self.stages:
+            start = time.perf_counter()
+            status, detail = getattr(self, f"_{stage}")(code, *args,
+                                                            source_path=source_path,
+                                                            project_dir=project_dir,
+                                                            pg_name=pg_name,
+                                                            import_path=import_path,
+                                                            **kwargs)
+            self.records.append({
+                                'stage': stage,
+                                'status': status,
+                                'seconds': round(time.perf_counter() - start, 3),
+                                'detail': detail,
+            })
+            if status == 'failed':
+                break
+        printing.records_to_table('Validator.result', self.records)
+        return self.records
+
+    @property
+    def ok(self) -> bool:
+        return all(r['status'] != 'failed' for r in self.records)
+
+    # ---------- stages ----------
+    def _compile(self, code: str, *args, source_path: str, **kwargs) -> tuple[str, str]:
+        try:
+            compile(code, source_path, "exec", dont_inherit=True)
+        except SyntaxError as e:
+            return 'failed', f"{e.msg} (line {e.lineno})"
+        return 'ok', ''
+
+    def _imports(self, code: str, *args, project_dir: str, pg_name: str, import_path: str,
+        **kwargs) -> tuple[str, str]:
+        """Local imports (the package itself or relative ones) must resolve."""
+        modules = module_map(project_dir)
+        package = import_path.rsplit('.', 1)[0] if import_path and '.' in import_path else ''
+        missing = []
+        for node in ast.walk(ast.parse(code)):
+            if isinstance(node, ast.Import):
+                for a in node.names:
+                    if a.name.split('.')[0] == pg_name and a.name not in modules:
+                        missing.append(a.name)
+            elif isinstance(node, ast.ImportFrom):
+                mod = self._absolute(node, package)
+                if not mod or (mod.split('.')[0] != pg_name and not node.level):
+                    continue
+                if mod not in modules:
+                    missing.append(mod)
+                    continue
+                missing.extend(f"{mod}.{a.name}" for a in node.names
+                            if not has_name(modules, mod, a.name))
+        return ('failed', f"unresolved: {', '.join(missing)}") if missing else ('ok', '')
+
+    def _tests(self, code: str, *args, source_path: str, project_dir: str, pg_name: str,
+        import_path: str, **kwargs) -> tuple[str, str]:
+        test_module = find_test_module(source_path, project_dir)
+        if test_module is None:
+            return 'skipped', 'no test module found'
+        try:
+            r = warm_worker().submit(_run_tests, test_module, project_dir, pg_name,
+                                                        import_path, code).result()
+        except Exception as e:
+            return 'failed', f"{test_module}: {e!r}"
+        return ('ok' if r['ok'] else 'failed'), (f"{test_module}: {r['run']} run, "
+                                    f"{r['failures']} failures, {r['errors']} errors")
+
+    @staticmethod
+    def _absolute(node: ast.ImportFrom, package: str) -> str | None:
+        if not node.level:
+            return node.module
+        parts = package.split('.') if package else []
+        if node.level - 1 > len(parts):
+            return None
+        base = parts[:len(parts) - (node.level - 1)]
+        return '.'.join(base + ([node.module] if node.module else []))
+
+
+# ---------- cached module map ----------
+# project_dir -> ({dir: mtime_ns}, {dotted module name: file path})
+_module_maps: dict[str, tuple[dict, dict]] = {}
+
+def module_map(project_dir: str) -> dict[str, str]:
+    """
+    All modules below project_dir. The map is only rebuilt if one of its directories
+    changed, adding or removing a file or sub dir changes the mtime of its parent.
+    """
+    if cached := _module_maps.get(project_dir):
+        try:
+            if all(os.stat(d).st_mtime_ns == m for d, m in cached[0].items()):
+                return cached[1]
+        except FileNotFoundError:
+            pass
+    dirs_mtimes, modules = {}, {}
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d not in sts.ignore_dirs and not d.startswith('.')]
+        dirs_mtimes[root] = os.stat(root).st_mtime_ns
+        for f in files:
+            if not f.endswith('.py'):
+                continue
+            rel = os.path.relpath(os.path.join(root, f), project_dir)[:-3]
+            modules[rel.replace(os.sep, '.').removesuffix('.__init__')] = os.path.join(root, f)
+    _module_maps[project_dir] = (dirs_mtimes, modules)
+    return modules
+
+@functools.lru_cache(maxsize=256)
+def _top_level_names(path: str, mtime_ns: int) -> frozenset | None:
+    """Names a module defines, None if it uses star imports or __getattr__."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = _defined_names(tree.body)
+    return None if names is None or '__getattr__' in names else frozenset(names)
+
+def _defined_names(body: list) -> set | None:
+    names = set()
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            if any(a.name == '*' for a in node.names):
+                return None
+            names.update((a.asname or a.name).split('.')[0] for a in node.names)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for t in targets:
+                names.update(n.id for n in ast.walk(t) if isinstance(n, ast.Name))
+        elif isinstance(node, (ast.If, ast.Try, ast.With)):
+            # i.e. optional imports, names of all branches count
+            for sub in (node.body, getattr(node, 'orelse', []), getattr(node, 'finalbody', []),
+                        *(h.body for h in getattr(node, 'handlers', []))):
+                if (sub_names := _defined_names(sub)) is None:
+                    return None
+                names |= sub_names
+    return names
+
+def has_name(modules: dict[str, str], mod: str, name: str) -> bool:
+    if f"{mod}.{name}" in modules or name == '*':
+        return True
+    path = modules[mod]
+    names = _top_level_names(path, os.stat(path).st_mtime_ns)
+    return names is None or name in names
+
+
+# ---------- tests in a warm worker ----------
+def find_test_module(source_path: str, project_dir: str) -> str | None:
+    """The file itself if it is a test file, else test_<name>.py below project_dir."""
+    name = os.path.basename(source_path)
+    test_name = name if name.startswith('test') else f"test_{name}"
+    for mod, path in module_map(project_dir).items():
+        if os.path.basename(path) == test_name:
+            # DirContext._test_cmd names the module as 'python -m unittest <module>'
+            return DirContext._test_cmd(path, project_dir).rsplit(' ', 1)[-1]
+    return None
+
+_worker: ProcessPoolExecutor = None
+# batch runs validate from many threads, only one of them may start the worker
+_worker_lock = threading.Lock()
+
+def warm_worker() -> ProcessPoolExecutor:
+    """One long lived worker, third party imports stay loaded between CRs."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ProcessPoolExecutor(max_workers=1,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_worker.shutdown, wait=False, cancel_futures=True)
+        return _worker
+
+def _run_tests(test_module: str, project_dir: str, pg_name: str, import_path: str,
+    code: str) -> dict:
+    """
+    Runs inside the worker. Package modules are dropped so every run imports fresh code,
+    the transformed module is installed from code, so tests run against the CR output.
+    """
+    if project_dir not in sys.path:
+        sys.path.insert(0, project_dir)
+    for name in [n for n in sys.modules if n == pg_name or n.startswith(f"{pg_name}.")]:
+        del sys.modules[name]
+    if import_path:
+        import importlib, importlib.util
+        if '.' in import_path:
+            importlib.import_module(import_path.rsplit('.', 1)[0])
+        path = os.path.join(project_dir, *import_path.split('.')) + '.py'
+        spec = importlib.util.spec_from_file_location(import_path, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[import_path] = module
+        exec(compile(code, spec.origin, "exec"), module.__dict__)
+    stream = io.StringIO()
+    suite = unittest.defaultTestLoader.loadTestsFromName(test_module)
+    r = unittest.TextTestRunner(stream=stream, verbosity=0).run(suite)
+    return {
+            'ok': r.wasSuccessful(),
+            'run': r.testsRun,
+            'failures': len(r.failures),
+            'errors': len(r.errors),
+            'output': stream.getvalue()[-2000:],
+    }